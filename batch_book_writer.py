@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from bookmaster.book_formatter import McBookFormatter
+from bookmaster.book_writer import BookWriter
+from bookmaster.character_ruler import get_ruler
+from bookmaster.model.text_root_unit import TextRootUnit
+from bookmaster.text_unit_reader import TextUnitReader
+from other.book_utils import is_compact_json_enabled
+from other.io_utils import read_file
+
+char_width_dict_file = 'bookmaster/char_width.txt'
+
+# This script lays out many input files at once, e.g. to regenerate a whole back-catalogue.
+# Input files are given as directories (all *.txt files inside) or glob patterns,
+# books are written as json files next to their inputs: some/dir/book.txt -> some/dir/book.json
+#
+# run command: python3 batch_book_writer.py <directory or glob> [<directory or glob> ...] [--workers <count>]
+# python3 batch_book_writer.py content/archive 'content/**/episode_*.txt' --workers 4
+# run with COMPACT_JSON=1 to write books without indents and spaces
+
+@dataclass
+class BookFileResult:
+    input_file_path: str
+    output_file_path: str
+    seconds: float
+    pages_count: int = 0
+    error: str | None = None
+
+
+def __write_book_file(input_file_path: str) -> BookFileResult:
+    output_file_path = os.path.splitext(input_file_path)[0] + '.json'
+    start_time = time.perf_counter()
+
+    try:
+        root_unit = TextRootUnit(read_file(input_file_path))
+        # the ruler is loaded once per worker process
+        ruler = get_ruler(char_width_dict_file=char_width_dict_file)
+        book = BookWriter(reader=TextUnitReader(text_unit=root_unit), ruler=ruler).write()
+        McBookFormatter(book).to_json_file(output_file_path, compact=is_compact_json_enabled())
+    except ValueError as error:
+        # text doesn't fit into a book
+        return BookFileResult(input_file_path=input_file_path, output_file_path=output_file_path,
+                              seconds=time.perf_counter() - start_time, error=str(error))
+    except Exception as error:
+        return BookFileResult(input_file_path=input_file_path, output_file_path=output_file_path,
+                              seconds=time.perf_counter() - start_time, error=f"{type(error).__name__}: {error}")
+
+    return BookFileResult(input_file_path=input_file_path, output_file_path=output_file_path,
+                          seconds=time.perf_counter() - start_time, pages_count=book.get_pages_count())
+
+
+def __find_input_files(inputs: list[str]) -> list[str]:
+    input_file_paths = []
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            input_file_paths.extend(glob.glob(os.path.join(input_path, '*.txt')))
+        else:
+            input_file_paths.extend(glob.glob(input_path, recursive=True))
+
+    # the same file may be matched by several inputs
+    return sorted(set(filter(os.path.isfile, input_file_paths)))
+
+
+def __run(cmd_args: list[str]):
+    workers_count = None
+    inputs = []
+
+    args = iter(cmd_args[1:])
+    for arg in args:
+        if arg == '--workers':
+            workers_count = int(next(args))
+        else:
+            inputs.append(arg)
+
+    if len(inputs) == 0:
+        print('Please specify: <directory or glob> [<directory or glob> ...] [--workers <count>]')
+        sys.exit(2)
+
+    input_file_paths = __find_input_files(inputs)
+    print(f"Found {len(input_file_paths)} input file(s)")
+
+    start_time = time.perf_counter()
+    failed_results = []
+    with ProcessPoolExecutor(max_workers=workers_count) as executor:
+        # results are printed as soon as files are done, in the order of files
+        for result in executor.map(__write_book_file, input_file_paths):
+            if result.error is not None:
+                failed_results.append(result)
+                print(f"FAILED {result.input_file_path} in {result.seconds * 1000:.1f} ms: {result.error}")
+            else:
+                print(f"{result.output_file_path}: {result.pages_count} page(s) in {result.seconds * 1000:.1f} ms")
+
+    written_count = len(input_file_paths) - len(failed_results)
+    print(f"Written {written_count} book(s), {len(failed_results)} failed, "
+          f"in {time.perf_counter() - start_time:.2f} s")
+
+    if len(failed_results) > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    __run(sys.argv)
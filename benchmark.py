@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable
+
+from bookmaster.book_formatter import McBookFormatter
+from bookmaster.book_writer import BookWriter
+from bookmaster.character_ruler import McCharRuler
+from bookmaster.model.text_root_unit import TextRootUnit
+from bookmaster.model.text_unit import TextUnit
+from bookmaster.text_container import McBook
+from bookmaster.text_unit_reader import TextUnitReader
+from other.io_utils import write_json
+
+char_width_dict_file = 'bookmaster/char_width.txt'
+output_json_file = './debug/benchmark.json'
+baseline_json_file = './debug/benchmark_baseline.json'
+
+# stage is reported as a regression if its best time is this many times slower than the baseline one
+regression_ratio = 1.2
+
+# This script times every stage of making a book separately on generated texts of several sizes:
+# parsing (TextRootUnit with all its sub units), layout (BookWriter.write),
+# measuring (McCharRuler.get_width of every word) and export (McBookFormatter.to_json and to_pretty_text).
+# Results are written into #output_json_file and compared with #baseline_json_file if it exists.
+# Both files are local to the machine they were measured on and aren't committed:
+# to compare a change with its base, run with --save-baseline on the base commit first.
+#
+# run command: python3 benchmark.py [--repeat <count>] [--save-baseline]
+
+_words = [
+    'и', 'в', 'не', 'он', 'на', 'что', 'как', 'это', 'все', 'она', 'так', 'его', 'только', 'было',
+    'слово', 'книга', 'страница', 'строка', 'майнкрафт', 'анекдот', 'человек', 'однажды', 'сказал',
+    'the', 'a', 'of', 'and', 'text', 'book', 'page', 'line', 'minecraft', 'paragraph', 'sentence',
+]
+
+# each one still fits into a line, a wider word can't be added to a book at all
+_long_words = [
+    'электрификация', 'переосмысление', 'характеристика',
+    'internationalization', 'misunderstanding', 'interchangeable', 'recommendation',
+]
+
+_formatting_codes = list(McCharRuler.colors_codes.keys()) + ['§l', '§m', '§n', '§o']
+
+
+def __generate_sentence(rand: random.Random, words: list[str], format_words: bool) -> str:
+    sentence_words = rand.choices(words, k=rand.randint(4, 14))
+    if format_words:
+        sentence_words = list(map(lambda word: f"{rand.choice(_formatting_codes)}{word}§r", sentence_words))
+
+    sentence = ' '.join(sentence_words)
+    separator = rand.choice(['.', '.', '!', '?', '...'])
+    return sentence[0].upper() + sentence[1:] + separator
+
+
+def __generate_text(rand: random.Random, paragraphs_count: int, words: list[str], format_words: bool = False,
+                    pages_per_paragraph: int = 0) -> str:
+    paragraphs = []
+    for paragraph_index in range(paragraphs_count):
+        sentences = [__generate_sentence(rand, words, format_words) for _ in range(rand.randint(1, 5))]
+        paragraph = ' '.join(sentences)
+
+        if pages_per_paragraph > 0 and paragraph_index % pages_per_paragraph == 0:
+            paragraph = '{{$new_page}}' + paragraph
+        paragraphs.append(paragraph)
+
+    return '\n'.join(paragraphs)
+
+
+# corpus name -> size -> texts, every text is a separate book
+def __generate_corpora() -> dict[str, dict[int, list[str]]]:
+    rand = random.Random(42)
+    return {
+        # telegram messages, each one is laid out on its own like the message validation does
+        'short_messages': {
+            messages_count: [__generate_text(rand, paragraphs_count=rand.randint(1, 3), words=_words)
+                             for _ in range(messages_count)]
+            for messages_count in [10, 100, 500]
+        },
+        # a single book up to the 100 pages limit
+        'book': {
+            paragraphs_count: [__generate_text(rand, paragraphs_count=paragraphs_count, words=_words,
+                                               pages_per_paragraph=20)]
+            for paragraphs_count in [20, 60, 120]
+        },
+        'dense_formatting': {
+            paragraphs_count: [__generate_text(rand, paragraphs_count=paragraphs_count, words=_words,
+                                               format_words=True)]
+            for paragraphs_count in [20, 60, 120]
+        },
+        # words which take most of a line, so nearly every line is broken before a word
+        'long_words': {
+            paragraphs_count: [__generate_text(rand, paragraphs_count=paragraphs_count, words=_long_words)]
+            for paragraphs_count in [10, 25, 45]
+        },
+    }
+
+
+# expands the whole tree, sub units are created lazily otherwise
+def __parse(raw_text: str) -> TextRootUnit:
+    root_unit = TextRootUnit(raw_text)
+    __expand(root_unit)
+    return root_unit
+
+
+def __expand(text_unit: TextUnit):
+    for sub_unit in text_unit.get_sub_units():
+        __expand(sub_unit)
+
+
+def __get_words(text_unit: TextUnit) -> list[str]:
+    sub_units = text_unit.get_sub_units()
+    if len(sub_units) == 0:
+        return [text_unit.get_raw_text()]
+
+    words = []
+    for sub_unit in sub_units:
+        words.extend(__get_words(sub_unit))
+    return words
+
+
+def __write(ruler: McCharRuler, root_unit: TextUnit) -> McBook:
+    return BookWriter(reader=TextUnitReader(text_unit=root_unit), ruler=ruler).write()
+
+
+# prepare() is called before every repeat and is not timed, its result is passed to run()
+def __time_stage(repeat: int, prepare: Callable[[], object], run: Callable[[object], object]) -> dict:
+    # warming up, the first run is usually slower
+    run(prepare())
+
+    times = []
+    for _ in range(repeat):
+        run_input = prepare()
+        start_time = time.perf_counter()
+        run(run_input)
+        times.append(time.perf_counter() - start_time)
+
+    return {
+        'min_s': min(times),
+        'median_s': statistics.median(times),
+        'repeat': repeat,
+    }
+
+
+def __benchmark_texts(repeat: int, texts: list[str]) -> dict[str, dict]:
+    ruler = McCharRuler(char_width_dict_file=char_width_dict_file)
+    root_units = list(map(__parse, texts))
+    books = [__write(ruler, root_unit) for root_unit in root_units]
+    words = [word for root_unit in root_units for word in __get_words(root_unit)]
+
+    return {
+        'parse': __time_stage(
+            repeat,
+            prepare=lambda: None,
+            run=lambda _: list(map(__parse, texts)),
+        ),
+        'layout': __time_stage(
+            repeat,
+            # a new ruler and tree every time, so no width is cached yet
+            prepare=lambda: (McCharRuler(char_width_dict_file=char_width_dict_file), list(map(__parse, texts))),
+            run=lambda ruler_and_units: [__write(ruler_and_units[0], root_unit) for root_unit in ruler_and_units[1]],
+        ),
+        'get_width': __time_stage(
+            repeat,
+            prepare=lambda: McCharRuler(char_width_dict_file=char_width_dict_file),
+            run=lambda new_ruler: list(map(new_ruler.get_width, words)),
+        ),
+        'to_json': __time_stage(
+            repeat,
+            prepare=lambda: None,
+            run=lambda _: [McBookFormatter(book).to_json() for book in books],
+        ),
+        'to_pretty_text': __time_stage(
+            repeat,
+            prepare=lambda: None,
+            run=lambda _: [McBookFormatter(book).to_pretty_text() for book in books],
+        ),
+        'pages_count': sum(map(lambda book: len(book.get_pages()), books)),
+    }
+
+
+def __compare_with_baseline(results: dict, baseline_results: dict) -> list[str]:
+    regressions = []
+    for case_name, stages in results.items():
+        baseline_stages = baseline_results.get(case_name)
+        if baseline_stages is None:
+            continue
+
+        for stage_name, stage_result in stages.items():
+            baseline_stage_result = baseline_stages.get(stage_name)
+            if type(stage_result) is not dict or type(baseline_stage_result) is not dict:
+                continue
+
+            # the best time is the least affected by other processes
+            ratio = stage_result['min_s'] / max(baseline_stage_result['min_s'], 1e-9)
+            print(f"{case_name:<24} {stage_name:<16} {stage_result['min_s'] * 1000:>10.3f} ms {ratio:>6.2f}x")
+
+            if ratio > regression_ratio:
+                regressions.append(f"{case_name} {stage_name}")
+
+    return regressions
+
+
+def __run(cmd_args: list[str]):
+    repeat = 5
+    if '--repeat' in cmd_args:
+        repeat = int(cmd_args[cmd_args.index('--repeat') + 1])
+    save_baseline = '--save-baseline' in cmd_args
+
+    results = {}
+    for corpus_name, corpus in __generate_corpora().items():
+        for size, texts in corpus.items():
+            case_name = f"{corpus_name}/{size}"
+            print(f"Benchmarking {case_name}")
+            results[case_name] = __benchmark_texts(repeat=repeat, texts=texts)
+
+    benchmark_json = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    write_json(output_json_file, benchmark_json)
+    print(f"Results are written to {output_json_file}")
+
+    if save_baseline:
+        write_json(baseline_json_file, benchmark_json)
+        print(f"Baseline is written to {baseline_json_file}")
+        return
+
+    if not os.path.exists(baseline_json_file):
+        print(f"No baseline to compare with, run with --save-baseline to create {baseline_json_file}")
+        return
+
+    with open(baseline_json_file, 'r') as file:
+        baseline_results = json.load(file)['results']
+
+    regressions = __compare_with_baseline(results=results, baseline_results=baseline_results)
+    if len(regressions) > 0:
+        print(f"WARNING {len(regressions)} stage(s) are more than {regression_ratio}x slower than the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    __run(sys.argv)
@@ -1,4 +1,14 @@
-from bookmaster.text_container import McBook
+import json
+from typing import Iterable, TextIO
+
+from bookmaster.text_container import McBook, McPage
+from other.io_utils import make_file_dir
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional, pages are encoded with json without it
+    orjson = None
 
 
 class McBookFormatter:
@@ -43,16 +53,105 @@ class McBookFormatter:
             page = enumerated_page[1]
             page_number = index + 1
 
-            line_str_list = []
-            for enumerated_line in enumerate(page.get_lines()):
-                index = enumerated_line[0]
-                line = enumerated_line[1]
-                line_number = index + 1
-
-                line_str_list.append(f"{line_number}: {line.get_text()}")
-
-            page_str = '\n'.join(line_str_list)
-            page_str_list.append(f" -------- Page {page_number} -------- \n" + page_str)
+            page_str_list.append(McBookFormatter.__to_pretty_page_text(page_number=page_number, page=page))
         book_str_list.append('\n\n'.join(page_str_list))
 
         return '\n'.join(book_str_list)
+
+    # the same as write_json(file_path, to_json()), but the book is written page by page
+    def to_json_file(self, file_path: str, compact: bool = False) -> int:
+        make_file_dir(file_path)
+        with open(file_path, 'w') as file:
+            return McBookFormatter.write_json(file=file, pages=self.__book.get_pages(),
+                                              title=self.__book.get_title(), compact=compact)
+
+    # the same as write_file(file_path, to_pretty_text()), but the book is written page by page
+    def to_pretty_text_file(self, file_path: str) -> int:
+        make_file_dir(file_path)
+        with open(file_path, 'w') as file:
+            return McBookFormatter.write_pretty_text(file=file, pages=self.__book.get_pages(),
+                                                     title=self.__book.get_title())
+
+    # writes the same json as write_json(file_path, to_json()), but page by page as pages arrive,
+    # e.g. from BookWriter.iter_pages, so the whole book is never kept in memory
+    # compact=True - the same json without indents and spaces
+    @staticmethod
+    def write_json(file: TextIO, pages: Iterable[McPage], title: str | None = None, compact: bool = False) -> int:
+        if compact:
+            file.write('{')
+            if title is not None:
+                file.write(f'"title":{McBookFormatter.__to_json_value(title)},')
+            file.write('"pages":[')
+        else:
+            file.write('{\n')
+            if title is not None:
+                file.write(f'    "title": {McBookFormatter.__to_json_value(title)},\n')
+            file.write('    "pages": [')
+
+        page_number = 0
+        for page in pages:
+            if page_number > 0:
+                file.write(',')
+
+            page_number += 1
+            line_texts = list(map(lambda line: line.get_text(), page.get_lines()))
+            if compact:
+                file.write(McBookFormatter.__to_json_value(line_texts))
+            else:
+                file.write('\n        ' + McBookFormatter.__to_indented_page_json(line_texts))
+
+        if compact:
+            file.write(']}')
+        elif page_number == 0:
+            file.write(']\n}')
+        else:
+            file.write('\n    ]\n}')
+
+        return page_number
+
+    # compact json of a string or a list of strings
+    @staticmethod
+    def __to_json_value(value: str | list[str]) -> str:
+        if orjson is not None:
+            return orjson.dumps(value).decode()
+
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def __to_indented_page_json(line_texts: list[str]) -> str:
+        if len(line_texts) == 0:
+            return '[]'
+
+        line_json_list = list(map(lambda line_text: '            ' + McBookFormatter.__to_json_value(line_text),
+                                  line_texts))
+        return '[\n' + ',\n'.join(line_json_list) + '\n        ]'
+
+    # writes the same text as to_pretty_text, but page by page as pages arrive,
+    # e.g. from BookWriter.iter_pages, so the whole book is never kept in memory
+    @staticmethod
+    def write_pretty_text(file: TextIO, pages: Iterable[McPage], title: str | None = None) -> int:
+        if title is not None:
+            file.write(f"title: {title}\n")
+
+        page_number = 0
+        for page in pages:
+            if page_number > 0:
+                file.write('\n\n')
+
+            page_number += 1
+            file.write(McBookFormatter.__to_pretty_page_text(page_number=page_number, page=page))
+
+        return page_number
+
+    @staticmethod
+    def __to_pretty_page_text(page_number: int, page: McPage) -> str:
+        line_str_list = []
+        for enumerated_line in enumerate(page.get_lines()):
+            index = enumerated_line[0]
+            line = enumerated_line[1]
+            line_number = index + 1
+
+            line_str_list.append(f"{line_number}: {line.get_text()}")
+
+        page_str = '\n'.join(line_str_list)
+        return f" -------- Page {page_number} -------- \n" + page_str
@@ -0,0 +1,40 @@
+import dataclasses
+import hashlib
+from dataclasses import dataclass
+
+from bookmaster.model.text_unit import TextUnit
+
+
+# Result of a layout kept to lay out a changed version of the same text again, see BookWriter.rewrite.
+# Every page start is a checkpoint: the layout can be resumed from the unit which starts the page
+# with an empty book, the pages before it don't depend on the text after it.
+@dataclass
+class BookLayout:
+    layout_key: str  # ruler and config of the layout, layouts made with other ones can't be reused
+    paragraph_keys: list[str]  # every paragraph of the text in reading order, see get_paragraph_keys
+    paragraph_addresses: list[list[int]]  # address of every paragraph in the root unit
+    page_start_addresses: list[list[int]]  # address of the unit which starts every page in the root unit
+    page_lines: list[list[str]]  # text of every line of every page
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+    @staticmethod
+    def from_dict(layout_dict: dict) -> 'BookLayout':
+        return BookLayout(**layout_dict)
+
+
+# paragraph key and address of every paragraph of the root unit, sub units of paragraphs are not created
+# layout of the text depends only on the paragraphs (tagged units are never added to a book),
+# and the whole tree of a paragraph is built from its text, format flags and style at start, so they are the key
+def get_paragraph_keys(root_unit: TextUnit) -> tuple[list[str], list[list[int]]]:
+    paragraph_keys = []
+    paragraph_addresses = []
+    for tagged_index, tagged_unit in enumerate(root_unit.get_sub_units()):
+        for paragraph_index, paragraph_unit in enumerate(tagged_unit.get_sub_units()):
+            paragraph_key = (f"{int(paragraph_unit.get_format_flag_mask())}:{int(paragraph_unit.is_bold_at_start())}:"
+                             f"{paragraph_unit.get_source_raw_text()}")
+            paragraph_keys.append(hashlib.blake2b(paragraph_key.encode(), digest_size=16).hexdigest())
+            paragraph_addresses.append([tagged_index, paragraph_index])
+
+    return paragraph_keys, paragraph_addresses
@@ -0,0 +1,92 @@
+import dataclasses
+import hashlib
+import json
+import math
+
+from bookmaster.book_writer import BookWriter, BookMeasurement, _DEFAULT_CONFIG
+from bookmaster.book_writing_config import BookWritingConfig
+from bookmaster.character_ruler import McCharRuler
+from bookmaster.measurement_cache import MeasurementCache
+from bookmaster.model.text_root_unit import TextRootUnit
+from bookmaster.model.text_unit import TextUnit, FormatFlag
+from bookmaster.text_container import McBook, McLine, McPage
+from bookmaster.text_unit_reader import TextUnitReader
+
+
+# Answers "how many pages does the text take" without building a McBook.
+# Texts which are obviously too long are rejected by their width before the layout.
+# With a cache, raw texts measured by previous runs are not parsed nor laid out again.
+class BookMeasurer:
+
+    def __init__(self, ruler: McCharRuler, config: BookWritingConfig = _DEFAULT_CONFIG,
+                 cache: MeasurementCache | None = None):
+        self.__ruler = ruler
+        self.__config = config
+        self.__cache = cache
+
+    # the same as measure(TextRootUnit(raw_text), max_pages_count)
+    def measure_text(self, raw_text: str, max_pages_count: int) -> BookMeasurement:
+        if self.__cache is None:
+            return self.measure(root_unit=TextRootUnit(raw_text), max_pages_count=max_pages_count)
+
+        cache_key = self.__get_cache_key(raw_text=raw_text, max_pages_count=max_pages_count)
+        measurement = self.__cache.get(key=cache_key)
+        if measurement is not None:
+            return measurement
+
+        try:
+            measurement = self.measure(root_unit=TextRootUnit(raw_text), max_pages_count=max_pages_count)
+        except ValueError as error:
+            self.__cache.put(key=cache_key, measurement=None, error=str(error))
+            raise
+
+        self.__cache.put(key=cache_key, measurement=measurement)
+        return measurement
+
+    def measure(self, root_unit: TextUnit, max_pages_count: int) -> BookMeasurement:
+        min_pages_count = self.get_min_pages_count(root_unit=root_unit)
+        if min_pages_count > max_pages_count:
+            return BookMeasurement(pages_count=min_pages_count, last_page_lines_count=0, fits_page_limit=False)
+
+        book_writer = BookWriter(reader=TextUnitReader(text_unit=root_unit), ruler=self.__ruler, config=self.__config)
+        return book_writer.measure(max_pages_count=max_pages_count)
+
+    # lower bound of the page count, root_unit is expected to be a TextRootUnit
+    def get_min_pages_count(self, root_unit: TextUnit) -> int:
+        pages_count = 0
+        lines_count = 0
+
+        paragraph_units = [paragraph_unit
+                           for tagged_unit in root_unit.get_sub_units()
+                           for paragraph_unit in tagged_unit.get_sub_units()]
+        # all paragraphs are measured at once
+        paragraph_widths = TextUnit.get_widths(text_units=paragraph_units, ruler=self.__ruler)
+
+        for paragraph_unit, paragraph_width_px in zip(paragraph_units, paragraph_widths):
+            if paragraph_unit.has_format_flag(FormatFlag.REQUESTED_NEW_PAGE) and lines_count > 0:
+                pages_count += math.ceil(lines_count / McPage.max_line_number)
+                lines_count = 0
+
+            lines_count += self.__get_min_lines_count(paragraph_width_px=paragraph_width_px)
+
+        return pages_count + math.ceil(lines_count / McPage.max_line_number)
+
+    def __get_min_lines_count(self, paragraph_width_px: int) -> int:
+        # a paragraph of width W split into L lines gives lines of total width W - (L - 1) at least
+        # (there are no spaces between the last unit of a line and the first unit of the next one),
+        # so W - (L - 1) <= L * max_width_px
+        between_units_width = self.__ruler.between_chars_width
+        min_lines_count = math.ceil((paragraph_width_px + between_units_width)
+                                    / (McLine.max_width_px + between_units_width))
+        return max(min_lines_count, 1)
+
+    # everything the measurement depends on
+    def __get_cache_key(self, raw_text: str, max_pages_count: int) -> str:
+        key_data = [
+            self.__ruler.get_table_version(),
+            dataclasses.asdict(self.__config),
+            [McLine.max_width_px, McPage.max_line_number, McBook.max_page_number],
+            max_pages_count,
+            raw_text,
+        ]
+        return hashlib.sha256(json.dumps(key_data, ensure_ascii=False).encode()).hexdigest()
@@ -1,7 +1,21 @@
+import dataclasses
+import hashlib
+import json
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Iterator
+
+from bookmaster.book_layout import BookLayout, get_paragraph_keys
 from bookmaster.book_writing_config import BookWritingConfig
-from bookmaster.character_ruler import McCharRuler
+from bookmaster.character_ruler import McCharRuler, get_ruler
+from bookmaster.layout_stats import LayoutStats
 from bookmaster.model.text_empty_unit import TextEmptyUnit
-from bookmaster.text_container import McBook
+from bookmaster.model.text_paragraph_unit import TextParagraphUnit
+from bookmaster.model.text_root_unit import TextRootUnit
+from bookmaster.model.text_unit import TextUnit, FormatFlag
+from bookmaster.model.text_word_unit import TextWordUnit
+from bookmaster.paragraph_layout import OptimalParagraphLayout
+from bookmaster.text_container import McBook, McPage, McLine
 from bookmaster.text_unit_reader import TextUnitReader
 
 _DEFAULT_CONFIG = BookWritingConfig(
@@ -9,19 +23,238 @@ _DEFAULT_CONFIG = BookWritingConfig(
 )
 
 
+@dataclass
+class BookMeasurement:
+    pages_count: int  # if the page limit is exceeded - number of pages written before the layout was stopped
+    last_page_lines_count: int
+    fits_page_limit: bool
+
+
 class BookWriter:
 
-    def __init__(self, reader: TextUnitReader, ruler: McCharRuler, config: BookWritingConfig = _DEFAULT_CONFIG):
+    # stats - counters of the layout are added to it, nothing is counted without it
+    # executor - process pool to lay out page segments of a TextRootUnit concurrently in write()
+    def __init__(self, reader: TextUnitReader, ruler: McCharRuler, config: BookWritingConfig = _DEFAULT_CONFIG,
+                 stats: LayoutStats | None = None, executor: Executor | None = None):
         self.__reader = reader
         self.__ruler = ruler
         self.__config = config
+        self.__stats = stats
+        self.__executor = executor
+        self.__paragraph_layout = OptimalParagraphLayout(ruler=ruler, writing_config=config) \
+            if config.optimal_line_breaking else None
+        # address of the unit which starts every written page, see BookLayout
+        # with the optimal line breaking a paragraph may start in the middle of a page, so nothing is recorded
+        self.__page_start_addresses: list[list[int]] = []
+        self.__paragraph_keys: tuple[list[str], list[list[int]]] | None = None
 
     def write(self) -> McBook:
+        self.__page_start_addresses = []
+
+        if self.__can_write_page_segments():
+            text_container = McBook(ruler=self.__ruler, writing_config=self.__config)
+            if self.__try_write_page_segments(text_container=text_container):
+                return text_container
+            self.__page_start_addresses = []
+
+        text_container = McBook(ruler=self.__ruler, writing_config=self.__config, stats=self.__stats)
+
+        for _ in self.__write_pages(text_container=text_container):
+            pass
+
+        return text_container
+
+    # the same as write(), but the pages of the previous layout of the text are reused where the text is the same:
+    # the pages before the first changed paragraph are kept, the layout is resumed from the start of the page
+    # and is stopped as soon as a page starts at the same unit of the unchanged end of the text as before
+    def rewrite(self, previous_layout: BookLayout) -> McBook:
+        root_unit = self.__reader.get_text_unit()
+        if (self.__paragraph_layout is not None or type(root_unit) is not TextRootUnit
+                or len(self.__reader.get_read_address()) > 0 or previous_layout.layout_key != self.__get_layout_key()):
+            return self.write()
+
+        self.__paragraph_keys = get_paragraph_keys(root_unit=root_unit)
+        paragraph_keys, paragraph_addresses = self.__paragraph_keys
+        previous_paragraph_keys = previous_layout.paragraph_keys
+
+        # paragraphs before the first change and after the last one
+        max_common_count = min(len(paragraph_keys), len(previous_paragraph_keys))
+        common_prefix_count = 0
+        while (common_prefix_count < max_common_count
+               and paragraph_keys[common_prefix_count] == previous_paragraph_keys[common_prefix_count]):
+            common_prefix_count += 1
+        common_suffix_count = 0
+        while (common_prefix_count + common_suffix_count < max_common_count
+               and paragraph_keys[-1 - common_suffix_count] == previous_paragraph_keys[-1 - common_suffix_count]):
+            common_suffix_count += 1
+
+        previous_paragraph_indexes = {
+            tuple(address): index for index, address in enumerate(previous_layout.paragraph_addresses)
+        }
+        paragraph_index_shift = len(paragraph_keys) - len(previous_paragraph_keys)
+
+        # previous page start -> the same unit in the root unit, None if its paragraph was changed
+        def get_page_start_address(previous_address: list[int]) -> list[int] | None:
+            paragraph_index = previous_paragraph_indexes[tuple(previous_address[:2])]
+            if paragraph_index >= len(previous_paragraph_keys) - common_suffix_count:
+                paragraph_index += paragraph_index_shift
+            elif paragraph_index >= common_prefix_count:
+                return None
+            return paragraph_addresses[paragraph_index] + previous_address[2:]
+
+        page_start_addresses = list(map(get_page_start_address, previous_layout.page_start_addresses))
+
+        # the last page starting before the first change, the layout is resumed from it
+        # if there is no such page, the layout starts from the beginning of the text
+        resumed_page_index = None
+        for page_index, previous_address in enumerate(previous_layout.page_start_addresses):
+            if previous_paragraph_indexes[tuple(previous_address[:2])] >= common_prefix_count:
+                break
+            resumed_page_index = page_index
+
+        if resumed_page_index is not None:
+            self.__reader.set_read_address(page_start_addresses[resumed_page_index])
+        else:
+            resumed_page_index = 0
+
+        # previous pages starting in the unchanged end of the text, by their start in the root unit
+        previous_page_indexes = {}
+        for previous_page_index in range(resumed_page_index + 1, len(page_start_addresses)):
+            page_start_address = page_start_addresses[previous_page_index]
+            if page_start_address is not None:
+                previous_page_indexes[tuple(page_start_address)] = previous_page_index
+
+        resumed_container = McBook(ruler=self.__ruler, writing_config=self.__config, stats=self.__stats)
+        resumed_container.skip_pages(pages_count=resumed_page_index)
+        self.__page_start_addresses = page_start_addresses[:resumed_page_index]
+
+        reused_page_index = len(page_start_addresses)
+        for pages_count in self.__write_pages(text_container=resumed_container):
+            previous_page_index = previous_page_indexes.get(tuple(self.__page_start_addresses[-1]))
+            if (previous_page_index is not None
+                    and pages_count - 1 + len(page_start_addresses) - previous_page_index <= McBook.max_page_number):
+                # the page starts at the same unit as the previous one, the rest of the layout is the same
+                reused_page_index = previous_page_index
+                self.__page_start_addresses.pop()
+                self.__page_start_addresses.extend(page_start_addresses[reused_page_index:])
+                break
+
+        resumed_pages = resumed_container.get_pages()
+        if reused_page_index < len(page_start_addresses):
+            resumed_pages = resumed_pages[:-1]
+
         text_container = McBook(ruler=self.__ruler, writing_config=self.__config)
+        if (not self.__try_append_reused_pages(text_container=text_container,
+                                               pages_lines=previous_layout.page_lines[:resumed_page_index])
+                or not all(map(lambda page: text_container.try_append_written_page(page=page), resumed_pages))
+                or not self.__try_append_reused_pages(text_container=text_container,
+                                                      pages_lines=previous_layout.page_lines[reused_page_index:])):
+            # the previous layout doesn't match the text, e.g. its lines don't fit into pages anymore,
+            # so the whole text is laid out again
+            self.__reader.set_read_address([])
+            return self.write()
+
+        return text_container
+
+    # layout of the book just written by write() or rewrite() to pass it to rewrite() for a changed text,
+    # None if the layout can't be resumed from page starts
+    def get_layout(self, book: McBook) -> BookLayout | None:
+        root_unit = self.__reader.get_text_unit()
+        if (self.__paragraph_layout is not None or type(root_unit) is not TextRootUnit
+                or len(self.__page_start_addresses) != book.get_pages_count()):
+            return None
+
+        if self.__paragraph_keys is None:
+            self.__paragraph_keys = get_paragraph_keys(root_unit=root_unit)
+        paragraph_keys, paragraph_addresses = self.__paragraph_keys
+
+        return BookLayout(
+            layout_key=self.__get_layout_key(),
+            paragraph_keys=paragraph_keys,
+            paragraph_addresses=paragraph_addresses,
+            page_start_addresses=list(self.__page_start_addresses),
+            page_lines=list(map(lambda page: list(map(McLine.get_text, page.get_lines())), book.get_pages())),
+        )
+
+    # everything the layout depends on besides the text
+    def __get_layout_key(self) -> str:
+        key_data = [
+            self.__ruler.get_table_version(),
+            dataclasses.asdict(self.__config),
+            [McLine.max_width_px, McPage.max_line_number, McBook.max_page_number],
+        ]
+        return hashlib.sha256(json.dumps(key_data).encode()).hexdigest()
+
+    # False if a page doesn't fit into the book, the book is left partly written then
+    @staticmethod
+    def __try_append_reused_pages(text_container: McBook, pages_lines: list[list[str]]) -> bool:
+        for page_lines in pages_lines:
+            if not text_container.try_append_page(lines=BookWriter.__get_reused_page_lines(page_lines)):
+                return False
+
+        return True
+
+    # only the text of reused lines is kept, so each of them is a single word,
+    # it starts a paragraph to keep left spacings of the line text
+    @staticmethod
+    def __get_reused_page_lines(page_lines: list[str]) -> list[list[TextUnit]]:
+        return list(map(
+            lambda line_text: [TextWordUnit(raw_text=line_text, format_flags=FormatFlag.START_OF_PARAGRAPH)],
+            page_lines,
+        ))
+
+    # yields every page as soon as no more text can be added to it,
+    # written pages are not kept, so memory is bounded by a single page
+    def iter_pages(self) -> Iterator[McPage]:
+        text_container = McBook(ruler=self.__ruler, writing_config=self.__config, stats=self.__stats)
+
+        for _ in self.__write_pages(text_container=text_container):
+            yield from text_container.pop_pages(keep_last_page=True)
+
+        yield from text_container.pop_pages(keep_last_page=False)
+
+    # lays out the text without keeping written pages and stops as soon as max_pages_count is exceeded
+    def measure(self, max_pages_count: int) -> BookMeasurement:
+        text_container = McBook(ruler=self.__ruler, writing_config=self.__config, stats=self.__stats)
+
+        for pages_count in self.__write_pages(text_container=text_container):
+            text_container.pop_pages(keep_last_page=True)
+
+            if pages_count > max_pages_count:
+                return BookMeasurement(pages_count=pages_count, last_page_lines_count=0, fits_page_limit=False)
+
+        pages = text_container.get_pages()
+        return BookMeasurement(
+            pages_count=text_container.get_pages_count(),
+            last_page_lines_count=len(pages[-1].get_lines()) if len(pages) > 0 else 0,
+            fits_page_limit=True,
+        )
+
+    # writes all units into the text container, yields the number of pages every time a new page is started
+    def __write_pages(self, text_container: McBook) -> Iterator[int]:
+        if self.__stats is None:
+            yield from self.__write_units(text_container=text_container)
+            return
+
+        # ruler calls are taken from its width cache counters, so the ruler doesn't count anything itself
+        start_cache_info = self.__ruler.get_width_cache_info()
+        try:
+            yield from self.__write_units(text_container=text_container)
+        finally:
+            cache_info = self.__ruler.get_width_cache_info()
+            self.__stats.width_cache_hits += cache_info.hits - start_cache_info.hits
+            self.__stats.ruler_calls += (cache_info.hits + cache_info.misses
+                                         - start_cache_info.hits - start_cache_info.misses)
+
+    def __write_units(self, text_container: McBook) -> Iterator[int]:
+        stats = self.__stats
+        pages_count = text_container.get_pages_count()
 
         deep_factor = 0
         while True:
             text_unit = self.__reader.read_next(deep_factor=deep_factor)
+            if stats is not None:
+                stats.reader_walks += 1
 
             if type(text_unit) is TextEmptyUnit:
                 # no more units that would fit into this text container
@@ -31,12 +264,180 @@ class BookWriter:
                     raise ValueError(f"WARNING some text wasn't added: '{text_unit.get_raw_text()}'")
                 break
 
-            was_appended = text_container.try_append(text_unit=text_unit)
+            if self.__paragraph_layout is not None and type(text_unit) is TextParagraphUnit:
+                was_appended = self.__try_append_paragraph(text_container=text_container, paragraph=text_unit)
+            else:
+                if stats is not None:
+                    stats.book_append_attempts += 1
+                was_appended = text_container.try_append(text_unit=text_unit)
+
             if was_appended:
+                if self.__paragraph_layout is None and text_container.get_pages_count() != pages_count:
+                    # the unit starts a new page
+                    self.__page_start_addresses.append(self.__reader.get_read_address() + [0] * deep_factor)
+
                 self.__reader.consume_next(deep_factor=deep_factor)
+                if stats is not None:
+                    stats.reader_walks += 1
                 deep_factor = 0
+
+                if text_container.get_pages_count() != pages_count:
+                    pages_count = text_container.get_pages_count()
+                    yield pages_count
                 continue
 
+            if stats is not None:
+                stats.deep_factor_descents += 1
             deep_factor = deep_factor + 1
 
-        return text_container
+    # lays out the whole paragraph with the optimal line breaking
+    # returns False if it's impossible, so the paragraph is written unit by unit as usual
+    def __try_append_paragraph(self, text_container: McBook, paragraph: TextParagraphUnit) -> bool:
+        paragraph_lines = self.__paragraph_layout.layout(
+            paragraph=paragraph,
+            first_line_index=BookWriter.__get_next_line_index(text_container=text_container, text_unit=paragraph),
+        )
+        if paragraph_lines is None:
+            return False
+
+        for line_text_units in paragraph_lines:
+            if not text_container.try_append_line(text_units=line_text_units):
+                print(f"WARNING some text wasn't added: '{paragraph.get_raw_text()}'")
+                raise ValueError(f"WARNING some text wasn't added: '{paragraph.get_raw_text()}'")
+
+        return True
+
+    # index of the line on its page, if the text unit starts a new line
+    @staticmethod
+    def __get_next_line_index(text_container: McBook, text_unit: TextUnit) -> int:
+        pages = text_container.get_pages()
+        if len(pages) == 0 or text_unit.has_format_flag(FormatFlag.REQUESTED_NEW_PAGE):
+            return 0
+
+        return len(pages[-1].get_lines()) % McPage.max_line_number
+
+    def __can_write_page_segments(self) -> bool:
+        if self.__executor is None or self.__stats is not None:
+            # counters of other processes are not collected, stats are only for sequential layout
+            return False
+
+        # segments are taken from the text, so nothing must be read yet
+        root_unit = self.__reader.get_text_unit()
+        return (type(root_unit) is TextRootUnit and len(self.__reader.get_read_address()) == 0
+                and type(self.__reader.read_next()) is not TextEmptyUnit)
+
+    # lays out the text between new page tags in the executor processes and puts the pages together in order,
+    # returns False if the book can't be written this way, so it is written sequentially with the same result
+    # (including the error if the text doesn't fit)
+    def __try_write_page_segments(self, text_container: McBook) -> bool:
+        root_unit = self.__reader.get_text_unit()
+        page_segments = root_unit.get_page_segments()
+        if len(page_segments) < 2:
+            return False
+
+        segment_futures = list(map(
+            lambda page_segment: self.__executor.submit(
+                _write_page_segment,
+                self.__ruler.get_char_width_dict_file(),
+                self.__config,
+                page_segment.raw_text,
+            ),
+            page_segments,
+        ))
+
+        try:
+            for page_segment, segment_future in zip(page_segments, segment_futures):
+                segment_pages = segment_future.result()
+                if segment_pages is None:
+                    return False
+
+                # addresses are taken in the segment tree, its tagged units are the same in the root unit
+                segment_unit = _SegmentUnitResolver(root_unit=root_unit,
+                                                    first_sub_unit_index=page_segment.first_sub_unit_index)
+                for page_lines in segment_pages:
+                    first_unit_address = page_lines[0][0]
+                    self.__page_start_addresses.append(
+                        [page_segment.first_sub_unit_index + first_unit_address[0]] + first_unit_address[1:])
+
+                    lines = list(map(lambda line_addresses: list(map(segment_unit.get, line_addresses)), page_lines))
+                    if not text_container.try_append_page(lines=lines):
+                        # more pages than a book can have
+                        return False
+        finally:
+            for segment_future in segment_futures:
+                segment_future.cancel()
+
+        return True
+
+
+# units of a page segment by their addresses in the segment tree,
+# units of a line are next to each other, so the parents of the last found unit are kept
+class _SegmentUnitResolver:
+
+    def __init__(self, root_unit: TextUnit, first_sub_unit_index: int):
+        self.__root_unit = root_unit
+        self.__first_sub_unit_index = first_sub_unit_index
+        self.__last_address: list[int] = []
+        self.__last_units: list[TextUnit] = []  # units of every level of the last address
+
+    def get(self, address: list[int]) -> TextUnit:
+        common_length = 0
+        max_common_length = min(len(address), len(self.__last_address))
+        while common_length < max_common_length and address[common_length] == self.__last_address[common_length]:
+            common_length += 1
+
+        units = self.__last_units[:common_length]
+        text_unit = units[-1] if len(units) > 0 else None
+        for level in range(common_length, len(address)):
+            if level == 0:
+                text_unit = self.__root_unit.get_sub_unit(index=self.__first_sub_unit_index + address[0])
+            else:
+                text_unit = text_unit.get_sub_unit(index=address[level])
+            units.append(text_unit)
+
+        self.__last_address = address
+        self.__last_units = units
+        return text_unit
+
+
+# runs in an executor process: lays out a page segment and returns addresses of units of every line of every page,
+# None if the segment doesn't fit into a book
+def _write_page_segment(char_width_dict_file: str, config: BookWritingConfig,
+                        raw_text: str) -> list[list[list[list[int]]]] | None:
+    ruler = get_ruler(char_width_dict_file=char_width_dict_file)
+    root_unit = TextRootUnit(raw_text)
+    try:
+        book = BookWriter(reader=TextUnitReader(text_unit=root_unit), ruler=ruler, config=config).write()
+    except ValueError:
+        return None
+
+    unit_addresses = _get_line_unit_addresses(root_unit=root_unit, book=book)
+    return list(map(
+        lambda page: list(map(
+            lambda line: list(map(lambda text_unit: unit_addresses[id(text_unit)], line.get_text_units())),
+            page.get_lines(),
+        )),
+        book.get_pages(),
+    ))
+
+
+# id of every unit placed into lines of the book -> its address in the root unit
+def _get_line_unit_addresses(root_unit: TextUnit, book: McBook) -> dict[int, list[int]]:
+    line_unit_ids = set()
+    for page in book.get_pages():
+        for line in page.get_lines():
+            line_unit_ids.update(map(id, line.get_text_units()))
+
+    unit_addresses = {}
+    # units of lines cover the whole text, so only their parents are visited, and they are created already
+    units_to_visit: list[tuple[TextUnit, list[int]]] = [(root_unit, [])]
+    while len(units_to_visit) > 0:
+        text_unit, address = units_to_visit.pop()
+        if id(text_unit) in line_unit_ids:
+            unit_addresses[id(text_unit)] = address
+            continue
+
+        for index, sub_unit in enumerate(text_unit.get_sub_units()):
+            units_to_visit.append((sub_unit, address + [index]))
+
+    return unit_addresses
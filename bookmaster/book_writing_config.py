@@ -4,3 +4,5 @@ from dataclasses import dataclass
 @dataclass
 class BookWritingConfig:
     allow_new_sentence_on_the_last_line: bool
+    # lay out each paragraph with OptimalParagraphLayout instead of filling lines one unit at a time
+    optimal_line_breaking: bool = False
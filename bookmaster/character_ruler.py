@@ -1,65 +1,171 @@
+import functools
+import hashlib
+import os
+import pickle
 import re
+from array import array
+from types import MappingProxyType
+from typing import Mapping
 
+from bookmaster.model.text_style import COLOR_CODES, FORMAT_CODES, split_style_runs, is_bold_after_code
 from bookmaster.model.text_unit import TextUnit
 
+try:
+    import numpy
+except ImportError:
+    # numpy is optional, get_widths measures strings one by one without it
+    numpy = None
+
+# char width file -> ruler, see get_ruler
+_rulers: dict[str, 'McCharRuler'] = {}
+
 
 class McCharRuler:
-    colors_codes = {
-        "§0": "black",
-        "§1": "dark_blue",
-        "§2": "dark_green",
-        "§3": "dark_aqua",
-        "§4": "dark_red",
-        "§5": "dark_purple",
-        "§6": "gold",
-        "§7": "gray",
-        "§8": "dark_gray",
-        "§9": "blue",
-        "§a": "green",
-        "§b": "aqua",
-        "§c": "red",
-        "§d": "light_purple",
-        "§e": "yellow",
-        "§f": "white",
-    }
-
-    formatting_codes = {
-        "§k": "obfuscated",
-        "§l": "bold",
-        "§m": "strikethrough",
-        "§n": "underline",
-        "§o": "italic",
-        "§r": "reset",
-    }
+    colors_codes = COLOR_CODES
+
+    formatting_codes = FORMAT_CODES
 
     between_chars_width = 1
 
-    char_to_width_dict: dict[str, int]
+    # bold characters are drawn twice with an offset, so each of them is wider
+    bold_extra_width = 1
 
-    def __init__(self, char_width_dict_file: str):
-        self.char_to_width_dict = McCharRuler.__read_char_to_width_dict(char_width_dict_file)
-        print(f"McCharRuler size: {len(self.char_to_width_dict)}")
+    width_cache_size = 16384
+
+    # fewer texts are measured one by one by get_widths, numpy call overhead is bigger than the gain for them
+    batch_min_texts_count = 16
 
-    def get_width(self, text: str):
-        clean_text = self.__remote_codes(text)
+    # compiled tables are kept in the __pycache__ directory next to the char width file
+    compiled_table_dir_name = '__pycache__'
+    compiled_table_format_version = 1
 
-        if len(clean_text) == 0:
-            return 0
+    char_to_width_dict: Mapping[str, int]  # read-only, rulers are shared, see get_ruler
+
+    def __init__(self, char_width_dict_file: str):
+        self.__char_width_dict_file = char_width_dict_file
+        self.char_to_width_dict = MappingProxyType(McCharRuler.__load_char_to_width_dict(char_width_dict_file))
+        self.__code_point_to_width = McCharRuler.__build_code_point_to_width_table(self.char_to_width_dict)
+        self.__get_cached_width = functools.lru_cache(maxsize=self.width_cache_size)(self.__measure_width)
+        self.__code_point_to_width_array = None
+        self.__table_version = None
+
+    # bold - the text is drawn bold from its start, e.g. after a §l code of the previous text
+    def get_width(self, text: str, bold: bool = False):
+        if bold:
+            return self.__get_cached_width(text, True)
+
+        # a single argument is its own cache key, most texts are not bold
+        return self.__get_cached_width(text)
+
+    # measures all texts at once, result is the same as [get_width(text, bold) for text, bold in zip(texts, bolds)]
+    # bolds - bold state at the start of every text, no text is bold if None
+    def get_widths(self, texts: list[str], bolds: list[bool] | None = None) -> list[int]:
+        bolds = bolds if bolds is not None else [False] * len(texts)
+
+        if numpy is None or len(texts) < self.batch_min_texts_count:
+            return list(map(self.get_width, texts, bolds))
+
+        text_widths = [0] * len(texts)
+        plain_text_indexes = []
+        for index, text in enumerate(texts):
+            if '§' in text:
+                # style of the text changes inside it, measured by style runs
+                text_widths[index] = self.get_width(text, bolds[index])
+            else:
+                plain_text_indexes.append(index)
+
+        if len(plain_text_indexes) == 0:
+            return text_widths
+
+        plain_texts = [texts[index] for index in plain_text_indexes]
+        code_points = numpy.frombuffer(''.join(plain_texts).encode('utf-32-le'), dtype=numpy.uint32)
+
+        width_array = self.__get_code_point_to_width_array()
+        known_code_points = code_points < len(width_array)
+        char_widths = numpy.full(len(code_points), -1, dtype=numpy.int64)
+        char_widths[known_code_points] = width_array[code_points[known_code_points]]
+
+        if (char_widths < 0).any():
+            missing_code_point = int(code_points[numpy.argmax(char_widths < 0)])
+            raise Exception(f'Width is missing for character \'{chr(missing_code_point)}\'')
+
+        # segmented sums: each text is a [start, end) slice of the joined code points
+        text_lengths = numpy.fromiter(map(len, plain_texts), dtype=numpy.int64, count=len(plain_texts))
+        text_ends = numpy.cumsum(text_lengths)
+        width_prefix_sums = numpy.concatenate(([0], numpy.cumsum(char_widths)))
+        plain_text_widths = width_prefix_sums[text_ends] - width_prefix_sums[text_ends - text_lengths]
+
+        plain_text_bolds = numpy.fromiter((bolds[index] for index in plain_text_indexes), dtype=bool,
+                                          count=len(plain_text_indexes))
+        all_bold_extra_widths = plain_text_bolds * text_lengths * self.bold_extra_width
+        all_spaces_widths = numpy.maximum(text_lengths - 1, 0) * self.between_chars_width
+        plain_text_widths = plain_text_widths + all_bold_extra_widths + all_spaces_widths
+
+        for index, text_width in zip(plain_text_indexes, plain_text_widths.tolist()):
+            text_widths[index] = text_width
+
+        return text_widths
+
+    # e.g. to load the same ruler in another process
+    def get_char_width_dict_file(self) -> str:
+        return self.__char_width_dict_file
+
+    # hash of the char widths, results of a layout with another table version are not valid anymore
+    def get_table_version(self) -> str:
+        if self.__table_version is None:
+            table_hash = hashlib.sha256(f"{self.between_chars_width}\t{self.bold_extra_width}".encode())
+            for char, width in sorted(self.char_to_width_dict.items()):
+                table_hash.update(f"\n{ord(char)}\t{width}".encode())
+            self.__table_version = table_hash.hexdigest()
+
+        return self.__table_version
+
+    # hits/misses/maxsize/currsize of the string -> width memo
+    def get_width_cache_info(self):
+        return self.__get_cached_width.cache_info()
+
+    def __measure_width(self, text: str, bold: bool = False) -> int:
+        if '§' not in text:
+            # a single visible run
+            text_width = self.__measure_chars_width(text)
+            if bold:
+                text_width += len(text) * self.bold_extra_width
+            return text_width + max(len(text) - 1, 0) * self.between_chars_width
 
         text_width = 0
+        visible_length = 0
 
-        for char in clean_text:
-            if char not in self.char_to_width_dict:
-                raise Exception(f'Width is missing for character \'{char}\'')
+        # visible text, code, visible text, ..., visible text
+        style_runs = split_style_runs(text)
+        for index, style_run in enumerate(style_runs):
+            if index % 2 == 1:
+                bold = is_bold_after_code(style_run, bold)
+                continue
+
+            if len(style_run) == 0:
+                continue
 
-            char_width = self.char_to_width_dict[char]
-            text_width += char_width
+            text_width += self.__measure_chars_width(style_run)
+            if bold:
+                text_width += len(style_run) * self.bold_extra_width
+            visible_length += len(style_run)
 
-        all_spaces_width = max(len(clean_text) - 1, 0) * self.between_chars_width
+        all_spaces_width = max(visible_length - 1, 0) * self.between_chars_width
         return text_width + all_spaces_width
 
+    # sum of widths of the characters without spaces between them
+    def __measure_chars_width(self, clean_text: str) -> int:
+        try:
+            return sum(map(self.__code_point_to_width.__getitem__, map(ord, clean_text)))
+        except (IndexError, TypeError):
+            # IndexError - code point is beyond the table, TypeError - code point without width (None)
+            for char in clean_text:
+                if char not in self.char_to_width_dict:
+                    raise Exception(f'Width is missing for character \'{char}\'')
+            raise
+
     def get_width_of_text_unit(self, text_unit: TextUnit) -> int:
-        return self.get_width(text=text_unit.get_raw_text())
+        return text_unit.get_width(ruler=self)
 
     def get_width_of_text_units(self, text_unit_list: list[TextUnit]) -> int:
         all_units_width = 0
@@ -70,16 +176,89 @@ class McCharRuler:
         all_spaces_width = max(len(text_unit_list) - 1, 0) * self.between_chars_width
         return all_units_width + all_spaces_width
 
-    def __remote_codes(self, text: str) -> str:
-        clean_text = text
+    def __get_code_point_to_width_array(self):
+        if self.__code_point_to_width_array is None:
+            # -1 - width is unknown
+            self.__code_point_to_width_array = numpy.array(
+                [width if width is not None else -1 for width in self.__code_point_to_width],
+                dtype=numpy.int64,
+            )
+
+        return self.__code_point_to_width_array
+
+    @staticmethod
+    def __build_code_point_to_width_table(char_to_width_dict: dict[str, int]) -> list[int | None]:
+        # list index is a character code point, None - width is unknown
+        max_code_point = max(map(ord, char_to_width_dict.keys()), default=-1)
+        code_point_to_width = [None] * (max_code_point + 1)
+        for char, width in char_to_width_dict.items():
+            code_point_to_width[ord(char)] = width
 
-        for color_code in self.colors_codes.keys():
-            clean_text = clean_text.replace(color_code, '')
+        return code_point_to_width
 
-        for formatting_code in self.formatting_codes.keys():
-            clean_text = clean_text.replace(formatting_code, '')
+    # the same as __read_char_to_width_dict, but the table compiled by a previous start is loaded if the file
+    # is not changed since then: its mtime and size are the same, or its content hash is the same
+    @staticmethod
+    def __load_char_to_width_dict(char_width_dict_file: str) -> dict[str, int]:
+        compiled_table_file = os.path.join(
+            os.path.dirname(char_width_dict_file),
+            McCharRuler.compiled_table_dir_name,
+            f"{os.path.basename(char_width_dict_file)}.table",
+        )
+        source_stat = os.stat(char_width_dict_file)
+
+        compiled_table = None
+        try:
+            with open(compiled_table_file, 'rb') as file:
+                compiled_table = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            # not compiled yet or broken, it's compiled again
+            pass
+
+        if type(compiled_table) is not dict or compiled_table.get('format') != McCharRuler.compiled_table_format_version:
+            compiled_table = None
+
+        if (compiled_table is not None and compiled_table['source_mtime_ns'] == source_stat.st_mtime_ns
+                and compiled_table['source_size'] == source_stat.st_size):
+            return McCharRuler.__get_compiled_char_to_width_dict(compiled_table)
+
+        with open(char_width_dict_file, 'rb') as file:
+            source_hash = hashlib.sha256(file.read()).hexdigest()
+
+        if compiled_table is not None and compiled_table['source_hash'] == source_hash:
+            # e.g. the file was checked out again, only its mtime is changed
+            char_to_width_dict = McCharRuler.__get_compiled_char_to_width_dict(compiled_table)
+        else:
+            char_to_width_dict = McCharRuler.__read_char_to_width_dict(char_width_dict_file)
+
+        compiled_table = {
+            'format': McCharRuler.compiled_table_format_version,
+            'source_mtime_ns': source_stat.st_mtime_ns,
+            'source_size': source_stat.st_size,
+            'source_hash': source_hash,
+            'code_points': array('I', map(ord, char_to_width_dict.keys())).tobytes(),
+            'widths': array('i', char_to_width_dict.values()).tobytes(),
+        }
+        try:
+            os.makedirs(os.path.dirname(compiled_table_file), exist_ok=True)
+            # written into a temporary file first, so other processes never read a half written table
+            temp_table_file = f"{compiled_table_file}.{os.getpid()}.tmp"
+            with open(temp_table_file, 'wb') as file:
+                pickle.dump(compiled_table, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_table_file, compiled_table_file)
+        except OSError as error:
+            # the table is compiled on every start then
+            print(f"WARNING unable to write compiled char width table '{compiled_table_file}': {error}")
 
-        return clean_text
+        return char_to_width_dict
+
+    @staticmethod
+    def __get_compiled_char_to_width_dict(compiled_table: dict) -> dict[str, int]:
+        code_points = array('I')
+        code_points.frombytes(compiled_table['code_points'])
+        widths = array('i')
+        widths.frombytes(compiled_table['widths'])
+        return dict(zip(map(chr, code_points), widths))
 
     @staticmethod
     def __read_char_to_width_dict(char_width_dict_file: str) -> dict:
@@ -137,3 +316,14 @@ class McCharRuler:
 
         # print(character)  # Output: ;
         return character
+
+
+# the ruler of the char width file, loaded once per process and shared by all its users
+def get_ruler(char_width_dict_file: str) -> McCharRuler:
+    ruler_key = os.path.abspath(char_width_dict_file)
+    ruler = _rulers.get(ruler_key)
+    if ruler is None:
+        ruler = McCharRuler(char_width_dict_file=char_width_dict_file)
+        _rulers[ruler_key] = ruler
+
+    return ruler
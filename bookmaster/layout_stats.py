@@ -0,0 +1,51 @@
+import contextlib
+import time
+from dataclasses import dataclass, field
+from typing import ContextManager
+
+
+# Counters of a layout, collected by BookWriter and text containers only if a LayoutStats object is passed to them,
+# and wall time of the stages it was measured for with measure_stage.
+@dataclass
+class LayoutStats:
+    book_append_attempts: int = 0  # McBook.try_append calls
+    page_append_attempts: int = 0  # McPage.try_append calls
+    line_append_attempts: int = 0  # McLine.try_append calls made by pages
+    deep_factor_descents: int = 0  # times a unit didn't fit and its sub units were tried instead
+    reader_walks: int = 0  # TextUnitReader.read_next and consume_next calls
+    ruler_calls: int = 0  # McCharRuler.get_width calls
+    width_cache_hits: int = 0  # McCharRuler.get_width calls answered by its width cache
+    stage_times: dict[str, float] = field(default_factory=dict)  # stage name -> seconds
+
+    @contextlib.contextmanager
+    def measure_stage(self, stage_name: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_time = time.perf_counter() - start_time
+            self.stage_times[stage_name] = self.stage_times.get(stage_name, 0.0) + elapsed_time
+
+    def get_summary(self) -> str:
+        summary_lines = [
+            'Layout stats:',
+            f"  book append attempts: {self.book_append_attempts}",
+            f"  page append attempts: {self.page_append_attempts}",
+            f"  line append attempts: {self.line_append_attempts}",
+            f"  deep factor descents: {self.deep_factor_descents}",
+            f"  reader walks: {self.reader_walks}",
+            f"  ruler calls: {self.ruler_calls}, width cache hits: {self.width_cache_hits}",
+        ]
+
+        for stage_name, stage_time in self.stage_times.items():
+            summary_lines.append(f"  {stage_name}: {stage_time * 1000:.1f} ms")
+
+        return '\n'.join(summary_lines)
+
+
+# the same as stats.measure_stage(stage_name), but nothing is measured if stats are disabled
+def measure_stage(stats: LayoutStats | None, stage_name: str) -> ContextManager:
+    if stats is None:
+        return contextlib.nullcontext()
+
+    return stats.measure_stage(stage_name)
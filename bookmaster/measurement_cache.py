@@ -0,0 +1,143 @@
+import os
+import sqlite3
+
+from bookmaster.book_writer import BookMeasurement
+from other.io_utils import make_file_dir
+
+
+# On-disk BookMeasurer results, so texts measured by previous runs are not laid out again.
+# Keys are built by BookMeasurer from everything the layout depends on.
+# Least recently used entries are removed once there are more than max_entries_count of them.
+class MeasurementCache:
+    # share of entries removed at once, so eviction doesn't run on every write
+    eviction_share = 0.1
+    # entries are counted (a full scan) on the first write of a process and then once per this many writes,
+    # so the file may have a few more than max_entries_count entries in between
+    eviction_check_puts_count = 100
+
+    # last use of entries read from the cache is written once per this many reads (and on put and close),
+    # so a read is a single SELECT and doesn't take the write lock shared by all processes
+    # (reads of a worker process that exits before a flush are lost, which only makes eviction less exact)
+    used_keys_flush_count = 100
+
+    def __init__(self, db_file: str, max_entries_count: int = 100_000):
+        self.__db_file = db_file
+        self.__max_entries_count = max_entries_count
+        # connection can't be shared with forked worker processes, each process opens its own one
+        self.__connection: sqlite3.Connection | None = None
+        self.__connection_pid: int | None = None
+        # keys read since the last flush in the order of use, see __flush_used_keys
+        self.__used_keys: list[str] = []
+        # writes of this process, see eviction_check_puts_count
+        self.__puts_count = 0
+
+    def close(self):
+        if self.__connection is not None and self.__connection_pid == os.getpid():
+            self.__flush_used_keys(connection=self.__connection)
+            self.__connection.commit()
+            self.__connection.close()
+        self.__connection = None
+        self.__connection_pid = None
+        self.__used_keys = []
+        self.__puts_count = 0
+
+    # None if the text wasn't measured yet,
+    # raises ValueError if the layout of the text failed with it
+    def get(self, key: str) -> BookMeasurement | None:
+        connection = self.__get_connection()
+        row = connection.execute(
+            'SELECT pages_count, last_page_lines_count, fits_page_limit, error FROM measurements WHERE key = ?',
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        self.__used_keys.append(key)
+        if len(self.__used_keys) >= self.used_keys_flush_count:
+            self.__flush_used_keys(connection=connection)
+            connection.commit()
+
+        pages_count, last_page_lines_count, fits_page_limit, error = row
+        if error is not None:
+            raise ValueError(error)
+
+        return BookMeasurement(
+            pages_count=pages_count,
+            last_page_lines_count=last_page_lines_count,
+            fits_page_limit=fits_page_limit != 0,
+        )
+
+    # error - message of the ValueError the layout failed with
+    def put(self, key: str, measurement: BookMeasurement | None, error: str | None = None):
+        connection = self.__get_connection()
+        # entries read before are used before this one
+        self.__flush_used_keys(connection=connection)
+        connection.execute(
+            'INSERT OR REPLACE INTO measurements '
+            '(key, pages_count, last_page_lines_count, fits_page_limit, error, last_used) VALUES (?, ?, ?, ?, ?, ?)',
+            (
+                key,
+                measurement.pages_count if measurement is not None else 0,
+                measurement.last_page_lines_count if measurement is not None else 0,
+                1 if measurement is not None and measurement.fits_page_limit else 0,
+                error,
+                self.__get_next_use(),
+            ),
+        )
+        if self.__puts_count % self.eviction_check_puts_count == 0:
+            self.__evict(connection=connection)
+        self.__puts_count += 1
+        connection.commit()
+
+    def __evict(self, connection: sqlite3.Connection):
+        entries_count = connection.execute('SELECT COUNT(*) FROM measurements').fetchone()[0]
+        if entries_count <= self.__max_entries_count:
+            return
+
+        evicted_count = entries_count - self.__max_entries_count + int(self.__max_entries_count * self.eviction_share)
+        connection.execute(
+            'DELETE FROM measurements WHERE key IN (SELECT key FROM measurements ORDER BY last_used LIMIT ?)',
+            (evicted_count,),
+        )
+
+    def __flush_used_keys(self, connection: sqlite3.Connection):
+        if len(self.__used_keys) == 0:
+            return
+
+        next_use = self.__get_next_use()
+        connection.executemany(
+            'UPDATE measurements SET last_used = ? WHERE key = ?',
+            [(next_use + index, key) for index, key in enumerate(self.__used_keys)],
+        )
+        self.__used_keys = []
+
+    def __get_next_use(self) -> int:
+        # last_used of the most recently used entry plus one, works for several processes sharing the file
+        row = self.__get_connection().execute('SELECT MAX(last_used) FROM measurements').fetchone()
+        return (row[0] or 0) + 1
+
+    def __get_connection(self) -> sqlite3.Connection:
+        if self.__connection is None or self.__connection_pid != os.getpid():
+            make_file_dir(self.__db_file)
+
+            # worker processes write to the same file, waiting for each other's locks
+            self.__connection = sqlite3.connect(self.__db_file, timeout=30)
+            # last_used updates are small writes, WAL keeps them cheap and doesn't block readers
+            self.__connection.execute('PRAGMA journal_mode=WAL')
+            self.__connection.execute('PRAGMA synchronous=NORMAL')
+            self.__connection.execute(
+                'CREATE TABLE IF NOT EXISTS measurements ('
+                'key TEXT NOT NULL PRIMARY KEY, pages_count INTEGER NOT NULL, '
+                'last_page_lines_count INTEGER NOT NULL, fits_page_limit INTEGER NOT NULL, error TEXT, '
+                'last_used INTEGER NOT NULL)'
+            )
+            self.__connection.execute(
+                'CREATE INDEX IF NOT EXISTS measurements_last_used ON measurements (last_used)'
+            )
+            self.__connection.commit()
+            self.__connection_pid = os.getpid()
+            # keys read by the parent process are flushed by it
+            self.__used_keys = []
+            self.__puts_count = 0
+
+        return self.__connection
@@ -3,6 +3,7 @@ from bookmaster.model.text_word_unit import TextWordUnit
 
 
 class TextEmptyUnit(TextWordUnit):
+    __slots__ = ()
 
     def __init__(self):
         super().__init__("")
@@ -1,19 +1,22 @@
 import re
 
 from bookmaster.model.text_sentence_unit import TextSentenceUnit
-from bookmaster.model.text_unit import TextUnit, FormatFlag
+from bookmaster.model.text_unit import TextUnit, FormatFlag, NO_FORMAT_FLAGS
 from other.utils import map_indexed
 
 
 class TextParagraphUnit(TextUnit):
+    _self_format_flags = FormatFlag.START_OF_PARAGRAPH
 
-    def __init__(self, raw_text: str, format_flags: list[FormatFlag] = None):
-        parent_format_flags = format_flags if format_flags is not None else []
-        self_format_flags = [FormatFlag.START_OF_PARAGRAPH]  # adding PARAGRAPH flag to each paragraph unit
+    __slots__ = ()
+
+    def __init__(self, raw_text: str, format_flags: FormatFlag = None):
+        parent_format_flags = format_flags if format_flags is not None else NO_FORMAT_FLAGS
+        self_format_flags = TextParagraphUnit._self_format_flags  # adding PARAGRAPH flag to each paragraph unit
 
         super().__init__(
             raw_text=raw_text,
-            format_flags=parent_format_flags + self_format_flags,
+            format_flags=parent_format_flags | self_format_flags,
         )
 
     def _create_sub_units(self, raw_text: str) -> list['TextUnit']:
@@ -24,14 +27,14 @@ class TextParagraphUnit(TextUnit):
         return sentences
 
     def __map_sub_unit(self, index: int, value: str) -> TextUnit:
-        parent_format_flags = []
+        parent_format_flags = NO_FORMAT_FLAGS
         first_sub_unit = index == 0
 
         if first_sub_unit and self.has_format_flag(FormatFlag.START_OF_PARAGRAPH):
-            parent_format_flags.append(FormatFlag.START_OF_PARAGRAPH)
+            parent_format_flags |= FormatFlag.START_OF_PARAGRAPH
 
         if first_sub_unit and self.has_format_flag(FormatFlag.REQUESTED_NEW_PAGE):
-            parent_format_flags.append(FormatFlag.REQUESTED_NEW_PAGE)
+            parent_format_flags |= FormatFlag.REQUESTED_NEW_PAGE
 
         return TextSentenceUnit(
             raw_text=value,
@@ -2,22 +2,46 @@ import re
 from dataclasses import dataclass
 
 from bookmaster.model.text_tagged_unit import TextTaggedUnit
-from bookmaster.model.text_unit import TextUnit, FormatFlag
+from bookmaster.model.text_unit import TextUnit, FormatFlag, NO_FORMAT_FLAGS, FORMAT_FLAG_TAGS
 from other.utils import map_indexed
 
 
 class TextRootUnit(TextUnit):
+    _self_format_flags = FormatFlag.IGNORE_UNIT
 
-    def __init__(self, raw_text: str, format_flags: list[FormatFlag] = None):
-        parent_format_flags = format_flags if format_flags is not None else []
-        self_format_flags = [FormatFlag.IGNORE_UNIT]
+    __slots__ = ()
+
+    def __init__(self, raw_text: str, format_flags: FormatFlag = None):
+        parent_format_flags = format_flags if format_flags is not None else NO_FORMAT_FLAGS
+        self_format_flags = TextRootUnit._self_format_flags
 
         super().__init__(
             raw_text=raw_text,
-            format_flags=parent_format_flags + self_format_flags,
+            format_flags=parent_format_flags | self_format_flags,
         )
 
     def _create_sub_units(self, raw_text: str) -> list['TextUnit']:
+        tagged_text_list = TextRootUnit.__split_tagged_texts(raw_text)
+        tagged_units = map_indexed(TextRootUnit.__map_sub_unit, tagged_text_list)
+        return tagged_units
+
+    # parts of the text which always start on a new page, so each of them can be laid out on its own:
+    # the first part and every part starting with a new page tag
+    def get_page_segments(self) -> list['TextPageSegment']:
+        new_page_tag = FORMAT_FLAG_TAGS[FormatFlag.REQUESTED_NEW_PAGE]
+
+        page_segments = []
+        for index, tagged_text in enumerate(TextRootUnit.__split_tagged_texts(self.get_source_raw_text())):
+            tagged_raw_text = ''.join(tagged_text.tags) + tagged_text.text
+            if len(page_segments) == 0 or new_page_tag in tagged_text.tags:
+                page_segments.append(TextPageSegment(first_sub_unit_index=index, raw_text=tagged_raw_text))
+            else:
+                page_segments[-1].raw_text += tagged_raw_text
+
+        return page_segments
+
+    @staticmethod
+    def __split_tagged_texts(raw_text: str) -> list['TaggedText']:
         tag_regex = r'(\{\{\$[^}]*\}\})'
 
         texts_and_tags_list = re.split(tag_regex, raw_text, flags=re.MULTILINE)
@@ -37,8 +61,7 @@ class TextRootUnit(TextUnit):
                 tagged_text_list.append(tagged_text)
                 tags = []
 
-        tagged_units = map_indexed(TextRootUnit.__map_sub_unit, tagged_text_list)
-        return tagged_units
+        return tagged_text_list
 
     @staticmethod
     def __map_sub_unit(index: int, value: 'TaggedText') -> TextUnit:
@@ -49,3 +72,9 @@ class TextRootUnit(TextUnit):
 class TaggedText:
     text: str
     tags: list[str]
+
+
+@dataclass
+class TextPageSegment:
+    first_sub_unit_index: int  # index of the segment first tagged unit in the root unit
+    raw_text: str  # TextRootUnit(raw_text) has the same tagged units as the segment
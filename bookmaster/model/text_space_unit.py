@@ -5,9 +5,11 @@ from bookmaster.model.text_word_unit import TextWordUnit
 
 
 class TextSpaceUnit(TextWordUnit):
+    __slots__ = ()
+
     __NOT_EMPTY_SPACE_CHARACTERS_REGEX_SELECTOR = r'\s+'
 
-    def __init__(self, raw_text: str, format_flags: list[FormatFlag] = None):
+    def __init__(self, raw_text: str, format_flags: FormatFlag = None):
         if not re.fullmatch(self.__NOT_EMPTY_SPACE_CHARACTERS_REGEX_SELECTOR, raw_text):
             raise Exception(
                 f"{type(self).__name__} raw_text must contains only space characters and must not be empty. "
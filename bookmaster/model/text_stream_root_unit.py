@@ -0,0 +1,256 @@
+import re
+from typing import Iterable, Iterator, Union
+
+from bookmaster.model.text_tagged_unit import TextTaggedUnit
+from bookmaster.model.text_unit import TextUnit, FormatFlag, NO_FORMAT_FLAGS, FORMAT_FLAG_TAGS
+
+# same tag selector as in TextRootUnit
+_TAG_REGEX = re.compile(r'\{\{\$[^}]*\}\}')
+
+_MAX_TAG_LENGTH = max(map(len, FORMAT_FLAG_TAGS.values()))
+
+# end of the text which may turn into a tag once the next chunk is read,
+# it's not longer than the longest known tag, so an unclosed tag doesn't keep the rest of the text in memory
+_TAG_PREFIX_REGEX = re.compile(r'\{(?:\{(?:\$[^}]{0,%d}\}?)?)?\Z' % (_MAX_TAG_LENGTH - len('{{$}}')))
+
+
+# Same as TextRootUnit, but the text is read from a file handle or any other iterator of text chunks.
+# Tagged units and their paragraphs are created on demand while the text is read,
+# units that were read already are released, so memory doesn't depend on the text size.
+class TextStreamRootUnit(TextUnit):
+    _self_format_flags = FormatFlag.IGNORE_UNIT
+
+    __slots__ = (
+        '__parser',
+        '__loaded_sub_units',
+        '__released_sub_units_count',
+        '__all_sub_units_loaded',
+    )
+
+    def __init__(self, chunks: Iterable[str], format_flags: FormatFlag = None):
+        parent_format_flags = format_flags if format_flags is not None else NO_FORMAT_FLAGS
+        self_format_flags = TextStreamRootUnit._self_format_flags
+
+        super().__init__(
+            raw_text='',
+            format_flags=parent_format_flags | self_format_flags,
+        )
+        self.__parser = _TextStreamParser(chunks=chunks)
+        self.__loaded_sub_units: list[TextStreamTaggedUnit] = []
+        self.__released_sub_units_count = 0
+        self.__all_sub_units_loaded = False
+
+    def _create_sub_units(self, raw_text: str) -> list[TextUnit]:
+        # reads the rest of the text
+        while self.__load_next_sub_unit():
+            pass
+
+        if self.__released_sub_units_count > 0:
+            raise Exception(f"{type(self).__name__} sub units were already released while reading")
+
+        return self.__loaded_sub_units
+
+    def get_sub_unit(self, index: int) -> Union[TextUnit, None]:
+        if index < self.__released_sub_units_count:
+            raise Exception(f"{type(self).__name__} sub unit {index} was already released")
+
+        while index >= self.__released_sub_units_count + len(self.__loaded_sub_units):
+            if not self.__load_next_sub_unit():
+                return None
+
+        # keeping the previous unit, it may still be referenced by the reader
+        release_count = index - 1 - self.__released_sub_units_count
+        if release_count > 0:
+            del self.__loaded_sub_units[:release_count]
+            self.__released_sub_units_count += release_count
+
+        return self.__loaded_sub_units[index - self.__released_sub_units_count]
+
+    # the source raw text is empty, the text is not read yet
+    def _may_contain_style_codes(self) -> bool:
+        return True
+
+    def __load_next_sub_unit(self) -> bool:
+        if self.__all_sub_units_loaded:
+            return False
+
+        if len(self.__loaded_sub_units) > 0:
+            # the parser is shared, the current tagged unit must read its paragraphs before the next one starts
+            self.__loaded_sub_units[-1].load_all_sub_units()
+
+        text_tags = self.__parser.read_segment_tags()
+        if text_tags is None:
+            self.__all_sub_units_loaded = True
+            return False
+
+        if self.__released_sub_units_count + len(self.__loaded_sub_units) == 0:
+            self.get_tree_stats().expanded_units_count += 1
+
+        tagged_unit = TextStreamTaggedUnit(parser=self.__parser, text_tags=text_tags)
+        self._adopt_sub_units([tagged_unit])
+        self.__loaded_sub_units.append(tagged_unit)
+        return True
+
+
+# Same as TextTaggedUnit, but the paragraphs are read from the parser of TextStreamRootUnit
+class TextStreamTaggedUnit(TextTaggedUnit):
+    __slots__ = (
+        '__parser',
+        '__loaded_sub_units',
+        '__released_sub_units_count',
+        '__all_sub_units_loaded',
+    )
+
+    def __init__(self, parser: '_TextStreamParser', format_flags: FormatFlag = None, text_tags: list[str] = None):
+        super().__init__(raw_text='', format_flags=format_flags, text_tags=text_tags)
+        self.__parser = parser
+        self.__loaded_sub_units: list[TextUnit] = []
+        self.__released_sub_units_count = 0
+        self.__all_sub_units_loaded = False
+
+    def _create_sub_units(self, raw_text: str) -> list[TextUnit]:
+        self.load_all_sub_units()
+
+        if self.__released_sub_units_count > 0:
+            raise Exception(f"{type(self).__name__} sub units were already released while reading")
+
+        return self.__loaded_sub_units
+
+    def get_sub_unit(self, index: int) -> Union[TextUnit, None]:
+        if index < self.__released_sub_units_count:
+            raise Exception(f"{type(self).__name__} sub unit {index} was already released")
+
+        while index >= self.__released_sub_units_count + len(self.__loaded_sub_units):
+            if not self.__load_next_sub_unit():
+                return None
+
+        # keeping the previous unit, it may still be referenced by the reader
+        release_count = index - 1 - self.__released_sub_units_count
+        if release_count > 0:
+            del self.__loaded_sub_units[:release_count]
+            self.__released_sub_units_count += release_count
+
+        return self.__loaded_sub_units[index - self.__released_sub_units_count]
+
+    def load_all_sub_units(self):
+        while self.__load_next_sub_unit():
+            pass
+
+    # the source raw text is empty, the style is taken from the paragraphs read so far,
+    # all of them are read before the next tagged unit starts
+    def _is_bold_at_end(self) -> bool:
+        return self._is_bold_after_adopted_sub_units()
+
+    def _may_contain_style_codes(self) -> bool:
+        return True
+
+    def __load_next_sub_unit(self) -> bool:
+        if self.__all_sub_units_loaded:
+            return False
+
+        line = self.__parser.read_segment_line()
+        if line is None:
+            self.__all_sub_units_loaded = True
+            return False
+
+        sub_unit_index = self.__released_sub_units_count + len(self.__loaded_sub_units)
+        if sub_unit_index == 0:
+            self.get_tree_stats().expanded_units_count += 1
+
+        paragraph_unit = self._map_sub_unit(index=sub_unit_index, value=line)
+        self._adopt_sub_units([paragraph_unit])
+        self.__loaded_sub_units.append(paragraph_unit)
+        return True
+
+
+# Splits text chunks into tags and lines the same way TextRootUnit and TextTaggedUnit split a whole text.
+# A segment is a group of tags followed by the lines of the text before the next tag.
+class _TextStreamParser:
+
+    def __init__(self, chunks: Iterable[str]):
+        # items: (True, tag) or (False, line)
+        self.__items = _TextStreamParser.__split_lines(_TextStreamParser.__split_tags(iter(chunks)))
+        self.__next_item: tuple[bool, str] | None = None
+
+    # tags of the next segment, None if there are no more lines in the text
+    # lines of the current segment must be read before
+    def read_segment_tags(self) -> list[str] | None:
+        text_tags = []
+        while True:
+            item = self.__peek_item()
+            if item is None:
+                # tags without a text after them are ignored
+                return None
+
+            is_tag, value = item
+            if not is_tag:
+                return text_tags
+
+            text_tags.append(value)
+            self.__next_item = None
+
+    # next line of the current segment, None if the segment is over
+    def read_segment_line(self) -> str | None:
+        item = self.__peek_item()
+        if item is None or item[0]:
+            return None
+
+        self.__next_item = None
+        return item[1]
+
+    def __peek_item(self) -> tuple[bool, str] | None:
+        if self.__next_item is None:
+            self.__next_item = next(self.__items, None)
+
+        return self.__next_item
+
+    # items: (True, tag) or (False, text), texts between two tags may come in several parts
+    @staticmethod
+    def __split_tags(chunks: Iterator[str]) -> Iterator[tuple[bool, str]]:
+        buffer = ''
+        for chunk in chunks:
+            buffer = buffer + chunk
+
+            while True:
+                tag_match = _TAG_REGEX.search(buffer)
+                if tag_match is None:
+                    break
+
+                if tag_match.start() > 0:
+                    yield False, buffer[:tag_match.start()]
+                yield True, tag_match.group()
+                buffer = buffer[tag_match.end():]
+
+            # holding back the end of the text which may be a beginning of a tag
+            tag_prefix_match = _TAG_PREFIX_REGEX.search(buffer)
+            text_end = tag_prefix_match.start() if tag_prefix_match is not None else len(buffer)
+            if text_end > 0:
+                yield False, buffer[:text_end]
+                buffer = buffer[text_end:]
+
+        if len(buffer) > 0:
+            yield False, buffer
+
+    # items: (True, tag) or (False, line without line break), the same lines as TextTaggedUnit selects
+    @staticmethod
+    def __split_lines(items: Iterator[tuple[bool, str]]) -> Iterator[tuple[bool, str]]:
+        line_parts = []
+        for is_tag, value in items:
+            if is_tag:
+                if len(line_parts) > 0:
+                    yield False, ''.join(line_parts)
+                    line_parts = []
+                yield True, value
+                continue
+
+            text_lines = value.split('\n')
+            for text_line in text_lines[:-1]:
+                line_parts.append(text_line)
+                yield False, ''.join(line_parts)
+                line_parts = []
+
+            if len(text_lines[-1]) > 0:
+                line_parts.append(text_lines[-1])
+
+        if len(line_parts) > 0:
+            yield False, ''.join(line_parts)
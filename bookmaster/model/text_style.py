@@ -0,0 +1,68 @@
+import re
+
+# § codes are kept in the text and are not visible in game
+COLOR_CODES = {
+    "§0": "black",
+    "§1": "dark_blue",
+    "§2": "dark_green",
+    "§3": "dark_aqua",
+    "§4": "dark_red",
+    "§5": "dark_purple",
+    "§6": "gold",
+    "§7": "gray",
+    "§8": "dark_gray",
+    "§9": "blue",
+    "§a": "green",
+    "§b": "aqua",
+    "§c": "red",
+    "§d": "light_purple",
+    "§e": "yellow",
+    "§f": "white",
+}
+
+FORMAT_CODES = {
+    "§k": "obfuscated",
+    "§l": "bold",
+    "§m": "strikethrough",
+    "§n": "underline",
+    "§o": "italic",
+    "§r": "reset",
+}
+
+BOLD_CODE = '§l'
+RESET_CODE = '§r'
+
+# the codes are in a group, so re.split keeps them
+_STYLE_CODE_REGEX = re.compile('(' + '|'.join(map(re.escape, list(COLOR_CODES) + list(FORMAT_CODES))) + ')')
+
+
+# style runs of the text: visible text, code, visible text, code, ..., visible text
+# e.g. 'a §lb§r' -> ['a ', '§l', 'b', '§r', '']
+def split_style_runs(text: str) -> list[str]:
+    if '§' not in text:
+        return [text]
+
+    return _STYLE_CODE_REGEX.split(text)
+
+
+# only bold changes width of the text, the other formats are drawn with the same advance
+# a color code resets the format in game as well as the reset code
+def is_bold_after_code(code: str, bold: bool) -> bool:
+    if code == BOLD_CODE:
+        return True
+
+    if code == RESET_CODE or code in COLOR_CODES:
+        return False
+
+    return bold
+
+
+# bold state after the text, if the text starts with the given one
+def is_bold_after(text: str, bold: bool) -> bool:
+    if '§' not in text:
+        return bold
+
+    for code in _STYLE_CODE_REGEX.findall(text):
+        bold = is_bold_after_code(code, bold)
+
+    return bold
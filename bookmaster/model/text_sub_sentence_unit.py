@@ -2,13 +2,18 @@ import re
 import string
 
 from bookmaster.model.text_space_unit import TextSpaceUnit
-from bookmaster.model.text_unit import TextUnit, FormatFlag
+from bookmaster.model.text_unit import TextUnit, FormatFlag, NO_FORMAT_FLAGS
 from other.utils import map_indexed, get_subarray
 from bookmaster.model.text_word_group_unit import TextWordGroupUnit
 from bookmaster.model.text_word_unit import TextWordUnit
 
 
 class TextSubSentenceUnit(TextUnit):
+    __slots__ = ()
+
+    def _merge_raw_text(self, raw_text: str) -> str:
+        # words and spaces cover the whole text, so word level units are not required to get it
+        return raw_text
 
     def _create_sub_units(self, raw_text: str) -> list['TextUnit']:
         split_regex = r'\S+|\s+'  # words and spaces selector
@@ -18,17 +23,17 @@ class TextSubSentenceUnit(TextUnit):
         return words_and_words_groups
 
     def __map_sub_unit(self, index: int, value: str) -> TextUnit:
-        parent_format_flags = []
+        parent_format_flags = NO_FORMAT_FLAGS
         first_sub_unit = index == 0
 
         if first_sub_unit and self.has_format_flag(FormatFlag.START_OF_PARAGRAPH):
-            parent_format_flags.append(FormatFlag.START_OF_PARAGRAPH)
+            parent_format_flags |= FormatFlag.START_OF_PARAGRAPH
 
         if first_sub_unit and self.has_format_flag(FormatFlag.START_OF_SENTENCE):
-            parent_format_flags.append(FormatFlag.START_OF_SENTENCE)
+            parent_format_flags |= FormatFlag.START_OF_SENTENCE
 
         if first_sub_unit and self.has_format_flag(FormatFlag.REQUESTED_NEW_PAGE):
-            parent_format_flags.append(FormatFlag.REQUESTED_NEW_PAGE)
+            parent_format_flags |= FormatFlag.REQUESTED_NEW_PAGE
 
         if len(value.strip()) == 0:
             return TextSpaceUnit(
@@ -67,7 +72,7 @@ class TextSubSentenceUnit(TextUnit):
                 # merge "<word><space><!?>>" into single word
                 word_unit = TextWordUnit(
                     raw_text=''.join(map(lambda unit: unit.get_raw_text(), word_group)),
-                    format_flags=word_group[0].get_format_flags(),  # take format flags from the first word
+                    format_flags=word_group[0].get_format_flag_mask(),  # take format flags from the first word
                 )
                 words_and_word_pairs.append(word_unit)
                 group_index = group_index + group_size
@@ -1,20 +1,24 @@
 import re
 
 from bookmaster.model.text_paragraph_unit import TextParagraphUnit
-from bookmaster.model.text_unit import TextUnit, FormatFlag, FORMAT_FLAG_TAGS
+from bookmaster.model.text_unit import TextUnit, FormatFlag, FORMAT_FLAG_TAGS, NO_FORMAT_FLAGS
 from other.utils import map_indexed
 
 
 # Contains tags and text segment
 class TextTaggedUnit(TextUnit):
+    # flags of the text tags and IGNORE_UNIT
+    _self_format_flags = FormatFlag.REQUESTED_NEW_PAGE | FormatFlag.IGNORE_UNIT
 
-    def __init__(self, raw_text: str, format_flags: list[FormatFlag] = None, text_tags: list[str] = None):
-        parent_format_flags = format_flags if format_flags is not None else []
-        self_format_flags = TextTaggedUnit.__get_format_flag_list(text_tags)
+    __slots__ = ('__text_tags',)
+
+    def __init__(self, raw_text: str, format_flags: FormatFlag = None, text_tags: list[str] = None):
+        parent_format_flags = format_flags if format_flags is not None else NO_FORMAT_FLAGS
+        self_format_flags = TextTaggedUnit.__get_format_flags(text_tags)
 
         super().__init__(
             raw_text=raw_text,
-            format_flags=parent_format_flags + self_format_flags,
+            format_flags=parent_format_flags | self_format_flags,
         )
         self.__text_tags = text_tags
 
@@ -22,15 +26,15 @@ class TextTaggedUnit(TextUnit):
         # paragraphs selector: empty and not
         split_regex = r'.+\n|.+|\n'
         paragraphs = re.findall(split_regex, raw_text)
-        paragraphs = map_indexed(self.__map_sub_unit, paragraphs)
+        paragraphs = map_indexed(self._map_sub_unit, paragraphs)
         return paragraphs
 
-    def __map_sub_unit(self, index: int, value: str) -> TextUnit:
-        parent_format_flags = []
+    def _map_sub_unit(self, index: int, value: str) -> TextUnit:
+        parent_format_flags = NO_FORMAT_FLAGS
         first_sub_unit = index == 0
 
         if first_sub_unit and self.has_format_flag(FormatFlag.REQUESTED_NEW_PAGE):
-            parent_format_flags.append(FormatFlag.REQUESTED_NEW_PAGE)
+            parent_format_flags |= FormatFlag.REQUESTED_NEW_PAGE
 
         return TextParagraphUnit(
             raw_text=value.replace('\n', ''),
@@ -38,12 +42,13 @@ class TextTaggedUnit(TextUnit):
         )
 
     @staticmethod
-    def __get_format_flag_list(text_tag_list: list[str]) -> list[FormatFlag]:
+    def __get_format_flags(text_tag_list: list[str]) -> FormatFlag:
         text_tag_list = text_tag_list if text_tag_list is not None else []
 
-        format_flags = []
-        format_flags = format_flags + list(map(TextTaggedUnit.__get_format_flag_by_text_tag, text_tag_list))
-        format_flags.append(FormatFlag.IGNORE_UNIT)
+        format_flags = NO_FORMAT_FLAGS
+        for text_tag in text_tag_list:
+            format_flags |= TextTaggedUnit.__get_format_flag_by_text_tag(text_tag)
+        format_flags |= FormatFlag.IGNORE_UNIT
 
         return format_flags
 
@@ -1,31 +1,113 @@
-from enum import Enum
-from typing import List, Union
+from dataclasses import dataclass
+from enum import IntFlag
+from typing import List, Union, TYPE_CHECKING
 from abc import ABC, abstractmethod
 
+from bookmaster.model.text_style import is_bold_after
 
-class FormatFlag(Enum):
-    START_OF_PARAGRAPH = 'START_OF_PARAGRAPH'
-    START_OF_SENTENCE = 'START_OF_SENTENCE'
-    REQUESTED_NEW_PAGE = 'START_OF_PAGE'
-    IGNORE_UNIT = 'IGNORE_UNIT'  # do not allow to add exactly this unit (sub units are allowed)
+if TYPE_CHECKING:
+    from bookmaster.character_ruler import McCharRuler
 
 
+# flags of a unit are combined into a single bitmask, e.g. START_OF_PARAGRAPH | START_OF_SENTENCE
+class FormatFlag(IntFlag):
+    START_OF_PARAGRAPH = 1
+    START_OF_SENTENCE = 2
+    REQUESTED_NEW_PAGE = 4
+    IGNORE_UNIT = 8  # do not allow to add exactly this unit (sub units are allowed)
+
+
+NO_FORMAT_FLAGS = FormatFlag(0)
+
 FORMAT_FLAG_TAGS = {
     FormatFlag.REQUESTED_NEW_PAGE: '{{$new_page}}',
 }
 
+# names used in exported unit dictionaries
+FORMAT_FLAG_VALUES = {
+    FormatFlag.START_OF_PARAGRAPH: 'START_OF_PARAGRAPH',
+    FormatFlag.START_OF_SENTENCE: 'START_OF_SENTENCE',
+    FormatFlag.REQUESTED_NEW_PAGE: 'START_OF_PAGE',
+    FormatFlag.IGNORE_UNIT: 'IGNORE_UNIT',
+}
+
+# order in which units pass flags to their sub units, see _map_sub_unit of the units
+_INHERITED_FORMAT_FLAG_ORDER = [
+    FormatFlag.START_OF_PARAGRAPH,
+    FormatFlag.START_OF_SENTENCE,
+    FormatFlag.REQUESTED_NEW_PAGE,
+    FormatFlag.IGNORE_UNIT,
+]
+
+# (bitmask, flags of the unit itself) -> list of single flags, there are only a few combinations in use
+_format_flag_lists: dict[tuple[FormatFlag, FormatFlag], list[FormatFlag]] = {}
+
+
+# flags in the order they were added to the unit: inherited from the parent unit first, then flags of the unit itself
+def get_format_flag_list(format_flags: FormatFlag, self_format_flags: FormatFlag = None) -> list[FormatFlag]:
+    self_format_flags = self_format_flags if self_format_flags is not None else NO_FORMAT_FLAGS
+
+    format_flag_list = _format_flag_lists.get((format_flags, self_format_flags))
+    if format_flag_list is None:
+        inherited_format_flags = format_flags & ~self_format_flags
+        format_flag_list = [format_flag for format_flag in _INHERITED_FORMAT_FLAG_ORDER
+                            if format_flag in inherited_format_flags]
+        format_flag_list += [format_flag for format_flag in FormatFlag
+                             if format_flag in format_flags & self_format_flags]
+        _format_flag_lists[(format_flags, self_format_flags)] = format_flag_list
+
+    return list(format_flag_list)
+
+
+@dataclass
+class TextUnitTreeStats:
+    built_units_count: int = 1  # units created in the tree, including the root unit
+    expanded_units_count: int = 0  # units whose sub units were created
+
 
 class TextUnit(ABC):
+    # flags every unit of the class adds to the flags of its parent, they go last in get_format_flags
+    _self_format_flags: FormatFlag = NO_FORMAT_FLAGS
+
+    __slots__ = (
+        '__format_flags',
+        '__source_raw_text',
+        '__sub_units',
+        '__tree_stats',
+        '__bold_at_start',
+        '__last_adopted_sub_unit',
+        '__merged_raw_text',
+        '__width_ruler',
+        '__width_px',
+        '__fits_width_key',
+        '__fits_width',
+    )
 
-    def __init__(self, raw_text: str, format_flags: list[FormatFlag] = None):
+    def __init__(self, raw_text: str, format_flags: FormatFlag = None):
         if format_flags is None:
-            format_flags = []
+            format_flags = NO_FORMAT_FLAGS
+
+        self.__format_flags: FormatFlag = format_flags
+
+        # sub units are created on the first access, see get_sub_units
+        self.__source_raw_text: str = raw_text
+        self.__sub_units: list[TextUnit] | None = None
+        self.__tree_stats: TextUnitTreeStats | None = None
 
-        self.__format_flags: list[FormatFlag] = format_flags
-        self.__sub_units: list[TextUnit] = self._create_sub_units(raw_text=raw_text)
+        # § codes of the previous units, see _adopt_sub_units
+        self.__bold_at_start = False
+        self.__last_adopted_sub_unit: TextUnit | None = None
+
+        # units are never changed after creation, so text and measurements are cached on the node
+        self.__merged_raw_text: str | None = None
+        self.__width_ruler: Union['McCharRuler', None] = None
+        self.__width_px = 0
+        self.__fits_width_key: tuple['McCharRuler', int] | None = None
+        self.__fits_width = False
 
     def __str__(self):
-        return f"{type(self).__name__}({self.__sub_units if self.__sub_units else self.get_raw_text()})"
+        sub_units = self.get_sub_units()
+        return f"{type(self).__name__}({sub_units if sub_units else self.get_raw_text()})"
 
     def __repr__(self):
         return str(self)
@@ -34,19 +116,129 @@ class TextUnit(ABC):
     def _create_sub_units(self, raw_text: str) -> list['TextUnit']:
         pass
 
+    # raw text of the unit if it would be merged from sub units,
+    # override when it can be built without creating sub units
+    def _merge_raw_text(self, raw_text: str) -> str:
+        sub_unit_text_list = list(map(lambda unit: unit.get_raw_text(), self.get_sub_units()))
+        return ''.join(sub_unit_text_list)
+
+    # links just created sub units to the tree of this unit
+    # and passes the style on: every sub unit starts with the style the previous one ends with
+    def _adopt_sub_units(self, sub_units: list['TextUnit']):
+        tree_stats = self.get_tree_stats()
+        tree_stats.built_units_count += len(sub_units)
+
+        bold = self._is_bold_after_adopted_sub_units()
+        if not bold and not self._may_contain_style_codes():
+            # plain text, sub units keep the default style
+            for sub_unit in sub_units:
+                sub_unit.__tree_stats = tree_stats
+            return
+
+        for sub_unit in sub_units:
+            sub_unit.__tree_stats = tree_stats
+
+            if sub_unit.has_format_flag(FormatFlag.REQUESTED_NEW_PAGE):
+                # a page starts without any format in game
+                bold = False
+            sub_unit.__bold_at_start = bold
+            bold = sub_unit._is_bold_at_end()
+
+        if len(sub_units) > 0:
+            self.__last_adopted_sub_unit = sub_units[-1]
+
+    # False if none of the sub units has § codes, override if sub units are not created from the source raw text
+    def _may_contain_style_codes(self) -> bool:
+        return '§' in self.__source_raw_text
+
+    # style after the unit, override if sub units are not created from the source raw text
+    def _is_bold_at_end(self) -> bool:
+        return is_bold_after(self.__source_raw_text, self.__bold_at_start)
+
+    def _is_bold_after_adopted_sub_units(self) -> bool:
+        if self.__last_adopted_sub_unit is None:
+            return self.__bold_at_start
+
+        # the last sub unit may still be read, e.g. paragraphs of a stream tagged unit
+        return self.__last_adopted_sub_unit._is_bold_at_end()
+
     def get_sub_units(self) -> list['TextUnit']:
+        if self.__sub_units is None:
+            self.__sub_units = self._create_sub_units(raw_text=self.__source_raw_text)
+            self.get_tree_stats().expanded_units_count += 1
+            self._adopt_sub_units(self.__sub_units)
+
         return self.__sub_units
 
+    # None if there is no sub unit with such index
+    def get_sub_unit(self, index: int) -> Union['TextUnit', None]:
+        sub_units = self.get_sub_units()
+        return sub_units[index] if index < len(sub_units) else None
+
+    # counters shared by all units of the tree this unit belongs to
+    def get_tree_stats(self) -> TextUnitTreeStats:
+        if self.__tree_stats is None:
+            # unit is a root of a new tree
+            self.__tree_stats = TextUnitTreeStats()
+
+        return self.__tree_stats
+
+    # text the unit was created from, sub units are built from it and the format flags only
+    def get_source_raw_text(self) -> str:
+        return self.__source_raw_text
+
     def get_raw_text(self) -> str:
-        sub_unit_text_list = list(map(lambda unit: unit.get_raw_text(), self.__sub_units))
-        merged_sub_unit_text = ''.join(sub_unit_text_list)
-        return merged_sub_unit_text
+        if self.__merged_raw_text is None:
+            self.__merged_raw_text = self._merge_raw_text(raw_text=self.__source_raw_text)
+
+        return self.__merged_raw_text
+
+    # True if the text of the unit is drawn bold from its start because of § codes of the previous units
+    def is_bold_at_start(self) -> bool:
+        return self.__bold_at_start
+
+    # width of the unit raw text in pixels, measured once per ruler
+    def get_width(self, ruler: 'McCharRuler') -> int:
+        if self.__width_ruler is not ruler:
+            self.__width_px = ruler.get_width(text=self.get_raw_text(), bold=self.__bold_at_start)
+            self.__width_ruler = ruler
+
+        return self.__width_px
+
+    # widths of all units, the same as [text_unit.get_width(ruler) for text_unit in text_units],
+    # but the units which are not measured yet are measured at once, see McCharRuler.get_widths
+    @staticmethod
+    def get_widths(text_units: list['TextUnit'], ruler: 'McCharRuler') -> list[int]:
+        units_to_measure = [text_unit for text_unit in text_units if text_unit.__width_ruler is not ruler]
+        if len(units_to_measure) > 0:
+            unit_widths = ruler.get_widths(
+                texts=[text_unit.get_raw_text() for text_unit in units_to_measure],
+                bolds=[text_unit.__bold_at_start for text_unit in units_to_measure],
+            )
+            for text_unit, unit_width in zip(units_to_measure, unit_widths):
+                text_unit.__width_px = unit_width
+                text_unit.__width_ruler = ruler
+
+        return [text_unit.__width_px for text_unit in text_units]
+
+    # True if the unit fits into an empty line of max_width_px, checked once per ruler and width
+    def fits_width(self, ruler: 'McCharRuler', max_width_px: int) -> bool:
+        fits_width_key = (ruler, max_width_px)
+        if self.__fits_width_key != fits_width_key:
+            self.__fits_width = self.get_width(ruler=ruler) <= max_width_px
+            self.__fits_width_key = fits_width_key
+
+        return self.__fits_width
 
     def get_format_flags(self) -> list[FormatFlag]:
+        return get_format_flag_list(self.__format_flags, self._self_format_flags)
+
+    def get_format_flag_mask(self) -> FormatFlag:
         return self.__format_flags
 
     def has_format_flag(self, format_flag: FormatFlag) -> bool:
-        return format_flag in self.get_format_flags()
+        # plain int operation, IntFlag operators create a new flag object on each call
+        return int.__and__(self.__format_flags, format_flag) != 0
 
     # address = [] - leads to self
     # address = [0] - leads to first sub-unit
@@ -56,9 +248,8 @@ class TextUnit(ABC):
         if len(address) == 0:
             return self
 
-        sub_unit_index = address[0]
-        if sub_unit_index < len(self.get_sub_units()):
-            sub_unit = self.get_sub_units()[sub_unit_index]
+        sub_unit = self.get_sub_unit(index=address[0])
+        if sub_unit is not None:
             return sub_unit.get_by_address(address=address[1:])
         else:
             return None
@@ -67,7 +258,7 @@ class TextUnit(ABC):
         result_dict = {
             'type': type(self).__name__,
             'raw_text': self.get_raw_text(),
-            'format_flags': list(map(lambda enum_item: enum_item.value, self.get_format_flags())),
+            'format_flags': list(map(lambda format_flag: FORMAT_FLAG_VALUES[format_flag], self.get_format_flags())),
         }
 
         sub_dict_list = list(map(lambda sub_unit: sub_unit.get_dict(), self.get_sub_units()))
@@ -0,0 +1,147 @@
+from bookmaster.book_writing_config import BookWritingConfig
+from bookmaster.character_ruler import McCharRuler
+from bookmaster.model.text_paragraph_unit import TextParagraphUnit
+from bookmaster.model.text_sentence_unit import TextSentenceUnit
+from bookmaster.model.text_sub_sentence_unit import TextSubSentenceUnit
+from bookmaster.model.text_unit import TextUnit, FormatFlag
+from bookmaster.model.text_word_group_unit import TextWordGroupUnit
+from bookmaster.text_container import McLine, McPage
+
+
+# Splits a paragraph into lines with dynamic programming (Knuth–Plass style) instead of filling lines greedily.
+# The layout has the least number of lines, and among them the least raggedness:
+# sum of squared free space of every line but the last one, plus penalties for breaking sentences.
+class OptimalParagraphLayout:
+    # extra cost of a line break inside a sub-sentence and between sub-sentences of a sentence,
+    # line breaks between sentences are free
+    word_break_penalty = 400
+    sub_sentence_break_penalty = 100
+
+    # layouts with more lines than the shortest one are kept only to satisfy the last line rule
+    max_extra_lines = 2
+
+    def __init__(self, ruler: McCharRuler, writing_config: BookWritingConfig):
+        self.__ruler = ruler
+        self.__writing_config = writing_config
+
+    # returns text units of every line, None if some unit doesn't fit even into an empty line
+    # first_line_index - index of the paragraph first line on its page
+    def layout(self, paragraph: TextParagraphUnit, first_line_index: int) -> list[list[TextUnit]] | None:
+        atoms, break_penalties, sentence_start_ends = self.__split_to_atoms(paragraph=paragraph)
+        atoms_count = len(atoms)
+
+        # prefix_widths[i] - width of the first i atoms without spaces between them
+        prefix_widths = [0]
+        for atom in atoms:
+            prefix_widths.append(prefix_widths[-1] + atom.get_width(ruler=self.__ruler))
+
+        between_units_width = self.__ruler.between_chars_width
+        max_width_px = McLine.max_width_px
+        max_line_number = McPage.max_line_number
+        check_last_line = not self.__writing_config.allow_new_sentence_on_the_last_line
+
+        # states[j]: lines count -> (cost, previous break index, previous lines count)
+        # for layouts of the first j atoms
+        states: list[dict[int, tuple[int, int, int]]] = [{} for _ in range(atoms_count + 1)]
+        states[0][0] = (0, -1, -1)
+
+        for line_end in range(1, atoms_count + 1):
+            line_end_states = states[line_end]
+            required_line_end = 0
+
+            for line_start in range(line_end - 1, -1, -1):
+                line_width = (prefix_widths[line_end] - prefix_widths[line_start]
+                              + (line_end - line_start - 1) * between_units_width)
+                if line_width > max_width_px:
+                    # longer lines won't fit either
+                    break
+
+                # the first sub-sentence of a sentence must be whole if the sentence starts on the page last line
+                required_line_end = max(required_line_end, sentence_start_ends[line_start])
+
+                if line_end == atoms_count:
+                    line_cost = 0
+                else:
+                    line_cost = (max_width_px - line_width) ** 2 + break_penalties[line_end]
+
+                for lines_count, (cost, _, _) in states[line_start].items():
+                    page_last_line = (first_line_index + lines_count) % max_line_number == max_line_number - 1
+                    if check_last_line and page_last_line and required_line_end > line_end:
+                        continue
+
+                    new_cost = cost + line_cost
+                    best_state = line_end_states.get(lines_count + 1)
+                    if best_state is None or new_cost < best_state[0]:
+                        line_end_states[lines_count + 1] = (new_cost, line_start, lines_count)
+
+            if len(line_end_states) > 0:
+                min_lines_count = min(line_end_states.keys())
+                for lines_count in list(line_end_states.keys()):
+                    if lines_count > min_lines_count + self.max_extra_lines:
+                        del line_end_states[lines_count]
+
+        if len(states[atoms_count]) == 0:
+            return None
+
+        # going back through the chosen line breaks
+        lines = []
+        line_end = atoms_count
+        lines_count = min(states[atoms_count].keys())
+        while line_end > 0:
+            _, line_start, previous_lines_count = states[line_end][lines_count]
+            lines.append(atoms[line_start:line_end])
+            line_end = line_start
+            lines_count = previous_lines_count
+
+        lines.reverse()
+        return lines
+
+    # atoms are the smallest units a line may be broken between: words, spaces and word groups,
+    # returns atoms, break penalties before each atom and, for the first atom of a sentence,
+    # the index after the end of the sentence first sub-sentence (0 for other atoms)
+    def __split_to_atoms(self, paragraph: TextParagraphUnit) -> tuple[list[TextUnit], list[int], list[int]]:
+        atoms = []
+        break_penalties = []
+        sentence_start_ends = []
+
+        if len(paragraph.get_sub_units()) == 0:
+            # empty paragraph takes an empty line
+            return [paragraph], [0], [0]
+
+        for sentence in paragraph.get_sub_units():
+            sentence_start_index = len(atoms)
+            sub_sentences = sentence.get_sub_units() if type(sentence) is TextSentenceUnit else []
+
+            if len(sub_sentences) == 0:
+                atoms.append(sentence)
+                break_penalties.append(0)
+                sentence_start_ends.append(0)
+                continue
+
+            for sub_sentence_index, sub_sentence in enumerate(sub_sentences):
+                sub_sentence_start_index = len(atoms)
+                words = sub_sentence.get_sub_units() if type(sub_sentence) is TextSubSentenceUnit else []
+
+                for word in words if len(words) > 0 else [sub_sentence]:
+                    atoms.extend(self.__split_word_to_atoms(word=word))
+
+                for atom_index in range(sub_sentence_start_index, len(atoms)):
+                    if atom_index == sentence_start_index:
+                        break_penalties.append(0)
+                    elif atom_index == sub_sentence_start_index:
+                        break_penalties.append(self.sub_sentence_break_penalty)
+                    else:
+                        break_penalties.append(self.word_break_penalty)
+
+                    start_of_sentence = atoms[atom_index].has_format_flag(FormatFlag.START_OF_SENTENCE)
+                    sentence_start_ends.append(len(atoms) if start_of_sentence else 0)
+
+        return atoms, break_penalties, sentence_start_ends
+
+    def __split_word_to_atoms(self, word: TextUnit) -> list[TextUnit]:
+        if type(word) is TextWordGroupUnit and not word.fits_width(ruler=self.__ruler,
+                                                                    max_width_px=McLine.max_width_px):
+            # the same as the greedy layout does, words of the group may be placed on different lines
+            return word.get_sub_units()
+
+        return [word]
@@ -1,36 +1,39 @@
-import copy
-
 from bookmaster.book_writing_config import BookWritingConfig
 from bookmaster.character_ruler import McCharRuler
+from bookmaster.layout_stats import LayoutStats
 from bookmaster.model.text_sentence_unit import TextSentenceUnit
 from bookmaster.model.text_sub_sentence_unit import TextSubSentenceUnit
 from bookmaster.model.text_unit import TextUnit, FormatFlag
 
 
 class McLine:
+    max_width_px = 114
 
     def __init__(self, ruler: McCharRuler, writing_config: BookWritingConfig):
         super().__init__()
 
         self.__text_units = []
+        self.__width_px = 0  # running width of the line, same as ruler.get_width_of_text_units(self.__text_units)
         self.__writing_config = writing_config
-        self.__max_width_px = 114
+        self.__max_width_px = McLine.max_width_px
         self.__ruler = ruler
 
-    def __can_append(self, text_unit: TextUnit) -> bool:
-        # use temporary object to check if text will fit after merging
-        temp_line = copy.deepcopy(self)
-        temp_line.__append(text_unit)
-        merged_text_width_px = self.__ruler.get_width_of_text_units(temp_line.get_text_units())
+    def __get_merged_width(self, text_unit: TextUnit) -> int:
+        # width of the line if the text unit is appended, without measuring existing units again
+        unit_width_px = self.__ruler.get_width_of_text_unit(text_unit=text_unit)
+        if len(self.__text_units) == 0:
+            return unit_width_px
 
-        return merged_text_width_px <= self.__max_width_px
+        return self.__width_px + self.__ruler.between_chars_width + unit_width_px
 
-    def __append(self, text_unit: TextUnit):
+    def __append(self, text_unit: TextUnit, merged_width_px: int):
         self.__text_units.append(text_unit)
+        self.__width_px = merged_width_px
 
     def try_append(self, text_unit: TextUnit) -> bool:
-        if self.__can_append(text_unit=text_unit):
-            self.__append(text_unit=text_unit)
+        merged_width_px = self.__get_merged_width(text_unit=text_unit)
+        if merged_width_px <= self.__max_width_px:
+            self.__append(text_unit=text_unit, merged_width_px=merged_width_px)
             return True
         else:
             return False
@@ -54,16 +57,21 @@ class McLine:
     def get_text_units(self) -> list[TextUnit]:
         return self.__text_units
 
+    def get_width(self) -> int:
+        return self.__width_px
+
 
 class McPage:
+    max_line_number = 14
 
-    def __init__(self, ruler: McCharRuler, writing_config: BookWritingConfig):
+    def __init__(self, ruler: McCharRuler, writing_config: BookWritingConfig, stats: LayoutStats | None = None):
         super().__init__()
 
         self.__writing_config = writing_config
         self.__lines: list[McLine] = []
-        self.__max_line_number = 14
+        self.__max_line_number = McPage.max_line_number
         self.__ruler = ruler
+        self.__stats = stats
 
     def try_append(self, text_unit: TextUnit) -> bool:
         if not self.is_config_allow(text_unit):
@@ -75,6 +83,8 @@ class McPage:
             # page not empty, trying to append to the last existing line
             last_line = self.__lines[len(self.__lines) - 1]
 
+            if self.__stats is not None:
+                self.__stats.line_append_attempts += 1
             if last_line.try_append(text_unit):
                 # text unit fits into the last existing line
                 return True
@@ -83,6 +93,8 @@ class McPage:
             # page is not full, adding a new line
             new_line = McLine(ruler=self.__ruler, writing_config=self.__writing_config)
 
+            if self.__stats is not None:
+                self.__stats.line_append_attempts += 1
             if new_line.try_append(text_unit):
                 # text was added into the new line
                 # adding line to the page
@@ -94,6 +106,22 @@ class McPage:
 
         return False
 
+    # adds the text units as a new line, line breaking rules must be checked by the caller
+    def try_append_line(self, text_units: list[TextUnit]) -> bool:
+        if len(self.__lines) >= self.__max_line_number:
+            return False
+
+        new_line = McLine(ruler=self.__ruler, writing_config=self.__writing_config)
+        for text_unit in text_units:
+            if self.__stats is not None:
+                self.__stats.line_append_attempts += 1
+            if not new_line.try_append(text_unit):
+                # text not fit into the line
+                return False
+
+        self.__lines.append(new_line)
+        return True
+
     def is_config_allow(self, text_unit: TextUnit) -> bool:
         last_line_exist = len(self.__lines) == self.__max_line_number
         adding_last_line = len(self.__lines) == self.__max_line_number - 1
@@ -121,15 +149,18 @@ class McPage:
 
 
 class McBook:
+    max_page_number = 100
 
-    def __init__(self, ruler: McCharRuler, writing_config: BookWritingConfig):
+    def __init__(self, ruler: McCharRuler, writing_config: BookWritingConfig, stats: LayoutStats | None = None):
         super().__init__()
 
         self.__writing_config = writing_config
         self.__title = None
         self.__pages: list[McPage] = []
-        self.__max_page_number = 100
+        self.__popped_pages_count = 0  # pages which were already taken out of the book, see pop_pages
+        self.__max_page_number = McBook.max_page_number
         self.__ruler = ruler
+        self.__stats = stats
 
     def set_title(self, title: str):
         self.__title = title
@@ -141,20 +172,28 @@ class McBook:
         if text_unit.has_format_flag(FormatFlag.IGNORE_UNIT):
             return False
 
+        if not text_unit.fits_width(ruler=self.__ruler, max_width_px=McLine.max_width_px):
+            # text unit doesn't fit even into an empty line
+            return False
+
         new_page_required = text_unit.has_format_flag(FormatFlag.REQUESTED_NEW_PAGE)
 
         if len(self.__pages) > 0 and not new_page_required:
             # attempt to append to the last existing page
             last_page = self.__pages[len(self.__pages) - 1]
 
+            if self.__stats is not None:
+                self.__stats.page_append_attempts += 1
             if last_page.try_append(text_unit):
                 # text unit fits into the last existing page
                 return True
 
-        if len(self.__pages) < self.__max_page_number:
+        if self.get_pages_count() < self.__max_page_number:
             # book is not full, adding a new page
-            new_page = McPage(ruler=self.__ruler, writing_config=self.__writing_config)
+            new_page = McPage(ruler=self.__ruler, writing_config=self.__writing_config, stats=self.__stats)
 
+            if self.__stats is not None:
+                self.__stats.page_append_attempts += 1
             if new_page.try_append(text_unit):
                 # text was added into the new page
                 # adding page to the book
@@ -166,11 +205,83 @@ class McBook:
 
         return False
 
+    # adds the text units as a new line to the last page or to a new page if it's full
+    def try_append_line(self, text_units: list[TextUnit]) -> bool:
+        new_page_required = len(text_units) > 0 and text_units[0].has_format_flag(FormatFlag.REQUESTED_NEW_PAGE)
+
+        if len(self.__pages) > 0 and not new_page_required:
+            # attempt to append to the last existing page
+            last_page = self.__pages[len(self.__pages) - 1]
+
+            if last_page.try_append_line(text_units):
+                return True
+
+        if self.get_pages_count() < self.__max_page_number:
+            # book is not full, adding a new page
+            new_page = McPage(ruler=self.__ruler, writing_config=self.__writing_config, stats=self.__stats)
+
+            if new_page.try_append_line(text_units):
+                self.__pages.append(new_page)
+                return True
+
+        return False
+
+    # adds a new page with the given lines, e.g. laid out by another BookWriter
+    # line breaking and page breaking rules must be checked by the caller
+    def try_append_page(self, lines: list[list[TextUnit]]) -> bool:
+        if self.get_pages_count() >= self.__max_page_number:
+            return False
+
+        new_page = McPage(ruler=self.__ruler, writing_config=self.__writing_config, stats=self.__stats)
+        for line_text_units in lines:
+            if not new_page.try_append_line(line_text_units):
+                return False
+
+        self.__pages.append(new_page)
+        return True
+
+    # adds a page written into another book, e.g. by a resumed layout
+    def try_append_written_page(self, page: McPage) -> bool:
+        if self.get_pages_count() >= self.__max_page_number:
+            return False
+
+        self.__pages.append(page)
+        return True
+
+    # pages which are still in the book, see pop_pages
     def get_pages(self) -> list[McPage]:
         return self.__pages
 
+    # number of written pages, including popped ones
+    def get_pages_count(self) -> int:
+        return self.__popped_pages_count + len(self.__pages)
+
+    # takes written pages out of the book
+    # keep_last_page=True leaves the last page in the book, so text can still be added to it
+    def pop_pages(self, keep_last_page: bool) -> list[McPage]:
+        popped_pages_number = len(self.__pages) - 1 if keep_last_page else len(self.__pages)
+        if popped_pages_number <= 0:
+            return []
+
+        popped_pages = self.__pages[:popped_pages_number]
+        self.__pages = self.__pages[popped_pages_number:]
+        self.__popped_pages_count += popped_pages_number
+        return popped_pages
+
+    # counts pages written elsewhere, e.g. reused from a previous layout, as popped ones,
+    # so the page limit of the book is the same as if they were written into it
+    def skip_pages(self, pages_count: int):
+        if len(self.__pages) > 0:
+            raise Exception('Pages can be skipped only before writing into the book')
+
+        self.__popped_pages_count += pages_count
+
     def get_page(self, index: int) -> McPage | None:
         if index < 0 or index >= self.__max_page_number:
             raise Exception(f'Page index is out of border. Available range 0<=index<{self.__max_page_number}')
 
+        if index < self.__popped_pages_count:
+            raise Exception(f'Page {index} was already popped out of the book')
+
+        index = index - self.__popped_pages_count
         return self.__pages[index] if index < len(self.__pages) else None
@@ -6,30 +6,46 @@ class TextUnitReader:
 
     def __init__(self, text_unit: TextUnit):
         self.__text_unit = text_unit
-        self.__read_address = []
+        # path from the root to the read unit, each frame is (parent unit, index of the sub unit)
+        # empty stack leads to the root unit itself
+        self.__read_stack: list[tuple[TextUnit, int]] = []
         self.__reading_complete = False
 
-    def __get_next_available_address_recursively(self, text_unit: TextUnit, address: list[int]) -> list[int] | None:
-        if len(address) == 0:
-            return None
+    def __get_read_unit(self) -> TextUnit:
+        if len(self.__read_stack) == 0:
+            return self.__text_unit
 
-        last_address_index = len(address) - 1
-        last_address_value = address[last_address_index]
+        parent_unit, sub_unit_index = self.__read_stack[-1]
+        return parent_unit.get_sub_unit(index=sub_unit_index)
 
-        next_address = address
-        next_address[last_address_index] = last_address_value + 1
+    # goes deep_factor levels down through the first sub units, None if there is no such unit
+    def __scale_read_unit(self, deep_factor: int = 0) -> TextUnit | None:
+        text_unit = self.__get_read_unit()
+        for _ in range(deep_factor):
+            text_unit = text_unit.get_sub_unit(index=0)
+            if text_unit is None:
+                return None
 
-        unit_by_next_address = text_unit.get_by_address(next_address)
-        if unit_by_next_address is not None:
-            return next_address
-        else:
-            return self.__get_next_available_address_recursively(text_unit, address[:len(address) - 1])
+        return text_unit
 
-    def __get_next_available_address(self, address: list[int]) -> list[int] | None:
-        return self.__get_next_available_address_recursively(text_unit=self.__text_unit, address=address)
+    def __move_to_next_available_unit(self):
+        while len(self.__read_stack) > 0:
+            parent_unit, sub_unit_index = self.__read_stack[-1]
 
-    def __scale_read_address(self, deep_factor: int = 0) -> list[int]:
-        return self.__read_address + ([0] * deep_factor)
+            next_sub_unit_index = sub_unit_index + 1
+            if parent_unit.get_sub_unit(index=next_sub_unit_index) is not None:
+                self.__read_stack[-1] = (parent_unit, next_sub_unit_index)
+                return
+
+            # no more units on this level, moving to the next unit of the parent
+            self.__read_stack.pop()
+
+        # no more units
+        self.__reading_complete = True
+
+    # the unit passed to the reader
+    def get_text_unit(self) -> TextUnit:
+        return self.__text_unit
 
     def read_next(self, deep_factor: int = 0) -> TextUnit:
         return self.__consume_next(update_address=False, deep_factor=deep_factor)
@@ -37,26 +53,36 @@ class TextUnitReader:
     def consume_next(self, deep_factor: int = 0) -> TextUnit:
         return self.__consume_next(update_address=True, deep_factor=deep_factor)
 
+    # address = [] - the root unit, address = [0, 1] - second sub-unit of the root first sub-unit
+    def get_read_address(self) -> list[int]:
+        return list(map(lambda frame: frame[1], self.__read_stack))
+
+    # moves the reader to the unit at the address, so it's read next, e.g. to resume a layout from a page start
+    def set_read_address(self, address: list[int]):
+        read_stack = []
+        text_unit = self.__text_unit
+        for sub_unit_index in address:
+            read_stack.append((text_unit, sub_unit_index))
+            text_unit = text_unit.get_sub_unit(index=sub_unit_index)
+            if text_unit is None:
+                raise Exception(f"There is no unit with address {address}")
+
+        self.__read_stack = read_stack
+        self.__reading_complete = False
+
     def __consume_next(self, update_address: bool = False, deep_factor: int = 0) -> TextUnit:
         if self.__reading_complete:
             return TextEmptyUnit()
 
-        scaled_read_address = self.__scale_read_address(deep_factor=deep_factor)
-        targeted_text_unit = self.__text_unit.get_by_address(address=scaled_read_address)
-
-        if not update_address:
-            # debug line
-            # print(f"scaled_read_address={scaled_read_address}:{targeted_text_unit.get_raw_text() if targeted_text_unit is not None else None}")
-            pass
+        targeted_text_unit = self.__scale_read_unit(deep_factor=deep_factor)
 
         if update_address and targeted_text_unit is not None:
-            next_read_address = self.__get_next_available_address(address=scaled_read_address)
-
-            if next_read_address is not None:
-                self.__read_address = next_read_address
-            else:
-                # no more units
-                self.__reading_complete = True
-                pass
+            # the targeted unit is reached through the first sub units
+            text_unit = self.__get_read_unit()
+            for _ in range(deep_factor):
+                self.__read_stack.append((text_unit, 0))
+                text_unit = text_unit.get_sub_unit(index=0)
+
+            self.__move_to_next_available_unit()
 
         return targeted_text_unit if targeted_text_unit is not None else TextEmptyUnit()
@@ -3,14 +3,19 @@ import arrow
 
 from bookmaster.book_formatter import McBookFormatter
 from bookmaster.book_writer import BookWriter
-from bookmaster.character_ruler import McCharRuler
+from bookmaster.character_ruler import get_ruler
+from bookmaster.layout_stats import measure_stage
 from bookmaster.model.text_root_unit import TextRootUnit
 from bookmaster.text_container import McBook
 from bookmaster.text_unit_reader import TextUnitReader
-from other.book_utils import fill_up_raw_template, move_to_bookcopy_dir
-from other.io_utils import read_file, write_json, export_text_unit, write_file
+from other.book_utils import fill_up_raw_template, move_to_bookcopy_dir, read_raw_template, RawTemplate, \
+    create_layout_stats, create_debug_artifact_writer, is_compact_json_enabled, open_process_measurer, \
+    get_process_measurer
+from other.io_utils import read_file
 from other.telegram.tg_tool import *
+from other.telegram.message_store import MessageStore
 from emoji import distinct_emoji_list
+from concurrent.futures import ProcessPoolExecutor
 import asyncio
 import sys
 
@@ -25,7 +30,17 @@ min_reactions_count = 400
 max_pages_per_joke = 2
 last_page_min_lines = 3
 
-ruler = McCharRuler(char_width_dict_file='bookmaster/char_width.txt')
+char_width_dict_file = 'bookmaster/char_width.txt'
+# measurements of messages validated by previous runs are reused
+measurements_db_file = 'measurements.sqlite'
+
+ruler = get_ruler(char_width_dict_file=char_width_dict_file)
+# run with LAYOUT_STATS=1 to print layout counters and time of every stage
+layout_stats = create_layout_stats()
+# run with COMPACT_JSON=1 to write the book json without indents and spaces
+compact_json = is_compact_json_enabled()
+# run with DEBUG_ARTIFACTS=summary or DEBUG_ARTIFACTS=full to write debug files
+debug_artifacts = create_debug_artifact_writer()
 
 
 def clear_message(message):
@@ -60,63 +75,54 @@ def is_message_valid(message) -> bool:
         joke_number=123,  # any number just to generate pages for validation
     )
 
-    root_unit = TextRootUnit(raw_joke_content)
-    text_unit_reader = TextUnitReader(text_unit=root_unit)
-
     try:
-        joke_book = BookWriter(reader=text_unit_reader, ruler=ruler).write()
+        joke_measurement = get_process_measurer().measure_text(raw_text=raw_joke_content,
+                                                               max_pages_count=max_pages_per_joke)
     except ValueError:
         return False
 
-    fit_in_page_limit = len(joke_book.get_pages()) <= max_pages_per_joke
-
-    last_page = joke_book.get_page(len(joke_book.get_pages()) - 1)
-    last_page_has_enough_lines = len(last_page.get_lines()) >= last_page_min_lines
+    fit_in_page_limit = joke_measurement.fits_page_limit
+    last_page_has_enough_lines = joke_measurement.last_page_lines_count >= last_page_min_lines
     return fit_in_page_limit and last_page_has_enough_lines
 
 
-def read_raw_joke_template():
-    return read_file(f"{src_dir}/raw_joke_template.txt")
+# parsed once per process, validation calls it for every message
+def read_raw_joke_template() -> RawTemplate:
+    return read_raw_template(f"{src_dir}/raw_joke_template.txt")
 
 
-def build_raw_joke_content(raw_template: str, message, joke_number: int):
-    quote_dict = {
+def build_raw_joke_content(raw_template: RawTemplate, message, joke_number: int):
+    return raw_template.fill_up(get_joke_args(message, joke_number))
+
+
+def get_joke_args(message, joke_number: int) -> dict:
+    return {
         'joke': clear_message(message),
         'joke_number': joke_number,
     }
-    return fill_up_raw_template(raw_template=raw_template, args_dictionary=quote_dict)
 
 
 def build_raw_content_list(message_list) -> list[str]:
     raw_joke_template = read_raw_joke_template()
-
-    raw_joke_content_list = []
-    message_index = 0
-    for message in message_list:
-        raw_joke_content = build_raw_joke_content(
-            raw_template=raw_joke_template,
-            message=message,
-            joke_number=message_index + 1,
-        )
-        raw_joke_content_list.append(raw_joke_content)
-        message_index += 1
-
-    return raw_joke_content_list
+    return raw_joke_template.fill_up_many(
+        get_joke_args(message, joke_number=message_index + 1) for message_index, message in enumerate(message_list)
+    )
 
 
 def create_book(raw_content: str) -> McBook:
-    # parsing text into units
+    # sub units are created lazily while the book is written, so parsing is timed as a part of the layout
     root_unit = TextRootUnit(raw_content)
-    export_text_unit(file_path='./debug/text_units.json5', text_unit=root_unit)
 
-    # writing debug output
-    write_file(f'{src_dir}/raw_content.txt', raw_content)
+    # writing debug output on a background thread
+    debug_artifacts.write_file(f'{src_dir}/raw_content.txt', lambda: raw_content)
+    debug_artifacts.write_text_unit_tree('./debug/text_units.ndjson', raw_content)
 
     text_unit_reader = TextUnitReader(text_unit=root_unit)
-    return BookWriter(reader=text_unit_reader, ruler=ruler).write()
+    with measure_stage(layout_stats, 'layout'):
+        return BookWriter(reader=text_unit_reader, ruler=ruler, stats=layout_stats).write()
 
 
-async def __main__(cmd_args):
+async def __main__(cmd_args, executor: ProcessPoolExecutor):
     required_args_count = 3
     arg_episode = 0
     arg_offset_id = 0
@@ -130,12 +136,18 @@ async def __main__(cmd_args):
         print('Please specify: <episode> <min_id> <count>')
         return
 
-    ranged_messages = await load_filtered_messages(
-        channel_username=channel_username,
-        offset_id=arg_offset_id,
-        count=arg_count,
-        filter_valid=lambda item: list(filter(is_message_valid, item)),
-    )
+    # messages loaded by previous runs are taken from the local store
+    message_store = MessageStore(db_file='telegram_messages.sqlite')
+
+    with measure_stage(layout_stats, 'loading messages'):
+        ranged_messages = await load_filtered_messages(
+            channel_username=channel_username,
+            offset_id=arg_offset_id,
+            count=arg_count,
+            filter_valid=lambda item: filter_valid_in_executor(executor, is_message_valid, item),
+            message_store=message_store,
+        )
+    message_store.close()
 
     args_dictionary = {
         'episode': arg_episode,
@@ -155,11 +167,23 @@ async def __main__(cmd_args):
     book_formatter = McBookFormatter(book)
     destination_file_name = f"joke_b_{arg_episode}_{ranged_messages.id_range_start}-{ranged_messages.id_range_end}.json"
     destination_file_path = f"{src_dir}/{destination_file_name}"
-    write_json(destination_file_path, book_formatter.to_json())
-    # write_file('./debug/book_pretty.txt', book_formatter.to_pretty_text())
+    # the book is formatted and written page by page
+    with measure_stage(layout_stats, 'export'):
+        book_formatter.to_json_file(destination_file_path, compact=compact_json)
+    # debug_artifacts.write_file('./debug/book_pretty.txt', book_formatter.to_pretty_text)
     print(f"Written a book with {len(book.get_pages())} page(s)")
 
     move_to_bookcopy_dir(destination_file_path, destination_file_name)
+    debug_artifacts.close()
+
+    if layout_stats is not None:
+        print(layout_stats.get_summary())
 
 
-asyncio.run(__main__(sys.argv))
+if __name__ == '__main__':
+    # validation is a full layout per message, so it runs on all cores
+    with ProcessPoolExecutor(initializer=open_process_measurer,
+                             initargs=(char_width_dict_file, measurements_db_file)) as executor:
+        # worker processes are started before the event loop, so forked ones don't inherit it and its connections
+        executor.submit(int).result()
+        asyncio.run(__main__(sys.argv, executor))
@@ -1,47 +1,106 @@
+import sys
+
 from bookmaster.book_formatter import McBookFormatter
+from bookmaster.book_layout import BookLayout
 from bookmaster.book_writer import BookWriter
-from other.book_utils import move_to_bookcopy_dir
+from bookmaster.layout_stats import measure_stage
+from other.book_utils import move_to_bookcopy_dir, create_layout_stats, create_debug_artifact_writer
 from other.io_utils import *
 from bookmaster.model.text_root_unit import *
-from bookmaster.text_container import McCharRuler
+from bookmaster.model.text_stream_root_unit import TextStreamRootUnit
+from bookmaster.character_ruler import get_ruler
 from bookmaster.text_unit_reader import TextUnitReader
 
 char_width_dict_file = 'bookmaster/char_width.txt'
-export_text_unit_file = './debug/text_units.json5'
+export_text_unit_file = './debug/text_units.ndjson'
 input_file = './debug/input.txt'
 output_json_file = './debug/book_json.json'
 output_pretty_file = './debug/book_json.json'
+book_layout_file = './debug/book_layout.json'
 
 
 # This script gives you a basic usage example.
 # It takes input from #input_file
 # And generates a text to fit in a book in two formats:
 # Take a look on output_json_file and output_pretty_file
+# The layout is saved into #book_layout_file, so the next run lays out only the pages of the changed text
 #
-# run command: python3 main.py
+# run command: python3 main.py [--stream]
+# run with --stream to lay out a big input: it's read in chunks and parsed while it's laid out,
+# pages are written into #output_json_file as soon as they are complete, so neither the text nor the book
+# is kept in memory, the layout of the previous run is not reused then
+# run with LAYOUT_STATS=1 to print layout counters and time of every stage
+# run with DEBUG_ARTIFACTS=full to write the unit tree into #export_text_unit_file
+
+def __run(cmd_args: list[str]):
+    if '--stream' in cmd_args:
+        __run_streamed()
+        return
+
+    layout_stats = create_layout_stats()
+    debug_artifacts = create_debug_artifact_writer()
 
-def __run():
     # reading input
-    raw_text = read_file(file_path=input_file)
+    with measure_stage(layout_stats, 'I/O'):
+        raw_text = read_file(file_path=input_file)
 
-    # parsing text into units
+    # sub units are created lazily while the book is written, so parsing is timed as a part of the layout
     root_unit = TextRootUnit(raw_text)
-    export_text_unit(file_path=export_text_unit_file, text_unit=root_unit)
+    debug_artifacts.write_text_unit_tree(export_text_unit_file, raw_text)
 
     book_writer = BookWriter(
         reader=TextUnitReader(text_unit=root_unit),
-        ruler=McCharRuler(char_width_dict_file=char_width_dict_file),
+        ruler=get_ruler(char_width_dict_file=char_width_dict_file),
+        stats=layout_stats,
     )
-    book = book_writer.write()
+    previous_layout = None
+    if os.path.exists(book_layout_file):
+        with measure_stage(layout_stats, 'I/O'):
+            previous_layout = BookLayout.from_dict(read_json(book_layout_file))
+
+    with measure_stage(layout_stats, 'layout'):
+        book = book_writer.rewrite(previous_layout) if previous_layout is not None else book_writer.write()
+        book_layout = book_writer.get_layout(book)
     print(f"Written a book with {len(book.get_pages())} page(s)")
 
-    # writing output
-    book_formatter = McBookFormatter(book)
-    write_json(output_json_file, book_formatter.to_json())
-    write_file(output_pretty_file, book_formatter.to_pretty_text())
+    # writing output, the book is formatted and written page by page
+    with measure_stage(layout_stats, 'export'):
+        book_formatter = McBookFormatter(book)
+        book_formatter.to_json_file(output_json_file)
+        book_formatter.to_pretty_text_file(output_pretty_file)
+
+    with measure_stage(layout_stats, 'I/O'):
+        if book_layout is not None:
+            write_json(book_layout_file, book_layout.to_dict())
+
+        move_to_bookcopy_dir('./debug/book_json.json', 'book_json.json')
+    debug_artifacts.close()
+
+    if layout_stats is not None:
+        print(layout_stats.get_summary())
+
+
+def __run_streamed():
+    layout_stats = create_layout_stats()
+
+    book_writer = BookWriter(
+        reader=TextUnitReader(text_unit=TextStreamRootUnit(chunks=read_file_chunks(file_path=input_file))),
+        ruler=get_ruler(char_width_dict_file=char_width_dict_file),
+        stats=layout_stats,
+    )
+
+    # reading, layout and export go together page by page
+    with measure_stage(layout_stats, 'layout'):
+        os.makedirs(os.path.dirname(output_json_file), exist_ok=True)
+        with open(output_json_file, 'w') as file:
+            pages_count = McBookFormatter.write_json(file=file, pages=book_writer.iter_pages())
+    print(f"Written a book with {pages_count} page(s)")
+
+    move_to_bookcopy_dir(output_json_file, 'book_json.json')
 
-    move_to_bookcopy_dir('./debug/book_json.json', 'book_json.json')
+    if layout_stats is not None:
+        print(layout_stats.get_summary())
 
 
 if __name__ == '__main__':
-    __run()
+    __run(sys.argv)
@@ -3,9 +3,10 @@ import re
 
 from bookmaster.book_formatter import McBookFormatter
 from bookmaster.book_writer import BookWriter
+from bookmaster.layout_stats import measure_stage
 from other.book_utils import *
-from bookmaster.character_ruler import McCharRuler
-from other.io_utils import write_json, write_file, read_file, export_text_unit
+from bookmaster.character_ruler import get_ruler
+from other.io_utils import read_file
 from bookmaster.model.text_root_unit import TextRootUnit
 from bookmaster.text_container import McBook
 from bookmaster.text_unit_reader import TextUnitReader
@@ -22,6 +23,13 @@ src_dir = 'content/neural_horo'
 channel_username = '@neural_horo'
 char_width_dict_file = 'bookmaster/char_width.txt'
 
+# run with LAYOUT_STATS=1 to print layout counters and time of every stage
+layout_stats = create_layout_stats()
+# run with COMPACT_JSON=1 to write the book json without indents and spaces
+compact_json = is_compact_json_enabled()
+# run with DEBUG_ARTIFACTS=summary or DEBUG_ARTIFACTS=full to write debug files
+debug_artifacts = create_debug_artifact_writer()
+
 HORO_SIGN_KEY_ARIES = 'aries'
 HORO_SIGN_KEY_TAURUS = 'taurus'
 HORO_SIGN_KEY_GEMINI = 'gemini'
@@ -81,17 +89,18 @@ async def load_neural_scope_map(message_id: int) -> dict:
 
 
 def create_book(raw_content: str) -> McBook:
-    # parsing text into units
+    # sub units are created lazily while the book is written, so parsing is timed as a part of the layout
     root_unit = TextRootUnit(raw_content)
-    export_text_unit(file_path='./debug/text_units.json5', text_unit=root_unit)
 
-    # writing debug output
-    write_file(f'{src_dir}/raw_content.txt', raw_content)
+    # writing debug output on a background thread
+    debug_artifacts.write_file(f'{src_dir}/raw_content.txt', lambda: raw_content)
+    debug_artifacts.write_text_unit_tree('./debug/text_units.ndjson', raw_content)
 
     text_unit_reader = TextUnitReader(text_unit=root_unit)
-    ruler = McCharRuler(char_width_dict_file=char_width_dict_file)
-    text_container_writer = BookWriter(reader=text_unit_reader, ruler=ruler)
-    return text_container_writer.write()
+    ruler = get_ruler(char_width_dict_file=char_width_dict_file)
+    text_container_writer = BookWriter(reader=text_unit_reader, ruler=ruler, stats=layout_stats)
+    with measure_stage(layout_stats, 'layout'):
+        return text_container_writer.write()
 
 
 async def __main__(cmd_args):
@@ -126,11 +135,17 @@ async def __main__(cmd_args):
     book_formatter = McBookFormatter(book)
     destination_file_name = f"neural_horo_{arg_message_id}_{arg_week_date}.json"
     destination_file_path = f"{src_dir}/{destination_file_name}"
-    write_json(destination_file_path, book_formatter.to_json())
-    write_file('./debug/book_pretty.txt', book_formatter.to_pretty_text())
+    # the book is formatted and written page by page
+    with measure_stage(layout_stats, 'export'):
+        book_formatter.to_json_file(destination_file_path, compact=compact_json)
+    debug_artifacts.write_file('./debug/book_pretty.txt', book_formatter.to_pretty_text)
     print(f"Written a book with {len(book.get_pages())} page(s)")
 
     move_to_bookcopy_dir(destination_file_path, destination_file_name)
+    debug_artifacts.close()
+
+    if layout_stats is not None:
+        print(layout_stats.get_summary())
 
 
 asyncio.run(__main__(sys.argv))
@@ -1,12 +1,140 @@
+import functools
+import multiprocessing.util
+import os
+import re
 import shutil
+from typing import Iterable
+
+from bookmaster.book_measurer import BookMeasurer
+from bookmaster.character_ruler import get_ruler
+from bookmaster.layout_stats import LayoutStats
+from bookmaster.measurement_cache import MeasurementCache
+from other.debug_artifacts import DebugArtifactWriter, DebugLevel
+from other.io_utils import read_file
+
+# {{arg_key}}, the same placeholders fill_up_raw_template always replaced
+_PLACEHOLDER_REGEX = re.compile(r'\{\{([^{}]*)\}\}')
+
+# file path -> (modification time, template)
+_raw_template_files: dict[str, tuple[int, 'RawTemplate']] = {}
+
+# measurer of the messages validated in this process, see open_process_measurer
+_process_measurer: BookMeasurer | None = None
+
+
+# Raw template parsed once into text parts and placeholder slots,
+# so filling it up is a single join instead of a replace of the whole text per argument
+class RawTemplate:
+
+    def __init__(self, raw_template: str):
+        self.__raw_template = raw_template
+        # text, arg key, text, arg key, ..., text
+        self.__parts = _PLACEHOLDER_REGEX.split(raw_template)
+        # braces around placeholders may form a new placeholder once an argument is replaced
+        self.__has_plain_text_parts = all(map(RawTemplate.__is_plain_text, self.__parts[::2]))
+
+    def get_raw_template(self) -> str:
+        return self.__raw_template
+
+    def fill_up(self, args_dictionary) -> str:
+        if not self.__has_plain_text_parts:
+            return RawTemplate.__replace_args(self.__raw_template, args_dictionary)
+
+        arg_values = {}
+        for arg_key, arg_value in args_dictionary.items():
+            arg_key = str(arg_key)
+            arg_value = str(arg_value)
+
+            if not RawTemplate.__is_plain_text(arg_key) or not RawTemplate.__is_plain_text(arg_value):
+                # a value may contain a placeholder of the next argument, replacing one by one as before
+                return RawTemplate.__replace_args(self.__raw_template, args_dictionary)
+
+            # the first one wins, the next ones have nothing to replace
+            arg_values.setdefault(arg_key, arg_value)
+
+        parts = self.__parts.copy()
+        for part_index in range(1, len(parts), 2):
+            arg_value = arg_values.get(parts[part_index])
+            parts[part_index] = arg_value if arg_value is not None else f"{{{{{parts[part_index]}}}}}"
+
+        return ''.join(parts)
+
+    # fills up the template for each arguments dictionary, e.g. for every message of a book
+    def fill_up_many(self, args_dictionaries: Iterable) -> list[str]:
+        return list(map(self.fill_up, args_dictionaries))
+
+    @staticmethod
+    def __is_plain_text(text: str) -> bool:
+        return '{' not in text and '}' not in text
+
+    @staticmethod
+    def __replace_args(raw_template: str, args_dictionary) -> str:
+        raw_content = raw_template
+        for arg_key, arg_value in args_dictionary.items():
+            raw_content = raw_content.replace(f"{{{{{arg_key}}}}}", str(arg_value))
+
+        return raw_content
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_raw_template(raw_template: str) -> RawTemplate:
+    return RawTemplate(raw_template)
+
+
+# the template file is read again only if it was modified
+def read_raw_template(file_path: str) -> RawTemplate:
+    modification_time = os.stat(file_path).st_mtime_ns
+
+    cached_template = _raw_template_files.get(file_path)
+    if cached_template is not None and cached_template[0] == modification_time:
+        return cached_template[1]
+
+    raw_template = RawTemplate(read_file(file_path))
+    _raw_template_files[file_path] = (modification_time, raw_template)
+    return raw_template
 
 
 def fill_up_raw_template(raw_template: str, args_dictionary):
-    raw_content = raw_template
-    for arg_key, arg_value in args_dictionary.items():
-        raw_content = raw_content.replace(f"{{{{{arg_key}}}}}", str(arg_value))
+    return _parse_raw_template(raw_template).fill_up(args_dictionary)
+
+
+# layout stats are collected and printed by the scripts only if they are run with LAYOUT_STATS=1
+def create_layout_stats() -> LayoutStats | None:
+    if os.environ.get('LAYOUT_STATS') != '1':
+        return None
+
+    return LayoutStats()
+
+
+# ProcessPoolExecutor initializer of the processes validating messages, each of them opens its own measurer,
+# its cache is closed when the process exits (worker processes don't run atexit handlers, but run these finalizers)
+def open_process_measurer(char_width_dict_file: str, measurements_db_file: str):
+    global _process_measurer
+    cache = MeasurementCache(db_file=measurements_db_file)
+    _process_measurer = BookMeasurer(ruler=get_ruler(char_width_dict_file=char_width_dict_file), cache=cache)
+    multiprocessing.util.Finalize(None, cache.close, exitpriority=0)
+
+
+def get_process_measurer() -> BookMeasurer:
+    if _process_measurer is None:
+        raise Exception('Measurer is opened only in processes started with open_process_measurer')
+
+    return _process_measurer
+
+
+# books are written as indented json, or without indents and spaces if the scripts are run with COMPACT_JSON=1
+def is_compact_json_enabled() -> bool:
+    return os.environ.get('COMPACT_JSON') == '1'
+
+
+# DEBUG_ARTIFACTS=off|summary|full, debug files are not written by default
+def create_debug_artifact_writer() -> DebugArtifactWriter:
+    level_name = os.environ.get('DEBUG_ARTIFACTS', 'off')
+    if level_name.upper() not in DebugLevel.__members__:
+        print(f"WARNING unknown DEBUG_ARTIFACTS level '{level_name}', debug files are not written")
+        return DebugArtifactWriter(level=DebugLevel.OFF)
 
-    return raw_content
+    return DebugArtifactWriter(level=DebugLevel[level_name.upper()])
 
 
 def move_to_bookcopy_dir(file_path, file_name):
@@ -0,0 +1,95 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, Future
+from enum import IntEnum
+from typing import Callable, Iterator
+
+from bookmaster.model.text_root_unit import TextRootUnit
+from bookmaster.model.text_unit import TextUnit, FORMAT_FLAG_VALUES
+from other.io_utils import make_file_dir
+
+
+class DebugLevel(IntEnum):
+    OFF = 0
+    SUMMARY = 1  # text files, e.g. raw content of a book
+    FULL = 2  # text files and unit trees
+
+
+# Writes debug files on a background thread in the order they were requested.
+# Files above the level are skipped without calling anything, and no thread is started until the first file,
+# so with DebugLevel.OFF debug output costs nothing.
+class DebugArtifactWriter:
+
+    def __init__(self, level: DebugLevel):
+        self.__level = level
+        self.__executor: ThreadPoolExecutor | None = None
+        self.__futures: list[Future] = []
+
+    def is_enabled(self, level: DebugLevel) -> bool:
+        return level <= self.__level
+
+    # get_content is called on the background thread, e.g. McBookFormatter(book).to_pretty_text
+    def write_file(self, file_path: str, get_content: Callable[[], str], level: DebugLevel = DebugLevel.SUMMARY):
+        if self.is_enabled(level):
+            self.__submit(_write_text_file, file_path, get_content)
+
+    # writes units of TextRootUnit(raw_text) in the NDJSON format, see read_text_unit_tree
+    # the tree is parsed again on the background thread, units are created lazily and are not shared between threads
+    def write_text_unit_tree(self, file_path: str, raw_text: str, level: DebugLevel = DebugLevel.FULL):
+        if self.is_enabled(level):
+            self.__submit(_write_text_unit_tree, file_path, raw_text)
+
+    # waits until all requested files are written
+    def close(self):
+        for future in self.__futures:
+            error = future.exception()
+            if error is not None:
+                print(f"WARNING unable to write a debug file: {type(error).__name__}: {error}")
+        self.__futures = []
+
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
+
+    def __submit(self, write_function: Callable, *args):
+        if self.__executor is None:
+            # a single thread, so files are written one by one in order
+            self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='debug-artifacts')
+
+        self.__futures.append(self.__executor.submit(write_function, *args))
+
+
+# yields units of a tree written by write_text_unit_tree one by one, the file is read line by line
+# each unit is a dict: address in the root unit, type name, format flag names and raw text of units without sub units,
+# units go in the reading order, every unit right before its sub units
+def read_text_unit_tree(file_path: str) -> Iterator[dict]:
+    with open(file_path, 'r') as file:
+        for line in file:
+            yield json.loads(line)
+
+
+def _write_text_file(file_path: str, get_content: Callable[[], str]):
+    make_file_dir(file_path)
+    with open(file_path, 'w') as file:
+        file.write(get_content())
+
+
+def _write_text_unit_tree(file_path: str, raw_text: str):
+    make_file_dir(file_path)
+    with open(file_path, 'w') as file:
+        units_to_write: list[tuple[TextUnit, list[int]]] = [(TextRootUnit(raw_text), [])]
+        while len(units_to_write) > 0:
+            text_unit, address = units_to_write.pop()
+            sub_units = text_unit.get_sub_units()
+
+            unit_dict = {
+                'address': address,
+                'type': type(text_unit).__name__,
+                'format_flags': list(map(FORMAT_FLAG_VALUES.get, text_unit.get_format_flags())),
+            }
+            if len(sub_units) == 0:
+                # texts of other units are merged from their sub units
+                unit_dict['raw_text'] = text_unit.get_raw_text()
+            file.write(json.dumps(unit_dict, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+            for index in range(len(sub_units) - 1, -1, -1):
+                units_to_write.append((sub_units[index], address + [index]))
@@ -1,34 +1,41 @@
 import json
 import os
 
-import json5
 
-from bookmaster.model.text_unit import TextUnit
-
-
-def export_text_unit(file_path: str, text_unit: TextUnit):
-    unit_dict = text_unit.get_dict()
-    save_json5(file_path, unit_dict)
-
-
-def save_json5(file_path: str, json_data: any):
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, 'w') as file:
-        json5.dump(json_data, file, ensure_ascii=False, indent=4)
+# creates the directory of the file if it doesn't exist, a file in the current directory has no directory to create
+def make_file_dir(file_path: str):
+    dir_name = os.path.dirname(file_path)
+    if len(dir_name) > 0:
+        os.makedirs(dir_name, exist_ok=True)
 
 
 def write_json(file_path: str, json_data: any):
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    make_file_dir(file_path)
     with open(file_path, 'w') as file:
         json.dump(json_data, file, ensure_ascii=False, indent=4)
 
 
+def read_json(file_path: str) -> any:
+    with open(file_path, 'r') as file:
+        return json.load(file)
+
+
 def read_file(file_path: str):
     with open(file_path, 'r') as file:
         text_content = file.read()
         return str(text_content)
 
 
+# reads the file lazily, e.g. for TextStreamRootUnit
+def read_file_chunks(file_path: str, chunk_size: int = 64 * 1024):
+    with open(file_path, 'r') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if len(chunk) == 0:
+                break
+            yield chunk
+
+
 def write_file(file_path: str, content: str):
     f = open(file_path, "w")
     f.write(content)
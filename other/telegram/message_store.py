@@ -0,0 +1,99 @@
+import pickle
+import sqlite3
+
+from other.telegram.tg_tool import MessageSnapshot
+
+
+# Local copy of loaded channel messages, keyed by (channel, message id).
+# Besides messages it keeps id ranges which were loaded completely,
+# so a request can be served from the store without asking telegram about missing (deleted) ids.
+class MessageStore:
+
+    def __init__(self, db_file: str):
+        self.__connection = sqlite3.connect(db_file)
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS messages ('
+            'channel TEXT NOT NULL, id INTEGER NOT NULL, snapshot BLOB NOT NULL, PRIMARY KEY (channel, id))'
+        )
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS loaded_ranges ('
+            'channel TEXT NOT NULL, id_from INTEGER NOT NULL, id_to INTEGER NOT NULL)'
+        )
+        self.__connection.commit()
+
+    def close(self):
+        self.__connection.close()
+
+    # the same as client.get_messages(channel, offset_id=offset_id, limit=limit) returns, as far as it's stored:
+    # up to limit messages with id < offset_id, newest first, and offset id to load the rest from
+    def read_messages(self, channel: str, offset_id: int, limit: int) -> tuple[list[MessageSnapshot], int]:
+        messages = []
+        if offset_id <= 0:
+            # the newest messages are never known
+            return messages, offset_id
+
+        while len(messages) < limit:
+            loaded_range = self.__find_loaded_range(channel=channel, message_id=offset_id - 1)
+            if loaded_range is None:
+                break
+
+            id_from, _ = loaded_range
+            rows = self.__connection.execute(
+                'SELECT snapshot FROM messages WHERE channel = ? AND id >= ? AND id < ? ORDER BY id DESC LIMIT ?',
+                (channel, id_from, offset_id, limit - len(messages)),
+            ).fetchall()
+            messages = messages + list(map(lambda row: pickle.loads(row[0]), rows))
+
+            if len(messages) < limit:
+                offset_id = id_from
+            else:
+                offset_id = messages[-1].id
+
+        return messages, offset_id
+
+    # messages - result of client.get_messages(channel, offset_id=offset_id, limit=limit)
+    def write_messages(self, channel: str, offset_id: int, limit: int, messages: list[MessageSnapshot]):
+        self.__connection.executemany(
+            'INSERT OR REPLACE INTO messages (channel, id, snapshot) VALUES (?, ?, ?)',
+            list(map(lambda message: (channel, message.id, pickle.dumps(message)), messages)),
+        )
+
+        # all messages between the oldest loaded one and offset_id are known now
+        id_from = messages[-1].id if len(messages) >= limit else 1
+        if offset_id > 0:
+            id_to = offset_id - 1
+        elif len(messages) > 0:
+            id_to = messages[0].id
+        else:
+            id_to = 0
+
+        if id_from <= id_to:
+            self.__add_loaded_range(channel=channel, id_from=id_from, id_to=id_to)
+
+        self.__connection.commit()
+
+    def __find_loaded_range(self, channel: str, message_id: int) -> tuple[int, int] | None:
+        return self.__connection.execute(
+            'SELECT id_from, id_to FROM loaded_ranges WHERE channel = ? AND id_from <= ? AND id_to >= ?',
+            (channel, message_id, message_id),
+        ).fetchone()
+
+    def __add_loaded_range(self, channel: str, id_from: int, id_to: int):
+        # merging with overlapping and adjacent ranges
+        overlapping_ranges = self.__connection.execute(
+            'SELECT id_from, id_to FROM loaded_ranges WHERE channel = ? AND id_to >= ? AND id_from <= ?',
+            (channel, id_from - 1, id_to + 1),
+        ).fetchall()
+
+        for overlapping_id_from, overlapping_id_to in overlapping_ranges:
+            id_from = min(id_from, overlapping_id_from)
+            id_to = max(id_to, overlapping_id_to)
+
+        self.__connection.execute(
+            'DELETE FROM loaded_ranges WHERE channel = ? AND id_to >= ? AND id_from <= ?',
+            (channel, id_from - 1, id_to + 1),
+        )
+        self.__connection.execute(
+            'INSERT INTO loaded_ranges (channel, id_from, id_to) VALUES (?, ?, ?)',
+            (channel, id_from, id_to),
+        )
@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
-import time
+import asyncio
+import os
+import weakref
+from concurrent.futures import Executor
 from dataclasses import dataclass
+from typing import Callable
 from telethon import TelegramClient
+from telethon.errors import FloodWaitError
 from other.telegram.tg_credits import API_ID, API_HASH
 
 # Create a new file called 'tg_credits.py' next to this
@@ -11,6 +16,15 @@ from other.telegram.tg_credits import API_ID, API_HASH
 
 client = TelegramClient('telegram', API_ID, API_HASH)
 
+# requests of all loaders which may be sent to telegram at the same time, e.g. of several channels loaded together
+max_requests_in_flight = 2
+# event loop -> semaphore limiting the requests sent from it, a semaphore can't be shared between event loops
+_requests_semaphores = weakref.WeakKeyDictionary()
+
+# seconds between two requests of the same loader, doubled on each retry after a flood wait error
+request_delay = 0.5
+max_request_attempts = 5
+
 
 async def load_messages(channel_username, offset, limit):
     # Connect to the client
@@ -40,13 +54,14 @@ def get_message_with_details(message_item):
     }
 
 
-async def load_messages_with_details(channel_username, offset_id, limit):
+async def load_messages_with_details(channel_username, offset_id, limit, message_store=None):
     # Connect to the client
     await client.start()
 
     # Get the channel entity
     channel = await client.get_entity(channel_username)
-    messages = await client.get_messages(channel, offset_id=offset_id, limit=limit)
+    messages = await _request_messages(client, channel, channel_username, offset_id=offset_id, limit=limit,
+                                       delay=0, message_store=message_store)
 
     messages = list(filter(lambda message: message.entities is None or len(message.entities) == 0, messages))
     messages = list(map(get_message_with_details, messages))
@@ -55,11 +70,27 @@ async def load_messages_with_details(channel_username, offset_id, limit):
     return messages
 
 
+def filter_valid_in_executor(executor: Executor, is_message_valid: Callable[['MessageSnapshot'], bool],
+                             messages: list) -> list:
+    # messages hold the client, so worker processes get snapshots of the fields validation needs
+    message_snapshots = list(map(MessageSnapshot.from_message, messages))
+
+    chunk_size = max(len(message_snapshots) // ((os.cpu_count() or 1) * 4), 1)
+    validation_results = executor.map(is_message_valid, message_snapshots, chunksize=chunk_size)
+
+    # results come in the order of messages
+    return [message for message, is_valid in zip(messages, validation_results) if is_valid]
+
+
 async def load_filtered_messages(channel_username, offset_id, count, filter_valid,
-                                 requrest_size: int = 20) -> 'RangedMessages':
+                                 requrest_size: int = 20, telegram_client=None,
+                                 message_store=None) -> 'RangedMessages':
+    # any object with TelegramClient start/get_entity/get_messages coroutines, e.g. a fake one in tests
+    telegram_client = telegram_client if telegram_client is not None else client
+
     # Get the channel entity
-    await client.start()
-    channel = await client.get_entity(channel_username)
+    await telegram_client.start()
+    channel = await telegram_client.get_entity(channel_username)
 
     first_loaded_message = None
     last_loaded_message = None
@@ -67,26 +98,42 @@ async def load_filtered_messages(channel_username, offset_id, count, filter_vali
     request_index = 0
     valid_messages = []
 
-    while True:
-        request_index += 1
-        print(f"Loading {requrest_size} messages with start offset id {offset_id}, request {request_index} ")
-
-        # Loading messages
-        messages = await client.get_messages(channel, offset_id=offset_id, limit=requrest_size)
-
-        # print(f"raw messages:{messages}")
-        valid_messages = valid_messages + filter_valid(messages)
-
-        if first_loaded_message is None:
-            first_loaded_message = messages[0]
-        last_loaded_message = messages[len(messages) - 1]
-
-        if len(valid_messages) >= count:
-            break
+    loop = asyncio.get_running_loop()
+    messages_request = asyncio.create_task(
+        _request_messages(telegram_client, channel, channel_username, offset_id=offset_id, limit=requrest_size,
+                          delay=0, message_store=message_store),
+    )
 
-        # increment cycle values
-        offset_id = last_loaded_message.id
-        time.sleep(0.5)  # seconds
+    try:
+        while True:
+            request_index += 1
+            print(f"Loading {requrest_size} messages with start offset id {offset_id}, request {request_index} ")
+
+            # Loading messages
+            messages = await messages_request
+            messages_request = None
+
+            if first_loaded_message is None:
+                first_loaded_message = messages[0]
+            last_loaded_message = messages[len(messages) - 1]
+
+            # increment cycle values and prefetch the next messages while these ones are validated
+            offset_id = last_loaded_message.id
+            messages_request = asyncio.create_task(
+                _request_messages(telegram_client, channel, channel_username, offset_id=offset_id,
+                                  limit=requrest_size, delay=request_delay, message_store=message_store),
+            )
+
+            # print(f"raw messages:{messages}")
+            # validation is blocking, running it outside the event loop
+            valid_messages = valid_messages + await loop.run_in_executor(None, filter_valid, messages)
+
+            if len(valid_messages) >= count:
+                break
+    finally:
+        if messages_request is not None:
+            # prefetched messages are not needed
+            messages_request.cancel()
 
     valid_messages = valid_messages[:count]
     print(
@@ -101,8 +148,75 @@ async def load_filtered_messages(channel_username, offset_id, count, filter_vali
     )
 
 
+# message_store - MessageStore, only messages which are not there are loaded from telegram
+async def _request_messages(telegram_client, channel, channel_username, offset_id, limit, delay: float,
+                            message_store=None) -> list:
+    stored_messages = []
+    if message_store is not None:
+        stored_messages, offset_id = message_store.read_messages(channel_username, offset_id=offset_id, limit=limit)
+        if len(stored_messages) >= limit:
+            return stored_messages
+
+        limit = limit - len(stored_messages)
+
+    messages = await _request_telegram_messages(telegram_client, channel, offset_id=offset_id, limit=limit,
+                                                delay=delay)
+
+    if message_store is not None:
+        messages = list(map(MessageSnapshot.from_message, messages))
+        message_store.write_messages(channel_username, offset_id=offset_id, limit=limit, messages=messages)
+
+    return stored_messages + messages
+
+
+async def _request_telegram_messages(telegram_client, channel, offset_id, limit, delay: float) -> list:
+    await asyncio.sleep(delay)
+
+    loop = asyncio.get_running_loop()
+    requests_semaphore = _requests_semaphores.get(loop)
+    if requests_semaphore is None:
+        requests_semaphore = asyncio.Semaphore(max_requests_in_flight)
+        _requests_semaphores[loop] = requests_semaphore
+
+    retry_delay = request_delay
+    for attempt in range(max_request_attempts):
+        async with requests_semaphore:
+            try:
+                return await telegram_client.get_messages(channel, offset_id=offset_id, limit=limit)
+            except FloodWaitError as error:
+                if attempt == max_request_attempts - 1:
+                    raise
+                wait_seconds = max(error.seconds, retry_delay)
+
+        print(f"Too many requests, waiting {wait_seconds} seconds")
+        await asyncio.sleep(wait_seconds)
+        retry_delay = retry_delay * 2
+
+
 @dataclass
 class RangedMessages:
     id_range_start: int
     id_range_end: int
     messages: list
+
+
+# Message fields used by message validation, unlike the message itself it can be sent to another process
+@dataclass
+class MessageSnapshot:
+    id: int
+    message: str | None
+    entities: list | None
+    reactions: object | None
+    media: object | None
+    reply_markup: object | None
+
+    @staticmethod
+    def from_message(message) -> 'MessageSnapshot':
+        return MessageSnapshot(
+            id=message.id,
+            message=message.message,
+            entities=message.entities,
+            reactions=message.reactions,
+            media=message.media,
+            reply_markup=message.reply_markup,
+        )
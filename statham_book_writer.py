@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 from bookmaster.book_formatter import McBookFormatter
 from bookmaster.book_writer import BookWriter
-from bookmaster.character_ruler import McCharRuler
+from bookmaster.character_ruler import get_ruler
+from bookmaster.layout_stats import measure_stage
 from bookmaster.model.text_root_unit import TextRootUnit
 from bookmaster.text_container import McBook
 from bookmaster.text_unit_reader import TextUnitReader
-from other.book_utils import fill_up_raw_template, move_to_bookcopy_dir
-from other.io_utils import read_file, write_json, export_text_unit, write_file
+from other.book_utils import fill_up_raw_template, move_to_bookcopy_dir, read_raw_template, RawTemplate, \
+    create_layout_stats, create_debug_artifact_writer, is_compact_json_enabled, open_process_measurer, \
+    get_process_measurer
+from other.io_utils import read_file
 from other.telegram.tg_tool import *
+from other.telegram.message_store import MessageStore
 from emoji import distinct_emoji_list
+from concurrent.futures import ProcessPoolExecutor
 import asyncio
 import sys
 import arrow
@@ -20,7 +25,17 @@ import arrow
 channel_username = '@statham_jason'
 src_dir = 'content/statham'
 
-ruler = McCharRuler(char_width_dict_file='bookmaster/char_width.txt')
+char_width_dict_file = 'bookmaster/char_width.txt'
+# measurements of messages validated by previous runs are reused
+measurements_db_file = 'measurements.sqlite'
+
+ruler = get_ruler(char_width_dict_file=char_width_dict_file)
+# run with LAYOUT_STATS=1 to print layout counters and time of every stage
+layout_stats = create_layout_stats()
+# run with COMPACT_JSON=1 to write the book json without indents and spaces
+compact_json = is_compact_json_enabled()
+# run with DEBUG_ARTIFACTS=summary or DEBUG_ARTIFACTS=full to write debug files
+debug_artifacts = create_debug_artifact_writer()
 
 
 def remove_substr_start_end(s, start, end):
@@ -54,51 +69,47 @@ def is_message_valid(message) -> bool:
     raw_quote_template = read_raw_quote_template()
     raw_quote_content = build_raw_quote_content(raw_quote_template, message)
 
-    root_unit = TextRootUnit(raw_quote_content)
-    text_unit_reader = TextUnitReader(text_unit=root_unit)
-    quote_book = BookWriter(reader=text_unit_reader, ruler=ruler).write()
+    quote_measurement = get_process_measurer().measure_text(raw_text=raw_quote_content, max_pages_count=1)
 
-    fit_in_single_page = len(quote_book.get_pages()) == 1
+    fit_in_single_page = quote_measurement.fits_page_limit
     return fit_in_single_page
 
 
-def build_raw_quote_content(raw_quote_template: str, message):
-    quote_dict = {
+def build_raw_quote_content(raw_quote_template: RawTemplate, message):
+    return raw_quote_template.fill_up(get_quote_args(message))
+
+
+def get_quote_args(message) -> dict:
+    return {
         'quote': clear_message(message),
         'author': "Джейсон Стетхем"
     }
-    return fill_up_raw_template(raw_template=raw_quote_template, args_dictionary=quote_dict)
 
 
-def read_raw_quote_template():
-    return read_file(f"{src_dir}/raw_quote_template.txt")
+# parsed once per process, validation calls it for every message
+def read_raw_quote_template() -> RawTemplate:
+    return read_raw_template(f"{src_dir}/raw_quote_template.txt")
 
 
 def build_raw_content_list(message_list) -> list[str]:
     raw_quote_template = read_raw_quote_template()
-
-    raw_quote_content_list = []
-
-    for message in message_list:
-        raw_quote_content = build_raw_quote_content(raw_quote_template, message)
-        raw_quote_content_list.append(raw_quote_content)
-
-    return raw_quote_content_list
+    return raw_quote_template.fill_up_many(map(get_quote_args, message_list))
 
 
 def create_book(raw_content: str) -> McBook:
-    # parsing text into units
+    # sub units are created lazily while the book is written, so parsing is timed as a part of the layout
     root_unit = TextRootUnit(raw_content)
-    export_text_unit(file_path='./debug/text_units.json5', text_unit=root_unit)
 
-    # writing debug output
-    write_file(f'{src_dir}/raw_content.txt', raw_content)
+    # writing debug output on a background thread
+    debug_artifacts.write_file(f'{src_dir}/raw_content.txt', lambda: raw_content)
+    debug_artifacts.write_text_unit_tree('./debug/text_units.ndjson', raw_content)
 
     text_unit_reader = TextUnitReader(text_unit=root_unit)
-    return BookWriter(reader=text_unit_reader, ruler=ruler).write()
+    with measure_stage(layout_stats, 'layout'):
+        return BookWriter(reader=text_unit_reader, ruler=ruler, stats=layout_stats).write()
 
 
-async def __main__(cmd_args):
+async def __main__(cmd_args, executor: ProcessPoolExecutor):
     required_args_count = 3
     arg_episode = 0
     arg_offset_id = 0
@@ -112,12 +123,18 @@ async def __main__(cmd_args):
         print('Please specify: <episode> <min_id> <count>')
         return
 
-    ranged_messages = await load_filtered_messages(
-        channel_username=channel_username,
-        offset_id=arg_offset_id,
-        count=arg_count,
-        filter_valid=lambda item: list(filter(is_message_valid, item)),
-    )
+    # messages loaded by previous runs are taken from the local store
+    message_store = MessageStore(db_file='telegram_messages.sqlite')
+
+    with measure_stage(layout_stats, 'loading messages'):
+        ranged_messages = await load_filtered_messages(
+            channel_username=channel_username,
+            offset_id=arg_offset_id,
+            count=arg_count,
+            filter_valid=lambda item: filter_valid_in_executor(executor, is_message_valid, item),
+            message_store=message_store,
+        )
+    message_store.close()
 
     args_dictionary = {
         'episode': arg_episode,
@@ -139,10 +156,22 @@ async def __main__(cmd_args):
         f"statham_{arg_episode}_{ranged_messages.id_range_start}-{ranged_messages.id_range_end}.json"
 
     destination_file_path = f"{src_dir}/{destination_file_name}"
-    write_json(destination_file_path, book_formatter.to_json())
+    # the book is formatted and written page by page
+    with measure_stage(layout_stats, 'export'):
+        book_formatter.to_json_file(destination_file_path, compact=compact_json)
     print(f"Written a book with {len(book.get_pages())} page(s)")
 
     move_to_bookcopy_dir(destination_file_path, destination_file_name)
+    debug_artifacts.close()
+
+    if layout_stats is not None:
+        print(layout_stats.get_summary())
 
 
-asyncio.run(__main__(sys.argv))
+if __name__ == '__main__':
+    # validation is a full layout per message, so it runs on all cores
+    with ProcessPoolExecutor(initializer=open_process_measurer,
+                             initargs=(char_width_dict_file, measurements_db_file)) as executor:
+        # worker processes are started before the event loop, so forked ones don't inherit it and its connections
+        executor.submit(int).result()
+        asyncio.run(__main__(sys.argv, executor))
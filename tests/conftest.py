@@ -0,0 +1,139 @@
+import asyncio
+import importlib
+import os
+import random
+import sys
+import types
+from concurrent.futures import Executor
+from dataclasses import dataclass
+
+import pytest
+
+from bookmaster.book_formatter import McBookFormatter
+from bookmaster.book_writer import BookWriter
+from bookmaster.book_writing_config import BookWritingConfig
+from bookmaster.character_ruler import McCharRuler, get_ruler
+from bookmaster.model.text_root_unit import TextRootUnit
+from bookmaster.model.text_unit import TextUnit
+from bookmaster.text_container import McBook
+from bookmaster.text_unit_reader import TextUnitReader
+
+# absolute, so tests can change the working directory
+CHAR_WIDTH_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'bookmaster', 'char_width.txt'))
+
+WORDS = ('a I the of and to in is was that he for it with as his on be at by had are but from or have an they '
+         'which one you were her all she there would their we him been has when who will more no if out so said '
+         'what up its about into than them can only other new some could time these two may then do first any my '
+         'Hello, world! Really? yes: no; (paren) "quote" …dots supercalifragilistic Привет мир §9blue §lbold§r').split()
+
+
+@pytest.fixture
+def ruler() -> McCharRuler:
+    return get_ruler(CHAR_WIDTH_FILE)
+
+
+# text - raw text of a TextRootUnit or any root unit
+def create_writer(text: str | TextUnit, config: BookWritingConfig | None = None,
+                  executor: Executor | None = None) -> BookWriter:
+    root_unit = TextRootUnit(text) if isinstance(text, str) else text
+    writer_args = {} if config is None else {'config': config}
+    return BookWriter(reader=TextUnitReader(text_unit=root_unit), ruler=get_ruler(CHAR_WIDTH_FILE),
+                      executor=executor, **writer_args)
+
+
+def write_book(text: str | TextUnit, config: BookWritingConfig | None = None) -> McBook:
+    return create_writer(text, config=config).write()
+
+
+def get_page_lines(book: McBook) -> list[list[str]]:
+    return McBookFormatter(book).to_json()['pages']
+
+
+# the same random texts on every run: paragraphs of words with punctuation, style codes and page tags
+def generate_texts(texts_count: int, max_paragraphs_count: int = 8, seed: int = 7) -> list[str]:
+    rand = random.Random(seed)
+    texts = []
+    for _ in range(texts_count):
+        paragraphs = []
+        for _ in range(rand.randint(1, max_paragraphs_count)):
+            words = []
+            for _ in range(rand.randint(1, 60)):
+                word = rand.choice(WORDS)
+                if rand.random() < 0.08:
+                    word += rand.choice(['.', '!', '?', ',', ';'])
+                words.append(word)
+            paragraph = ' '.join(words)
+            if rand.random() < 0.15:
+                paragraph = '{{$new_page}}' + paragraph
+            paragraphs.append(paragraph)
+        texts.append('\n'.join(paragraphs))
+
+    return texts
+
+
+@dataclass
+class FakeMessage:
+    id: int
+    message: str | None
+    entities: list | None = None
+    reactions: object | None = None
+    media: object | None = None
+    reply_markup: object | None = None
+
+
+# Stands in for TelegramClient: the channel has messages with ids from 1 to newest_id except deleted_ids,
+# requests with numbers from flood_wait_requests fail with a flood wait error
+class FakeTelegramClient:
+
+    def __init__(self, newest_id: int, flood_wait_requests: set[int] = None, request_seconds: float = 0.01,
+                 deleted_ids: set[int] = None):
+        self.newest_id = newest_id
+        self.flood_wait_requests = flood_wait_requests if flood_wait_requests is not None else set()
+        self.request_seconds = request_seconds
+        self.deleted_ids = deleted_ids if deleted_ids is not None else set()
+        self.requests_count = 0
+        self.requested_offset_ids = []
+        self.requests_in_flight = 0
+        self.max_requests_in_flight = 0
+
+    async def start(self):
+        pass
+
+    async def get_entity(self, channel_username):
+        return channel_username
+
+    async def get_messages(self, channel, offset_id, limit):
+        self.requests_count += 1
+        self.requested_offset_ids.append(offset_id)
+        request_number = self.requests_count
+
+        self.requests_in_flight += 1
+        self.max_requests_in_flight = max(self.max_requests_in_flight, self.requests_in_flight)
+        try:
+            await asyncio.sleep(self.request_seconds)
+            if request_number in self.flood_wait_requests:
+                from telethon.errors import FloodWaitError
+                raise FloodWaitError(request=None, capture=0)
+
+            first_id = offset_id - 1 if offset_id > 0 else self.newest_id
+            message_ids = [message_id for message_id in range(first_id, 0, -1) if message_id not in self.deleted_ids]
+            return [FakeMessage(id=message_id, message=f"message {message_id}") for message_id in message_ids[:limit]]
+        finally:
+            self.requests_in_flight -= 1
+
+
+# other.telegram.tg_tool talking to a FakeTelegramClient
+@pytest.fixture
+def tg_tool(monkeypatch, tmp_path):
+    pytest.importorskip('telethon')
+    # credentials are not needed to talk to a fake client
+    tg_credits = types.ModuleType('other.telegram.tg_credits')
+    tg_credits.API_ID = 1
+    tg_credits.API_HASH = 'hash'
+    monkeypatch.setitem(sys.modules, 'other.telegram.tg_credits', tg_credits)
+    # the module creates a telegram client, its session file is created in the current directory
+    monkeypatch.chdir(tmp_path)
+
+    tg_tool = importlib.import_module('other.telegram.tg_tool')
+    monkeypatch.setattr(tg_tool, 'request_delay', 0.001)
+    return tg_tool
@@ -0,0 +1,65 @@
+import json
+
+from bookmaster.book_formatter import McBookFormatter
+from other.io_utils import write_json
+from tests.conftest import create_writer, write_book
+
+RAW_TEXT = 'The first paragraph with §lbold words§r.\nThe second one.{{$new_page}}The last page.'
+
+
+def __create_formatter() -> McBookFormatter:
+    book = write_book(RAW_TEXT)
+    book.set_title(title='Title')
+    return McBookFormatter(book)
+
+
+def test_files_are_written_into_the_current_directory(tmp_path, monkeypatch):
+    formatter = __create_formatter()
+    monkeypatch.chdir(tmp_path)
+
+    assert formatter.to_json_file('book.json') == 2
+    with open('book.json', 'r') as file:
+        assert json.load(file) == formatter.to_json()
+
+    assert formatter.to_pretty_text_file('book.txt') == 2
+    with open('book.txt', 'r') as file:
+        assert file.read() == formatter.to_pretty_text()
+
+
+def test_files_are_written_into_new_directories(tmp_path):
+    formatter = __create_formatter()
+
+    json_file = str(tmp_path / 'json' / 'book.json')
+    formatter.to_json_file(json_file)
+    with open(json_file, 'r') as file:
+        assert json.load(file) == formatter.to_json()
+
+    text_file = str(tmp_path / 'text' / 'book.txt')
+    formatter.to_pretty_text_file(text_file)
+    with open(text_file, 'r') as file:
+        assert file.read() == formatter.to_pretty_text()
+
+
+def test_json_file_is_the_same_as_write_json(tmp_path):
+    formatter = __create_formatter()
+
+    json_file = str(tmp_path / 'book.json')
+    formatter.to_json_file(json_file)
+    expected_json_file = str(tmp_path / 'expected_book.json')
+    write_json(expected_json_file, formatter.to_json())
+
+    with open(json_file, 'r') as file, open(expected_json_file, 'r') as expected_file:
+        assert file.read() == expected_file.read()
+
+
+def test_json_of_iter_pages_is_the_same_as_json_of_write(tmp_path):
+    expected_json_file = str(tmp_path / 'expected_book.json')
+    McBookFormatter(write_book(RAW_TEXT)).to_json_file(expected_json_file)
+
+    json_file = str(tmp_path / 'book.json')
+    with open(json_file, 'w') as file:
+        # pages are written as they are laid out
+        assert McBookFormatter.write_json(file=file, pages=create_writer(RAW_TEXT).iter_pages()) == 2
+
+    with open(json_file, 'r') as file, open(expected_json_file, 'r') as expected_file:
+        assert file.read() == expected_file.read()
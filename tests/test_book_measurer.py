@@ -0,0 +1,44 @@
+from bookmaster import character_ruler
+from bookmaster.book_measurer import BookMeasurer
+from bookmaster.model.text_root_unit import TextRootUnit
+from bookmaster.model.text_unit import TextUnit
+from tests.conftest import write_book
+
+RAW_TEXT = '\n'.join(
+    f'Paragraph {index}: §lsome bold words§r and plain ones, repeated {index} times. ' * (index % 7 + 1)
+    for index in range(40)
+) + '\n{{$new_page}}The last page.'
+
+
+def __get_paragraph_units(root_unit: TextUnit) -> list[TextUnit]:
+    return [paragraph_unit
+            for tagged_unit in root_unit.get_sub_units()
+            for paragraph_unit in tagged_unit.get_sub_units()]
+
+
+def test_get_widths_is_the_same_as_get_width(ruler, monkeypatch):
+    monkeypatch.setattr(character_ruler.McCharRuler, 'batch_min_texts_count', 1)
+
+    batch_widths = TextUnit.get_widths(__get_paragraph_units(TextRootUnit(RAW_TEXT)), ruler=ruler)
+    unit_widths = [paragraph_unit.get_width(ruler=ruler)
+                   for paragraph_unit in __get_paragraph_units(TextRootUnit(RAW_TEXT))]
+
+    assert batch_widths == unit_widths
+
+
+def test_min_pages_count_is_a_lower_bound(ruler):
+    book = write_book(RAW_TEXT)
+
+    min_pages_count = BookMeasurer(ruler=ruler).get_min_pages_count(root_unit=TextRootUnit(RAW_TEXT))
+
+    assert 0 < min_pages_count <= book.get_pages_count()
+
+
+def test_measure_is_the_same_as_write(ruler):
+    book = write_book(RAW_TEXT)
+
+    measurement = BookMeasurer(ruler=ruler).measure_text(raw_text=RAW_TEXT, max_pages_count=100)
+
+    assert measurement.fits_page_limit
+    assert measurement.pages_count == book.get_pages_count()
+    assert measurement.last_page_lines_count == len(book.get_pages()[-1].get_lines())
@@ -0,0 +1,43 @@
+import pytest
+
+from other.book_utils import RawTemplate, fill_up_raw_template
+
+RAW_TEMPLATES = [
+    'Joke №{{joke_number}}\n{{joke}}\n',
+    '{{content}}',
+    '{{a}} and {{b}} and {{a}} and {{missing}}',
+    '{{{{a}}}} braces {{b}',
+    'no placeholders',
+]
+
+ARGS_DICTIONARIES = [
+    {'joke_number': 1, 'joke': 'a plain joke', 'content': 'x', 'a': 'A', 'b': 'B'},
+    {'joke_number': 2, 'joke': 'a joke with {{content}} inside', 'content': 'y', 'a': '{{b}}', 'b': 'B'},
+    {'a': '{', 'b': '}'},
+    {},
+]
+
+
+# the way templates were filled up before, one argument after another
+def __replace_args(raw_template: str, args_dictionary: dict) -> str:
+    raw_content = raw_template
+    for arg_key, arg_value in args_dictionary.items():
+        raw_content = raw_content.replace(f"{{{{{arg_key}}}}}", str(arg_value))
+
+    return raw_content
+
+
+@pytest.mark.parametrize('raw_template', RAW_TEMPLATES)
+def test_fill_up_is_the_same_as_replace(raw_template):
+    for args_dictionary in ARGS_DICTIONARIES:
+        expected_content = __replace_args(raw_template, args_dictionary)
+
+        assert RawTemplate(raw_template).fill_up(args_dictionary) == expected_content
+        assert fill_up_raw_template(raw_template=raw_template, args_dictionary=args_dictionary) == expected_content
+
+
+@pytest.mark.parametrize('raw_template', RAW_TEMPLATES)
+def test_fill_up_many_is_the_same_as_fill_up(raw_template):
+    template = RawTemplate(raw_template)
+
+    assert template.fill_up_many(iter(ARGS_DICTIONARIES)) == list(map(template.fill_up, ARGS_DICTIONARIES))
@@ -0,0 +1,148 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from bookmaster.book_layout import BookLayout
+from bookmaster.book_writer import BookWriter
+from bookmaster.book_writing_config import BookWritingConfig
+from bookmaster.model.text_root_unit import TextRootUnit
+from bookmaster.text_container import McBook
+from tests.conftest import create_writer, generate_texts, get_page_lines, write_book
+
+PARAGRAPHS = [
+    f'Paragraph {index}: some §lbold words§r and plain ones, repeated {index % 5 + 1} times. ' * (index % 5 + 1)
+    for index in range(60)
+]
+
+NEW_PAGE_TAG = '{{$new_page}}'
+
+# texts of several page segments, see TextRootUnit.get_page_segments
+SEGMENTED_TEXTS = [
+    '\n'.join(NEW_PAGE_TAG + paragraph if index % 7 == 0 else paragraph for index, paragraph in enumerate(PARAGRAPHS)),
+    f'{NEW_PAGE_TAG}The first page.{NEW_PAGE_TAG}{NEW_PAGE_TAG}Two tags.\nA paragraph {NEW_PAGE_TAG}split by a tag.',
+    f'§lBold words {NEW_PAGE_TAG}after a new page tag.\n§r{NEW_PAGE_TAG}   Spaces at the start of a segment.',
+] + [raw_text for raw_text in generate_texts(texts_count=40, max_paragraphs_count=30, seed=11)
+     if len(TextRootUnit(raw_text).get_page_segments()) > 1][:10]
+
+
+def __write_layout(raw_text: str) -> BookLayout:
+    writer = create_writer(raw_text)
+    return writer.get_layout(writer.write())
+
+
+def __rewrite(raw_text: str, previous_layout: BookLayout, monkeypatch) -> tuple[McBook, BookLayout]:
+    writer = create_writer(raw_text)
+    with monkeypatch.context() as patch:
+        # the previous layout must be reused, not replaced by a full layout
+        patch.setattr(BookWriter, 'write', lambda _: pytest.fail('rewrite fell back to write'))
+        book = writer.rewrite(previous_layout)
+    return book, writer.get_layout(book)
+
+
+def __get_page_line_widths(book: McBook) -> list[list[int]]:
+    return [[line.get_width() for line in page.get_lines()] for page in book.get_pages()]
+
+
+@pytest.mark.parametrize('edit_paragraphs', [
+    lambda paragraphs: ['The new start.'] + paragraphs[1:],
+    lambda paragraphs: paragraphs[:30] + [paragraphs[30] + ' The paragraph got longer.'] + paragraphs[31:],
+    lambda paragraphs: paragraphs[:-1] + ['The new end.'],
+    lambda paragraphs: paragraphs[:20] + ['An inserted paragraph.'] * 3 + paragraphs[20:],
+    lambda paragraphs: paragraphs[:20] + paragraphs[24:],
+    lambda paragraphs: paragraphs[:25] + ['{{$new_page}}A new page.'] + paragraphs[25:],
+    lambda paragraphs: paragraphs,
+], ids=['prefix', 'middle', 'suffix', 'insert', 'delete', 'new page', 'same'])
+def test_rewrite_is_the_same_as_write(edit_paragraphs, monkeypatch):
+    previous_layout = __write_layout('\n'.join(PARAGRAPHS))
+    raw_text = '\n'.join(edit_paragraphs(PARAGRAPHS))
+
+    book, layout = __rewrite(raw_text, previous_layout=previous_layout, monkeypatch=monkeypatch)
+
+    assert get_page_lines(book) == get_page_lines(write_book(raw_text))
+    assert layout == __write_layout(raw_text)
+
+
+def test_rewrite_of_rewritten_layout(monkeypatch):
+    layout = __write_layout('\n'.join(PARAGRAPHS))
+    paragraphs = PARAGRAPHS
+    for index in [40, 10, 55]:
+        paragraphs = paragraphs[:index] + ['An edited paragraph.'] + paragraphs[index + 1:]
+        book, layout = __rewrite('\n'.join(paragraphs), previous_layout=layout, monkeypatch=monkeypatch)
+
+    raw_text = '\n'.join(paragraphs)
+    assert get_page_lines(book) == get_page_lines(write_book(raw_text))
+
+
+def test_rewrite_falls_back_to_write_if_reused_lines_dont_fit():
+    previous_layout = __write_layout('\n'.join(PARAGRAPHS))
+    # the first page is reused, but its line doesn't fit anymore
+    previous_layout.page_lines[0][0] = 'too wide ' * 100
+    raw_text = '\n'.join(PARAGRAPHS[:-1] + ['The new end.'])
+
+    book = create_writer(raw_text).rewrite(previous_layout)
+
+    assert get_page_lines(book) == get_page_lines(write_book(raw_text))
+
+
+@pytest.mark.parametrize('allow_new_sentence_on_the_last_line', [False, True])
+def test_iter_pages_is_the_same_as_write(allow_new_sentence_on_the_last_line):
+    config = BookWritingConfig(allow_new_sentence_on_the_last_line=allow_new_sentence_on_the_last_line)
+    for raw_text in SEGMENTED_TEXTS + generate_texts(texts_count=10):
+        book = write_book(raw_text, config=config)
+        pages = list(create_writer(raw_text, config=config).iter_pages())
+
+        assert [[line.get_text() for line in page.get_lines()] for page in pages] == get_page_lines(book)
+        assert [[line.get_width() for line in page.get_lines()] for page in pages] == __get_page_line_widths(book)
+
+
+def test_iter_pages_yields_pages_before_the_text_is_written():
+    root_unit = TextRootUnit('\n'.join(PARAGRAPHS))
+    pages = create_writer(root_unit).iter_pages()
+
+    first_page = next(pages)
+    built_units_count = root_unit.get_tree_stats().built_units_count
+    pages_count = 1 + len(list(pages))
+
+    assert pages_count > 1
+    assert built_units_count < root_unit.get_tree_stats().built_units_count
+    assert [line.get_text() for line in first_page.get_lines()] == get_page_lines(write_book(root_unit))[0]
+
+
+@pytest.fixture(scope='module')
+def executor():
+    # spawned workers import the modules again, so patches of the test process don't reach them
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn')) as executor:
+        yield executor
+
+
+@pytest.mark.parametrize('raw_text', SEGMENTED_TEXTS)
+def test_parallel_write_is_the_same_as_write(raw_text, executor, monkeypatch):
+    writer = create_writer(raw_text)
+    book = writer.write()
+
+    parallel_writer = create_writer(raw_text, executor=executor)
+    with monkeypatch.context() as patch:
+        # the pages must be put together from the segments, not written sequentially
+        patch.setattr(BookWriter, '_BookWriter__write_pages',
+                      lambda *_, **__: pytest.fail('write fell back to the sequential layout'))
+        parallel_book = parallel_writer.write()
+
+    assert get_page_lines(parallel_book) == get_page_lines(book)
+    assert __get_page_line_widths(parallel_book) == __get_page_line_widths(book)
+    # page starts are taken from the segments
+    assert parallel_writer.get_layout(parallel_book) == writer.get_layout(book)
+
+
+@pytest.mark.parametrize('raw_text', [
+    NEW_PAGE_TAG.join(['word ' * 300] * 120),
+    'word ' * 30000 + NEW_PAGE_TAG + 'The last page.',
+], ids=['segments over the page limit', 'segment over the page limit'])
+def test_parallel_write_of_too_long_text_is_the_same_as_write(raw_text, executor):
+    with pytest.raises(ValueError) as error:
+        write_book(raw_text)
+
+    with pytest.raises(ValueError) as parallel_error:
+        create_writer(raw_text, executor=executor).write()
+
+    assert str(parallel_error.value) == str(error.value)
@@ -0,0 +1,148 @@
+import os
+import shutil
+
+import pytest
+
+from bookmaster import character_ruler
+from bookmaster.character_ruler import McCharRuler, get_ruler
+from tests.conftest import CHAR_WIDTH_FILE, generate_texts
+
+STYLED_TEXTS = [
+    '',
+    'abc',
+    '§lab§rc',
+    '§l§cx',
+    '§lab',
+    'a§l',
+    '§r§lword§6 tail',
+    '§oitalic§l bold§9 blue',
+    'plain text, with spaces',
+]
+
+
+# the ruler of conftest, measuring with and without numpy
+@pytest.fixture(params=['numpy', 'no_numpy'])
+def ruler(request, monkeypatch):
+    if request.param == 'numpy':
+        if character_ruler.numpy is None:
+            pytest.skip('numpy is not installed')
+        # the test texts are measured in a batch even though there are only a few of them
+        monkeypatch.setattr(character_ruler.McCharRuler, 'batch_min_texts_count', 1)
+    else:
+        monkeypatch.setattr(character_ruler, 'numpy', None)
+
+    return get_ruler(CHAR_WIDTH_FILE)
+
+
+@pytest.mark.parametrize('bold', [False, True])
+def test_get_widths_is_the_same_as_get_width(ruler, bold):
+    bolds = [bold] * len(STYLED_TEXTS)
+    expected_widths = [ruler.get_width(text, bold) for text in STYLED_TEXTS]
+
+    assert ruler.get_widths(STYLED_TEXTS, bolds) == expected_widths
+
+
+def test_get_widths_without_bolds(ruler):
+    assert ruler.get_widths(STYLED_TEXTS) == [ruler.get_width(text) for text in STYLED_TEXTS]
+
+
+def test_bold_run_is_wider(ruler):
+    # one extra pixel for each bold character, codes are not visible
+    assert ruler.get_width('§lab§rc') == ruler.get_width('abc') + 2 * ruler.bold_extra_width
+    # a color code resets the bold format
+    assert ruler.get_width('§l§cx') == ruler.get_width('x')
+    assert ruler.get_width('ab', bold=True) == ruler.get_width('ab') + 2 * ruler.bold_extra_width
+    assert ruler.get_width('§rab', bold=True) == ruler.get_width('ab')
+
+
+# get_width before the codes were stripped in one pass and widths were memoized
+def __get_width_by_chars(ruler, text: str) -> int:
+    for code in list(ruler.colors_codes) + list(ruler.formatting_codes):
+        text = text.replace(code, '')
+
+    return sum(ruler.char_to_width_dict[char] for char in text) + max(len(text) - 1, 0) * ruler.between_chars_width
+
+
+def test_get_width_is_the_same_as_measuring_chars(ruler):
+    # bold characters got wider since then
+    texts = [text for text in STYLED_TEXTS if '§l' not in text]
+    texts += [' '.join(generate_texts(texts_count=1, seed=seed)).replace('§l', '§o') for seed in range(5)]
+    texts += ['§' + code + 'a' for code in '0123456789abcdefkmnor'] + ['§r§6§o', 'a§9b§rc']
+
+    for text in texts:
+        assert ruler.get_width(text) == __get_width_by_chars(ruler, text), text
+
+
+def test_get_width_is_memoized(ruler):
+    text = 'a text measured twice, ' + str(ruler.get_width_cache_info().misses)
+    cache_info = ruler.get_width_cache_info()
+
+    assert ruler.get_width(text) == ruler.get_width(text)
+    assert ruler.get_width_cache_info().misses == cache_info.misses + 1
+    assert ruler.get_width_cache_info().hits == cache_info.hits + 1
+    assert ruler.get_width_cache_info().maxsize == ruler.width_cache_size
+
+
+@pytest.fixture
+def char_width_file(tmp_path, monkeypatch) -> str:
+    # rulers of the copied file are not shared with other tests
+    monkeypatch.setattr(character_ruler, '_rulers', {})
+    char_width_file = str(tmp_path / 'char_width.txt')
+    shutil.copyfile(CHAR_WIDTH_FILE, char_width_file)
+    return char_width_file
+
+
+def __get_compiled_table_file(char_width_file: str) -> str:
+    return os.path.join(os.path.dirname(char_width_file), McCharRuler.compiled_table_dir_name, 'char_width.txt.table')
+
+
+def __fail_to_read_char_width_file(monkeypatch):
+    monkeypatch.setattr(McCharRuler, '_McCharRuler__read_char_to_width_dict',
+                        staticmethod(lambda _: pytest.fail('the char width file was read again')))
+
+
+def test_get_ruler_shares_the_ruler_of_a_file(char_width_file, monkeypatch, capsys):
+    ruler = get_ruler(char_width_file)
+
+    monkeypatch.chdir(os.path.dirname(char_width_file))
+    assert get_ruler('char_width.txt') is ruler
+    assert get_ruler(CHAR_WIDTH_FILE) is not ruler
+    assert capsys.readouterr().out == ''
+
+    with pytest.raises(TypeError):
+        ruler.char_to_width_dict['a'] = 1
+
+
+def test_compiled_table_is_loaded_on_the_next_start(char_width_file, monkeypatch):
+    char_to_width_dict = dict(McCharRuler(char_width_dict_file=char_width_file).char_to_width_dict)
+    assert os.path.exists(__get_compiled_table_file(char_width_file))
+    assert char_to_width_dict == dict(get_ruler(CHAR_WIDTH_FILE).char_to_width_dict)
+
+    __fail_to_read_char_width_file(monkeypatch)
+    assert McCharRuler(char_width_dict_file=char_width_file).char_to_width_dict == char_to_width_dict
+
+    # the same content, e.g. the file is checked out again
+    os.utime(char_width_file, ns=(0, 0))
+    assert McCharRuler(char_width_dict_file=char_width_file).char_to_width_dict == char_to_width_dict
+
+
+def test_compiled_table_is_compiled_again_when_the_file_is_changed(char_width_file):
+    ruler = McCharRuler(char_width_dict_file=char_width_file)
+    compiled_table_file = __get_compiled_table_file(char_width_file)
+    with open(compiled_table_file, 'rb') as file:
+        compiled_table = file.read()
+
+    with open(char_width_file, 'r') as file:
+        char_width_text = file.read()
+    mtime_ns = os.stat(char_width_file).st_mtime_ns
+    with open(char_width_file, 'w') as file:
+        file.write(char_width_text.replace('\na\t5\n', '\na\t7\n'))
+    # the size is the same, a quick edit may even keep the mtime on file systems with coarse timestamps
+    os.utime(char_width_file, ns=(mtime_ns + 10 ** 9, mtime_ns + 10 ** 9))
+
+    changed_ruler = McCharRuler(char_width_dict_file=char_width_file)
+
+    assert changed_ruler.get_width('aa') == ruler.get_width('aa') + 4
+    with open(compiled_table_file, 'rb') as file:
+        assert file.read() != compiled_table
+    assert McCharRuler(char_width_dict_file=char_width_file).char_to_width_dict == changed_ruler.char_to_width_dict
@@ -0,0 +1,43 @@
+from other.debug_artifacts import DebugArtifactWriter, DebugLevel, read_text_unit_tree
+
+RAW_TEXT = 'The first paragraph.\nThe second one.{{$new_page}}The last page.'
+
+
+def test_files_are_written_into_the_current_directory(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    debug_artifacts = DebugArtifactWriter(level=DebugLevel.FULL)
+
+    debug_artifacts.write_file('raw_content.txt', lambda: RAW_TEXT)
+    debug_artifacts.write_text_unit_tree('text_units.ndjson', RAW_TEXT)
+    debug_artifacts.close()
+
+    assert 'WARNING' not in capsys.readouterr().out
+    with open('raw_content.txt', 'r') as file:
+        assert file.read() == RAW_TEXT
+    unit_dicts = list(read_text_unit_tree('text_units.ndjson'))
+    assert unit_dicts[0]['address'] == []
+    # tags and paragraph breaks are not texts of units
+    leaf_text = ''.join(unit_dict.get('raw_text', '') for unit_dict in unit_dicts)
+    assert leaf_text == RAW_TEXT.replace('{{$new_page}}', '').replace('\n', '')
+
+
+def test_files_are_written_into_new_directories(tmp_path):
+    debug_artifacts = DebugArtifactWriter(level=DebugLevel.FULL)
+
+    debug_artifacts.write_file(str(tmp_path / 'summary' / 'raw_content.txt'), lambda: RAW_TEXT)
+    debug_artifacts.write_text_unit_tree(str(tmp_path / 'full' / 'text_units.ndjson'), RAW_TEXT)
+    debug_artifacts.close()
+
+    assert (tmp_path / 'summary' / 'raw_content.txt').read_text() == RAW_TEXT
+    assert (tmp_path / 'full' / 'text_units.ndjson').exists()
+
+
+def test_files_above_the_level_are_skipped(tmp_path):
+    debug_artifacts = DebugArtifactWriter(level=DebugLevel.SUMMARY)
+
+    debug_artifacts.write_file(str(tmp_path / 'raw_content.txt'), lambda: RAW_TEXT)
+    debug_artifacts.write_text_unit_tree(str(tmp_path / 'text_units.ndjson'), RAW_TEXT)
+    debug_artifacts.close()
+
+    assert (tmp_path / 'raw_content.txt').exists()
+    assert not (tmp_path / 'text_units.ndjson').exists()
@@ -0,0 +1,134 @@
+import os
+import sqlite3
+
+import pytest
+
+from bookmaster.book_writer import BookMeasurement
+from bookmaster.measurement_cache import MeasurementCache
+
+
+def __create_measurement(pages_count: int) -> BookMeasurement:
+    return BookMeasurement(pages_count=pages_count, last_page_lines_count=3, fits_page_limit=True)
+
+
+def __get_last_used(db_file: str) -> dict[str, int]:
+    connection = sqlite3.connect(db_file)
+    try:
+        return dict(connection.execute('SELECT key, last_used FROM measurements').fetchall())
+    finally:
+        connection.close()
+
+
+def test_get_returns_put_measurement_and_error(tmp_path):
+    cache = MeasurementCache(db_file=str(tmp_path / 'measurements.sqlite'))
+
+    assert cache.get('missing') is None
+
+    cache.put('text', __create_measurement(pages_count=2))
+    assert cache.get('text') == __create_measurement(pages_count=2)
+
+    cache.put('broken', measurement=None, error='too long')
+    with pytest.raises(ValueError, match='too long'):
+        cache.get('broken')
+
+    cache.close()
+
+
+def test_get_doesnt_write_until_flush(tmp_path):
+    db_file = str(tmp_path / 'measurements.sqlite')
+    cache = MeasurementCache(db_file=db_file)
+    cache.put('first', __create_measurement(pages_count=1))
+    cache.put('second', __create_measurement(pages_count=2))
+    last_used = __get_last_used(db_file)
+
+    cache.get('first')
+    assert __get_last_used(db_file) == last_used
+
+    cache.close()
+    assert __get_last_used(db_file)['first'] > last_used['second']
+
+
+def test_get_flushes_every_used_keys_flush_count_reads(tmp_path, monkeypatch):
+    monkeypatch.setattr(MeasurementCache, 'used_keys_flush_count', 3)
+    db_file = str(tmp_path / 'measurements.sqlite')
+    cache = MeasurementCache(db_file=db_file)
+    cache.put('first', __create_measurement(pages_count=1))
+    cache.put('second', __create_measurement(pages_count=2))
+    last_used = __get_last_used(db_file)
+
+    cache.get('first')
+    cache.get('second')
+    assert __get_last_used(db_file) == last_used
+
+    cache.get('first')
+    flushed_last_used = __get_last_used(db_file)
+    # keys are flushed in the order of use
+    assert flushed_last_used['first'] > flushed_last_used['second'] > last_used['second']
+
+    cache.close()
+
+
+def test_eviction_keeps_read_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(MeasurementCache, 'eviction_check_puts_count', 1)
+    cache = MeasurementCache(db_file=str(tmp_path / 'measurements.sqlite'), max_entries_count=10)
+    for index in range(10):
+        cache.put(f'text {index}', __create_measurement(pages_count=index))
+
+    # read entries are flushed by put before the eviction
+    cache.get('text 0')
+    cache.get('text 1')
+    cache.put('text 10', __create_measurement(pages_count=10))
+
+    assert cache.get('text 0') is not None
+    assert cache.get('text 1') is not None
+    assert cache.get('text 2') is None
+    assert cache.get('text 10') is not None
+
+    cache.close()
+
+
+def test_entries_are_counted_once_per_eviction_check_puts_count_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(MeasurementCache, 'eviction_check_puts_count', 5)
+    db_file = str(tmp_path / 'measurements.sqlite')
+    cache = MeasurementCache(db_file=db_file, max_entries_count=3)
+
+    for index in range(5):
+        cache.put(f'text {index}', __create_measurement(pages_count=index))
+    assert len(__get_last_used(db_file)) == 5
+
+    # the 6th write checks the count, the oldest entries are removed
+    cache.put('text 5', __create_measurement(pages_count=5))
+    assert sorted(__get_last_used(db_file)) == ['text 3', 'text 4', 'text 5']
+
+    cache.close()
+
+
+def test_first_write_of_a_process_evicts(tmp_path):
+    db_file = str(tmp_path / 'measurements.sqlite')
+    cache = MeasurementCache(db_file=db_file)
+    for index in range(5):
+        cache.put(f'text {index}', __create_measurement(pages_count=index))
+    cache.close()
+
+    # a short run may never reach eviction_check_puts_count writes
+    cache = MeasurementCache(db_file=db_file, max_entries_count=3)
+    cache.put('text 5', __create_measurement(pages_count=5))
+    assert sorted(__get_last_used(db_file)) == ['text 3', 'text 4', 'text 5']
+
+    cache.close()
+
+
+def test_close_of_another_process_doesnt_flush(tmp_path, monkeypatch):
+    db_file = str(tmp_path / 'measurements.sqlite')
+    cache = MeasurementCache(db_file=db_file)
+    cache.put('text', __create_measurement(pages_count=1))
+    last_used = __get_last_used(db_file)
+    cache.get('text')
+
+    # as if the cache was forked into a worker process
+    parent_pid = os.getpid()
+    monkeypatch.setattr(os, 'getpid', lambda: parent_pid + 1)
+    assert cache.get('missing') is None
+    cache.close()
+
+    assert __get_last_used(db_file) == last_used
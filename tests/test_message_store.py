@@ -0,0 +1,126 @@
+import asyncio
+import importlib
+import sqlite3
+
+import pytest
+
+from tests.conftest import FakeMessage, FakeTelegramClient
+
+
+@pytest.fixture
+def message_store(tg_tool, tmp_path):
+    message_store_module = importlib.import_module('other.telegram.message_store')
+    message_store = message_store_module.MessageStore(db_file=str(tmp_path / 'telegram_messages.sqlite'))
+    yield message_store
+    message_store.close()
+
+
+def __create_messages(message_ids) -> list[FakeMessage]:
+    return [FakeMessage(id=message_id, message=f"message {message_id}") for message_id in message_ids]
+
+
+def __get_loaded_ranges(db_file: str) -> list[tuple[int, int]]:
+    connection = sqlite3.connect(db_file)
+    try:
+        return connection.execute('SELECT id_from, id_to FROM loaded_ranges ORDER BY id_from').fetchall()
+    finally:
+        connection.close()
+
+
+def __load(tg_tool, telegram_client: FakeTelegramClient, message_store, offset_id: int, count: int) -> list[int]:
+    ranged_messages = asyncio.run(tg_tool.load_filtered_messages(
+        channel_username='@channel',
+        offset_id=offset_id,
+        count=count,
+        filter_valid=lambda messages: messages,
+        requrest_size=5,
+        telegram_client=telegram_client,
+        message_store=message_store,
+    ))
+    return [message.id for message in ranged_messages.messages]
+
+
+def test_newest_messages_are_never_read(message_store):
+    message_store.write_messages('@channel', offset_id=0, limit=5, messages=__create_messages(range(100, 95, -1)))
+
+    assert message_store.read_messages('@channel', offset_id=0, limit=5) == ([], 0)
+
+
+def test_read_messages_of_a_loaded_range(message_store):
+    message_store.write_messages('@channel', offset_id=51, limit=10, messages=__create_messages(range(50, 40, -1)))
+
+    messages, offset_id = message_store.read_messages('@channel', offset_id=51, limit=4)
+    assert [message.id for message in messages] == [50, 49, 48, 47]
+    assert offset_id == 47
+
+    # the rest is loaded from the start of the range
+    messages, offset_id = message_store.read_messages('@channel', offset_id=45, limit=10)
+    assert [message.id for message in messages] == [44, 43, 42, 41]
+    assert offset_id == 41
+
+    assert message_store.read_messages('@channel', offset_id=41, limit=10) == ([], 41)
+    assert message_store.read_messages('@other_channel', offset_id=51, limit=10) == ([], 51)
+
+
+def test_adjacent_and_overlapping_ranges_are_merged(message_store, tmp_path):
+    message_store.write_messages('@channel', offset_id=51, limit=10, messages=__create_messages(range(50, 40, -1)))
+    message_store.write_messages('@channel', offset_id=41, limit=10, messages=__create_messages(range(40, 30, -1)))
+    message_store.write_messages('@channel', offset_id=36, limit=10, messages=__create_messages(range(35, 25, -1)))
+
+    assert __get_loaded_ranges(str(tmp_path / 'telegram_messages.sqlite')) == [(26, 50)]
+
+    messages, offset_id = message_store.read_messages('@channel', offset_id=51, limit=30)
+    assert [message.id for message in messages] == list(range(50, 25, -1))
+    assert offset_id == 26
+
+
+def test_missing_ids_of_a_loaded_range_are_skipped(message_store):
+    # deleted messages are not returned by telegram, the range is still loaded completely
+    message_ids = [50, 49, 47, 46, 44, 43, 42, 41, 40, 39]
+    message_store.write_messages('@channel', offset_id=51, limit=10, messages=__create_messages(message_ids))
+
+    messages, offset_id = message_store.read_messages('@channel', offset_id=51, limit=10)
+    assert [message.id for message in messages] == message_ids
+    assert offset_id == 39
+
+    messages, offset_id = message_store.read_messages('@channel', offset_id=49, limit=3)
+    assert [message.id for message in messages] == [47, 46, 44]
+    assert offset_id == 44
+
+
+def test_the_first_messages_of_a_channel_are_loaded_completely(message_store):
+    # less messages than requested, there is nothing older
+    message_store.write_messages('@channel', offset_id=6, limit=10, messages=__create_messages([5, 3, 2]))
+
+    messages, offset_id = message_store.read_messages('@channel', offset_id=6, limit=10)
+    assert [message.id for message in messages] == [5, 3, 2]
+    assert offset_id == 1
+
+
+def test_second_load_makes_no_requests(tg_tool, message_store):
+    first_client = FakeTelegramClient(newest_id=100, deleted_ids={97, 93, 92})
+    loaded_ids = __load(tg_tool, first_client, message_store, offset_id=101, count=12)
+    assert first_client.requests_count > 0
+
+    second_client = FakeTelegramClient(newest_id=100, deleted_ids={97, 93, 92})
+    assert __load(tg_tool, second_client, message_store, offset_id=101, count=12) == loaded_ids
+    assert second_client.requests_count == 0
+
+
+def test_the_newest_messages_are_always_requested(tg_tool, message_store):
+    __load(tg_tool, FakeTelegramClient(newest_id=100), message_store, offset_id=0, count=10)
+
+    telegram_client = FakeTelegramClient(newest_id=100)
+    assert __load(tg_tool, telegram_client, message_store, offset_id=0, count=10) == list(range(100, 90, -1))
+    # the first request asks for the newest messages, the next ones are stored
+    assert telegram_client.requested_offset_ids == [0]
+
+
+def test_only_the_gap_is_requested(tg_tool, message_store):
+    __load(tg_tool, FakeTelegramClient(newest_id=100), message_store, offset_id=101, count=10)
+
+    telegram_client = FakeTelegramClient(newest_id=100)
+    assert __load(tg_tool, telegram_client, message_store, offset_id=101, count=20) == list(range(100, 80, -1))
+    # ids 100-91 were loaded by the first run
+    assert len(telegram_client.requested_offset_ids) > 0
+    assert max(telegram_client.requested_offset_ids) <= 91
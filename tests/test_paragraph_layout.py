@@ -0,0 +1,43 @@
+import re
+
+import pytest
+
+from bookmaster.book_writing_config import BookWritingConfig
+from bookmaster.text_container import McBook, McLine, McPage
+from tests.conftest import WORDS, generate_texts, write_book
+
+
+def __get_visible_text(book: McBook) -> str:
+    # line breaks may be placed at other spaces
+    return re.sub(r'\s', '', ''.join(line.get_text() for page in book.get_pages() for line in page.get_lines()))
+
+
+@pytest.mark.parametrize('allow_new_sentence_on_the_last_line', [False, True])
+def test_optimal_layout_is_not_longer_than_write(allow_new_sentence_on_the_last_line):
+    for raw_text in generate_texts(texts_count=30):
+        greedy_book = write_book(raw_text, BookWritingConfig(allow_new_sentence_on_the_last_line))
+        optimal_book = write_book(raw_text, BookWritingConfig(allow_new_sentence_on_the_last_line,
+                                                           optimal_line_breaking=True))
+
+        assert __get_visible_text(optimal_book) == __get_visible_text(greedy_book)
+        assert optimal_book.get_pages_count() <= greedy_book.get_pages_count()
+
+        for page in optimal_book.get_pages():
+            assert len(page.get_lines()) <= McPage.max_line_number
+            for line in page.get_lines():
+                assert line.get_width() <= McLine.max_width_px, line.get_text()
+
+
+def test_optimal_layout_is_less_ragged():
+    raw_text = ' '.join(WORDS[:80]) + '.'
+    greedy_book = write_book(raw_text, BookWritingConfig(True))
+    optimal_book = write_book(raw_text, BookWritingConfig(True, optimal_line_breaking=True))
+
+    def get_raggedness(book: McBook) -> int:
+        lines = [line for page in book.get_pages() for line in page.get_lines()]
+        return sum((McLine.max_width_px - line.get_width()) ** 2 for line in lines[:-1])
+
+    optimal_lines_count = sum(len(page.get_lines()) for page in optimal_book.get_pages())
+    greedy_lines_count = sum(len(page.get_lines()) for page in greedy_book.get_pages())
+    assert optimal_lines_count <= greedy_lines_count
+    assert get_raggedness(optimal_book) <= get_raggedness(greedy_book)
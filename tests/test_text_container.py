@@ -0,0 +1,51 @@
+import json
+import os
+
+import pytest
+
+from bookmaster.book_writing_config import BookWritingConfig
+from bookmaster.model.text_root_unit import TextRootUnit
+from bookmaster.model.text_unit import TextUnit
+from bookmaster.text_container import McLine
+from tests.conftest import generate_texts, get_page_lines, write_book
+
+# pages of generate_texts(texts_count=8) written before lines kept their width, §l codes are replaced by §o,
+# as bold characters got wider since then
+with open(os.path.join(os.path.dirname(__file__), 'data', 'page_lines.json'), 'r', encoding='utf-8') as file:
+    EXPECTED_BOOKS = json.load(file)
+
+
+def __get_leaf_units(text_unit: TextUnit) -> list[TextUnit]:
+    sub_units = text_unit.get_sub_units()
+    if len(sub_units) == 0:
+        return [text_unit]
+
+    return [leaf_unit for sub_unit in sub_units for leaf_unit in __get_leaf_units(sub_unit)]
+
+
+def test_line_width_is_the_width_of_its_units(ruler):
+    config = BookWritingConfig(allow_new_sentence_on_the_last_line=False)
+    for raw_text in generate_texts(texts_count=10):
+        line = McLine(ruler=ruler, writing_config=config)
+        for text_unit in __get_leaf_units(TextRootUnit(raw_text)):
+            text_units = list(line.get_text_units())
+            width_px = line.get_width()
+            # the line is the same as if all its units were measured again
+            fits = ruler.get_width_of_text_units(text_units + [text_unit]) <= McLine.max_width_px
+
+            assert line.try_append(text_unit) == fits
+            if fits:
+                assert line.get_text_units() == text_units + [text_unit]
+            else:
+                # a unit that doesn't fit leaves the line as it was
+                assert line.get_text_units() == text_units
+                assert line.get_width() == width_px
+                line = McLine(ruler=ruler, writing_config=config)
+                assert line.try_append(text_unit) == text_unit.fits_width(ruler, McLine.max_width_px)
+
+            assert line.get_width() == ruler.get_width_of_text_units(line.get_text_units())
+
+
+@pytest.mark.parametrize('expected_book', EXPECTED_BOOKS)
+def test_layout_is_not_changed(expected_book):
+    assert get_page_lines(write_book(expected_book['raw_text'])) == expected_book['pages']
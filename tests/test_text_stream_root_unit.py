@@ -0,0 +1,58 @@
+import pytest
+
+from bookmaster.model.text_root_unit import TextRootUnit
+from bookmaster.model.text_stream_root_unit import TextStreamRootUnit, _TextStreamParser
+from tests.conftest import create_writer, get_page_lines, write_book
+
+RAW_TEXT = (
+    'Hi\n'
+    'This text represents raw string input that obviously does not fit into a single line of Minecraft Book. '
+    'But with the help of the python script this text can be formatted in a way to fit.\n'
+    '\n'
+    '       …and this paragraph starts with some spaces, §lbold words§r and §9colored§r ones.\n'
+    '{{$new_page}}This text will always start with a new page.\n'
+    'A paragraph right after it. {{$new_page}}A new page in the middle of a §lparagraph.\n'
+    '{{$new_page}}{{$new_page}}Two tags in a row.\n'
+    'The end {{ of the text with braces } and {{$ which are not tags'
+)
+
+
+def __split_to_chunks(raw_text: str, chunk_size: int) -> list[str]:
+    return [raw_text[index:index + chunk_size] for index in range(0, len(raw_text), chunk_size)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, len(RAW_TEXT)])
+def test_stream_layout_is_the_same_as_write(chunk_size):
+    stream_root_unit = TextStreamRootUnit(chunks=__split_to_chunks(RAW_TEXT, chunk_size))
+
+    assert get_page_lines(write_book(stream_root_unit)) == get_page_lines(write_book(TextRootUnit(RAW_TEXT)))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 64])
+def test_stream_iter_pages_is_the_same_as_write(chunk_size):
+    book_writer = create_writer(TextStreamRootUnit(chunks=__split_to_chunks(RAW_TEXT, chunk_size)))
+    page_lines = [[line.get_text() for line in page.get_lines()] for page in book_writer.iter_pages()]
+
+    assert page_lines == get_page_lines(write_book(RAW_TEXT))
+
+
+def test_unclosed_tag_is_not_held_back():
+    read_chunks_count = 0
+
+    def read_chunks():
+        nonlocal read_chunks_count
+        for chunk in ['start {{$not closed '] + ['text without tags '] * 1000:
+            read_chunks_count += 1
+            yield chunk
+
+    items = _TextStreamParser._TextStreamParser__split_tags(read_chunks())
+    text = ''
+    while 'not closed text without tags' not in text:
+        is_tag, value = next(items)
+        assert not is_tag
+        text += value
+
+    # the beginning of the unclosed tag is passed on as text as soon as it's longer than any known tag,
+    # the rest of the chunks is not read for it
+    assert text.startswith('start {{$not closed ')
+    assert read_chunks_count <= 3
@@ -0,0 +1,45 @@
+from bookmaster.model.text_style import split_style_runs, is_bold_after
+from bookmaster.text_container import McLine
+from tests.conftest import get_page_lines, write_book
+
+BOLD_TEXT = ('§lMinecraft books are drawn with a font where every bold character is wider. '
+             'A long paragraph of bold words must still fit into the lines of the page. ') * 6
+
+
+def __get_line_texts(raw_text: str) -> list[str]:
+    return [line_text for page_lines in get_page_lines(write_book(raw_text)) for line_text in page_lines]
+
+
+def test_split_style_runs():
+    assert split_style_runs('abc') == ['abc']
+    assert split_style_runs('a §lb§r') == ['a ', '§l', 'b', '§r', '']
+
+
+def test_is_bold_after():
+    assert is_bold_after('a §lb', bold=False)
+    assert not is_bold_after('§lb§r', bold=False)
+    assert not is_bold_after('§lb§c', bold=False)
+    assert is_bold_after('abc', bold=True)
+
+
+def test_bold_lines_fit_the_line_width(ruler):
+    line_texts = __get_line_texts(BOLD_TEXT)
+
+    # the whole text is bold, so every line is measured as bold
+    for line_text in line_texts:
+        assert ruler.get_width(line_text, bold=True) <= McLine.max_width_px, line_text
+
+
+def test_bold_text_takes_more_lines():
+    plain_line_texts = __get_line_texts(BOLD_TEXT.replace('§l', ''))
+    bold_line_texts = __get_line_texts(BOLD_TEXT)
+
+    assert len(bold_line_texts) > len(plain_line_texts)
+
+
+def test_reset_code_ends_bold():
+    # the same text after the reset code is laid out as a plain one
+    plain_text = 'Plain words after the bold ones are measured without the bold advance. ' * 4
+    line_texts = __get_line_texts(f'§lbold§r\n{plain_text}')
+
+    assert line_texts[1:] == __get_line_texts(f'bold\n{plain_text}')[1:]
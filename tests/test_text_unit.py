@@ -0,0 +1,99 @@
+import json
+import os
+
+import pytest
+
+from bookmaster.character_ruler import McCharRuler
+from bookmaster.model.text_root_unit import TextRootUnit
+from bookmaster.model.text_unit import TextUnit, TextUnitTreeStats
+from bookmaster.text_container import McLine
+from tests.conftest import CHAR_WIDTH_FILE, generate_texts, write_book
+
+# dicts of trees that were created at once, before sub units were created on the first access
+with open(os.path.join(os.path.dirname(__file__), 'data', 'text_unit_trees.json'), 'r', encoding='utf-8') as file:
+    EXPECTED_TREES = json.load(file)
+
+
+def __get_tree_units(text_unit: TextUnit) -> list[TextUnit]:
+    return [text_unit] + [unit for sub_unit in text_unit.get_sub_units() for unit in __get_tree_units(sub_unit)]
+
+
+# the last sub units are created first
+def __create_tree_backwards(text_unit: TextUnit):
+    for sub_unit in reversed(text_unit.get_sub_units()):
+        __create_tree_backwards(sub_unit)
+
+
+def __get_unit_states(text_units: list[TextUnit]) -> list[tuple]:
+    return [(type(text_unit).__name__, text_unit.get_raw_text(), text_unit.get_format_flags(),
+             text_unit.is_bold_at_start()) for text_unit in text_units]
+
+
+@pytest.mark.parametrize('expected_tree', EXPECTED_TREES)
+def test_lazy_tree_is_the_same_as_created_at_once(expected_tree):
+    assert TextRootUnit(expected_tree['raw_text']).get_dict() == expected_tree['tree']
+
+
+def test_sub_units_are_created_on_first_access():
+    root_unit = TextRootUnit('The first sentence. The second one.\nThe next paragraph.')
+    assert root_unit.get_tree_stats() == TextUnitTreeStats(built_units_count=1, expanded_units_count=0)
+
+    sub_units = root_unit.get_sub_units()
+    assert root_unit.get_sub_units() is sub_units
+    assert root_unit.get_tree_stats() == TextUnitTreeStats(built_units_count=1 + len(sub_units),
+                                                           expanded_units_count=1)
+
+    tree_units = __get_tree_units(root_unit)
+    assert root_unit.get_tree_stats() == TextUnitTreeStats(built_units_count=len(tree_units),
+                                                           expanded_units_count=len(tree_units))
+
+
+def test_tree_doesnt_depend_on_the_order_of_access():
+    for raw_text in generate_texts(texts_count=10) + [EXPECTED_TREES[-1]['raw_text']]:
+        root_unit = TextRootUnit(raw_text)
+        __create_tree_backwards(root_unit)
+        expected_unit_states = __get_unit_states(__get_tree_units(TextRootUnit(raw_text)))
+        assert __get_unit_states(__get_tree_units(root_unit)) == expected_unit_states
+
+
+def test_words_of_fitting_sentences_are_not_created():
+    raw_text = 'A short sentence. Another one!\n' * 20
+    root_unit = TextRootUnit(raw_text)
+    write_book(root_unit)
+
+    built_units_count = root_unit.get_tree_stats().built_units_count
+    assert built_units_count < len(__get_tree_units(TextRootUnit(raw_text))) / 2
+
+
+def test_cached_raw_text_is_the_text_of_sub_units():
+    for raw_text in generate_texts(texts_count=10):
+        for text_unit in __get_tree_units(TextRootUnit(raw_text)):
+            sub_units = text_unit.get_sub_units()
+            if len(sub_units) > 0:
+                assert text_unit.get_raw_text() == ''.join(sub_unit.get_raw_text() for sub_unit in sub_units)
+            # built once
+            assert text_unit.get_raw_text() is text_unit.get_raw_text()
+
+
+def test_cached_width_is_measured_by_the_ruler(ruler):
+    # rulers with other widths measure the units again
+    other_ruler = McCharRuler(char_width_dict_file=CHAR_WIDTH_FILE)
+    other_ruler.between_chars_width = 2
+
+    for raw_text in generate_texts(texts_count=10):
+        text_units = __get_tree_units(TextRootUnit(raw_text))
+        for text_unit in text_units:
+            width_px = ruler.get_width(text_unit.get_raw_text(), bold=text_unit.is_bold_at_start())
+            other_width_px = other_ruler.get_width(text_unit.get_raw_text(), bold=text_unit.is_bold_at_start())
+
+            assert text_unit.get_width(ruler) == width_px
+            assert text_unit.get_width(other_ruler) == other_width_px
+            assert text_unit.get_width(ruler) == width_px
+
+            assert text_unit.fits_width(ruler, McLine.max_width_px) == (width_px <= McLine.max_width_px)
+            assert text_unit.fits_width(ruler, width_px - 1) is False
+            assert text_unit.fits_width(other_ruler, other_width_px) is True
+
+        # units of a new tree are measured at once
+        expected_widths = [text_unit.get_width(ruler) for text_unit in text_units]
+        assert TextUnit.get_widths(__get_tree_units(TextRootUnit(raw_text)), ruler) == expected_widths
@@ -0,0 +1,90 @@
+import random
+
+from bookmaster.model.text_empty_unit import TextEmptyUnit
+from bookmaster.model.text_root_unit import TextRootUnit
+from bookmaster.model.text_unit import TextUnit
+from bookmaster.text_unit_reader import TextUnitReader
+from tests.conftest import generate_texts
+
+
+# TextUnitReader before it kept a stack of frames: every unit is found by its address from the root
+class AddressTextUnitReader:
+
+    def __init__(self, text_unit: TextUnit):
+        self.text_unit = text_unit
+        self.read_address = []
+        self.reading_complete = False
+
+    def __get_next_available_address(self, address: list[int]) -> list[int] | None:
+        while len(address) > 0:
+            next_address = address[:-1] + [address[-1] + 1]
+            if self.text_unit.get_by_address(next_address) is not None:
+                return next_address
+            address = address[:-1]
+
+        return None
+
+    def consume_next(self, update_address: bool, deep_factor: int) -> TextUnit:
+        if self.reading_complete:
+            return TextEmptyUnit()
+
+        scaled_read_address = self.read_address + [0] * deep_factor
+        targeted_text_unit = self.text_unit.get_by_address(address=scaled_read_address)
+
+        if update_address and targeted_text_unit is not None:
+            next_read_address = self.__get_next_available_address(address=scaled_read_address)
+            if next_read_address is not None:
+                self.read_address = next_read_address
+            else:
+                self.reading_complete = True
+
+        return targeted_text_unit if targeted_text_unit is not None else TextEmptyUnit()
+
+
+def __assert_same_unit(text_unit: TextUnit, expected_text_unit: TextUnit):
+    if type(expected_text_unit) is TextEmptyUnit:
+        assert type(text_unit) is TextEmptyUnit
+    else:
+        assert text_unit is expected_text_unit
+
+
+def test_reader_reads_units_in_the_order_of_addresses():
+    rand = random.Random(3)
+    for raw_text in generate_texts(texts_count=10):
+        root_unit = TextRootUnit(raw_text)
+        reader = TextUnitReader(text_unit=root_unit)
+        expected_reader = AddressTextUnitReader(text_unit=root_unit)
+
+        while not expected_reader.reading_complete:
+            deep_factor = rand.randint(0, 5)
+            if rand.random() < 0.5:
+                text_unit = reader.read_next(deep_factor=deep_factor)
+                expected_text_unit = expected_reader.consume_next(update_address=False, deep_factor=deep_factor)
+            else:
+                text_unit = reader.consume_next(deep_factor=deep_factor)
+                expected_text_unit = expected_reader.consume_next(update_address=True, deep_factor=deep_factor)
+
+            __assert_same_unit(text_unit, expected_text_unit)
+
+            if not expected_reader.reading_complete:
+                assert reader.get_read_address() == expected_reader.read_address
+
+        assert type(reader.read_next()) is TextEmptyUnit
+        assert type(reader.consume_next(deep_factor=1)) is TextEmptyUnit
+
+
+def test_set_read_address_continues_from_the_unit():
+    root_unit = TextRootUnit(generate_texts(texts_count=1)[0])
+    reader = TextUnitReader(text_unit=root_unit)
+    for deep_factor in [3, 0, 4, 2, 0, 5, 1]:
+        reader.consume_next(deep_factor=deep_factor)
+
+    address = reader.get_read_address()
+    resumed_reader = TextUnitReader(text_unit=root_unit)
+    resumed_reader.set_read_address(address)
+
+    assert resumed_reader.get_read_address() == address
+    for deep_factor in [0, 2, 1, 0, 3]:
+        text_unit = resumed_reader.consume_next(deep_factor=deep_factor)
+        __assert_same_unit(text_unit, reader.consume_next(deep_factor=deep_factor))
+        assert resumed_reader.get_read_address() == reader.get_read_address()
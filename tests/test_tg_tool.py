@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+
+from tests.conftest import FakeTelegramClient
+
+pytest.importorskip('telethon')
+
+
+def test_load_filtered_messages(tg_tool):
+    telegram_client = FakeTelegramClient(newest_id=100)
+
+    ranged_messages = asyncio.run(tg_tool.load_filtered_messages(
+        channel_username='@channel',
+        offset_id=0,
+        count=7,
+        filter_valid=lambda messages: [message for message in messages if message.id % 2 == 0],
+        requrest_size=5,
+        telegram_client=telegram_client,
+    ))
+
+    assert [message.id for message in ranged_messages.messages] == [100, 98, 96, 94, 92, 90, 88]
+    # the range covers all loaded messages, including the invalid ones after the last valid message
+    assert ranged_messages.id_range_end == 100
+    assert ranged_messages.id_range_start == 86
+
+
+def test_load_filtered_messages_retries_flood_wait(tg_tool):
+    telegram_client = FakeTelegramClient(newest_id=50, flood_wait_requests={1, 2, 4})
+
+    ranged_messages = asyncio.run(tg_tool.load_filtered_messages(
+        channel_username='@channel',
+        offset_id=30,
+        count=12,
+        filter_valid=lambda messages: messages,
+        requrest_size=10,
+        telegram_client=telegram_client,
+    ))
+
+    assert [message.id for message in ranged_messages.messages] == list(range(29, 17, -1))
+    assert ranged_messages.id_range_end == 29
+    assert telegram_client.requests_count >= 5
+
+
+def test_next_messages_are_loaded_while_messages_are_validated(tg_tool):
+    telegram_client = FakeTelegramClient(newest_id=100)
+    requests_started_while_validated = []
+
+    def filter_valid(messages):
+        requests_count = telegram_client.requests_count
+        time.sleep(0.1)
+        requests_started_while_validated.append(telegram_client.requests_count - requests_count)
+        return messages
+
+    asyncio.run(tg_tool.load_filtered_messages(
+        channel_username='@channel',
+        offset_id=0,
+        count=30,
+        filter_valid=filter_valid,
+        requrest_size=10,
+        telegram_client=telegram_client,
+    ))
+
+    assert requests_started_while_validated == [1, 1, 1]
+
+
+def test_requests_of_concurrent_loaders_are_limited(tg_tool):
+    telegram_client = FakeTelegramClient(newest_id=300, request_seconds=0.02)
+
+    async def load_all():
+        return await asyncio.gather(*[
+            tg_tool.load_filtered_messages(
+                channel_username='@channel',
+                offset_id=offset_id,
+                count=20,
+                filter_valid=lambda messages: messages,
+                requrest_size=5,
+                telegram_client=telegram_client,
+            )
+            for offset_id in [301, 201, 101]
+        ])
+
+    all_ranged_messages = asyncio.run(load_all())
+
+    for ranged_messages, offset_id in zip(all_ranged_messages, [301, 201, 101]):
+        assert [message.id for message in ranged_messages.messages] == list(range(offset_id - 1, offset_id - 21, -1))
+    # three loaders share the limit, one request of each of them would be sent at the same time without it
+    assert telegram_client.max_requests_in_flight == tg_tool.max_requests_in_flight == 2
+
+
+def test_requests_are_limited_in_every_event_loop(tg_tool, monkeypatch):
+    monkeypatch.setattr(tg_tool, 'max_requests_in_flight', 1)
+
+    # the limit of the first run must not be bound to the next event loop
+    for _ in range(2):
+        telegram_client = FakeTelegramClient(newest_id=100)
+
+        async def load_all():
+            return await asyncio.gather(*[
+                tg_tool.load_filtered_messages(
+                    channel_username='@channel',
+                    offset_id=offset_id,
+                    count=10,
+                    filter_valid=lambda messages: messages,
+                    requrest_size=5,
+                    telegram_client=telegram_client,
+                )
+                for offset_id in [101, 51]
+            ])
+
+        asyncio.run(load_all())
+        assert telegram_client.max_requests_in_flight == 1